@@ -0,0 +1,125 @@
+"""
+Accessibility Module for Computer Use MCP Server
+Dumps the AT-SPI widget tree of the remote desktop over SSH and caches it until the screen changes
+"""
+import json
+import shlex
+from frame_diff import frame_digest
+
+# Deepest widget nesting and most widgets reported
+MAX_DEPTH = 30
+MAX_NODES = 400
+
+# Runs on the remote host with python3-gi and the AT-SPI bindings. Prints one
+# [depth, role, name, x, y, width, height, focused] row per widget on screen;
+# unnamed layout containers are left out and their children moved up a level.
+DUMP_SCRIPT = r'''
+import json, sys
+import gi
+gi.require_version("Atspi", "2.0")
+from gi.repository import Atspi
+max_depth, max_nodes = int(sys.argv[1]), int(sys.argv[2])
+layout = {"filler", "panel", "section", "unknown", "redundant object", "scroll pane", "viewport"}
+rows = []
+def walk(node, depth, level):
+    if len(rows) >= max_nodes or level > max_depth:
+        return
+    try:
+        states = node.get_state_set()
+        if not states.contains(Atspi.StateType.SHOWING):
+            return
+        role, name = node.get_role_name(), node.get_name() or ""
+        box = node.get_extents(Atspi.CoordType.SCREEN)
+        shown = bool(name or role not in layout) and box.width > 0 and box.height > 0
+        if shown:
+            rows.append([depth, role, name[:100], box.x, box.y, box.width, box.height,
+                         int(states.contains(Atspi.StateType.FOCUSED))])
+        for i in range(node.get_child_count()):
+            walk(node.get_child_at_index(i), depth + shown, level + 1)
+    except Exception:
+        pass
+desktop = Atspi.get_desktop(0)
+for i in range(desktop.get_child_count()):
+    app = desktop.get_child_at_index(i)
+    for j in range(app.get_child_count() if app else 0):
+        walk(app.get_child_at_index(j), 0, 0)
+json.dump(rows, sys.stdout, separators=(",", ":"))
+'''
+
+
+def format_tree(rows, transform=None):
+    """
+    Render widget rows as an indented outline, one widget per line
+
+    Args:
+        rows (list): [depth, role, name, x, y, width, height, focused] rows from DUMP_SCRIPT
+        transform (callable): Maps a screen (x, y) to the coordinates the caller clicks in
+
+    Returns:
+        str: Lines like '  push button "OK" (x, y, width, height) focused'
+    """
+    lines = []
+    for depth, role, name, x, y, width, height, focused in rows:
+        if transform:
+            left, top = transform(x, y)
+            right, bottom = transform(x + width, y + height)
+            x, y, width, height = left, top, right - left, bottom - top
+        label = f' "{name}"' if name else ""
+        lines.append(f"{'  ' * depth}{role}{label} ({x}, {y}, {width}, {height}){' focused' if focused else ''}")
+    return "\n".join(lines)
+
+
+class AccessibilityTree:
+    """
+    The remote desktop's widget tree from AT-SPI, reused until the screen changes
+
+    With the VNC mirror running the cache is keyed on its update count, so checking
+    it costs nothing; otherwise a screenshot is taken and hashed.
+    """
+
+    def __init__(self, ssh, vnc, display_num):
+        """
+        Initialize an empty cache
+
+        Args:
+            ssh (SSHController): Controller for the desktop host
+            vnc (VNCController): Controller whose screen changes invalidate the cache
+            display_num (str): X display the desktop runs on
+        """
+        self.ssh = ssh
+        self.vnc = vnc
+        self.display_num = display_num
+        self.hits = 0
+        self.misses = 0
+        self._key = None
+        self._rows = None
+
+    async def _screen_key(self):
+        if self.vnc.mirror and self.vnc.frame_source is None and self.vnc.frame_seq:
+            return ("seq", self.vnc.frame_seq)
+        return ("digest", frame_digest(await self.vnc.capture_screenshot()))
+
+    async def rows(self, max_depth=MAX_DEPTH, max_nodes=MAX_NODES):
+        """
+        Widget rows for the current screen, from the cache when the screen is unchanged
+
+        Returns:
+            tuple: (rows, whether they came from the cache)
+        """
+        key = (await self._screen_key(), max_depth, max_nodes)
+        if key == self._key:
+            self.hits += 1
+            return self._rows, True
+        command = (f"DISPLAY=:{self.display_num} python3 -c {shlex.quote(DUMP_SCRIPT)} "
+                   f"{int(max_depth)} {int(max_nodes)}")
+        result = await self.ssh.execute_command(command)
+        output = result.get("output", "")
+        try:
+            rows = json.loads(output)
+        except ValueError:
+            # Warnings from GTK land on stderr; only a missing tree is an error
+            raise Exception(f"Failed to read the accessibility tree: {result.get('error') or output}")
+        self.misses += 1
+        # The screen may have changed during the dump; key on the state before it
+        self._key, self._rows = key, rows
+        return rows, False
@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""
+VNC input benchmark
+Compares actions per second of the vncdotool and asyncio VNCController backends
+"""
+import os
+import sys
+import time
+import asyncio
+import argparse
+from dotenv import load_dotenv
+from vnc_controller import VNCController, BACKENDS
+
+
+async def run_actions(vnc, iterations):
+    """
+    Time each kind of input action against one VNC session
+    
+    Returns:
+        dict: Actions per second by action name
+    """
+    actions = {
+        "mouse_move": lambda i: vnc.mouse_move(100 + i % 200, 100 + i % 100),
+        "mouse_click": lambda i: vnc.mouse_click(100 + i % 200, 100 + i % 100, 1),
+        "key_press": lambda i: vnc.key_press("shift"),
+        "capture": lambda i: vnc.capture_screenshot(),
+    }
+    rates = {}
+    for name, action in actions.items():
+        start = time.perf_counter()
+        for i in range(iterations):
+            await action(i)
+        rates[name] = iterations / (time.perf_counter() - start)
+    return rates
+
+
+async def main():
+    """Main function"""
+    parser = argparse.ArgumentParser(description="Benchmark VNC input throughput per backend")
+    parser.add_argument("--env", help="Path to .env file", default=".env")
+    parser.add_argument("-n", "--iterations", type=int, default=200, help="Actions per action type")
+    parser.add_argument("--mirror", action="store_true", help="Serve captures from the screen mirror")
+    args = parser.parse_args()
+    
+    if os.path.exists(args.env):
+        load_dotenv(args.env)
+    
+    vnc_host = os.environ.get("VNC_HOST")
+    vnc_port = int(os.environ.get("VNC_PORT", "5900"))
+    vnc_username = os.environ.get("VNC_USERNAME")
+    vnc_password = os.environ.get("VNC_PASSWORD")
+    if not vnc_host:
+        print("VNC_HOST environment variable is required")
+        return False
+    
+    results = {}
+    for backend in BACKENDS:
+        vnc = VNCController(vnc_host, vnc_port, vnc_username, vnc_password,
+                            mirror=args.mirror, backend=backend)
+        if not await vnc.connect():
+            print(f"Failed to connect to VNC server with the {backend} backend")
+            return False
+        try:
+            results[backend] = await run_actions(vnc, args.iterations)
+        finally:
+            await vnc.disconnect()
+    
+    print(f"{'action':<14}" + "".join(f"{backend + ' /s':>16}" for backend in BACKENDS) + f"{'speedup':>10}")
+    for action in results[BACKENDS[0]]:
+        rates = [results[backend][action] for backend in BACKENDS]
+        print(f"{action:<14}" + "".join(f"{rate:>16.1f}" for rate in rates) + f"{rates[1] / rates[0]:>9.1f}x")
+    return True
+
+if __name__ == "__main__":
+    success = asyncio.run(main())
+    sys.exit(0 if success else 1)
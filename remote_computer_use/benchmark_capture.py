@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+Screenshot capture benchmark
+Compares the legacy temp-file PNG round-trip against the in-memory framebuffer path
+"""
+import os
+import sys
+import time
+import asyncio
+import argparse
+import tempfile
+import statistics
+from dotenv import load_dotenv
+from PIL import Image
+from vnc_controller import VNCController
+
+
+def legacy_capture(client):
+    """Capture the screen the way VNCController used to: PNG to a temp file, then decode it back"""
+    with tempfile.NamedTemporaryFile(suffix='.png', delete=True) as tmp:
+        client.captureScreen(tmp.name)
+        image = Image.open(tmp.name)
+        image.load()
+        return image
+
+
+async def run_benchmark(vnc, iterations):
+    """
+    Time both capture paths against the same VNC session
+    
+    Returns:
+        dict: Per-path list of capture durations in seconds
+    """
+    timings = {"tempfile": [], "in-memory": []}
+    # Warm up so the first full framebuffer transfer is not counted
+    await vnc.capture_screenshot()
+    for _ in range(iterations):
+        start = time.perf_counter()
+        await asyncio.to_thread(legacy_capture, vnc.client)
+        timings["tempfile"].append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        await vnc.capture_screenshot()
+        timings["in-memory"].append(time.perf_counter() - start)
+    return timings
+
+
+async def main():
+    """Main function"""
+    parser = argparse.ArgumentParser(description="Benchmark VNC screenshot capture paths")
+    parser.add_argument("--env", help="Path to .env file", default=".env")
+    parser.add_argument("-n", "--iterations", type=int, default=20, help="Screenshots per capture path")
+    args = parser.parse_args()
+    
+    if os.path.exists(args.env):
+        load_dotenv(args.env)
+    
+    vnc_host = os.environ.get("VNC_HOST")
+    vnc_port = int(os.environ.get("VNC_PORT", "5900"))
+    vnc_username = os.environ.get("VNC_USERNAME")
+    vnc_password = os.environ.get("VNC_PASSWORD")
+    if not vnc_host:
+        print("VNC_HOST environment variable is required")
+        return False
+    
+    vnc_encodings = [name.strip() for name in os.environ.get("VNC_ENCODINGS", "").split(",") if name.strip()]
+    vnc_pixel_depth = int(os.environ["VNC_PIXEL_DEPTH"]) if os.environ.get("VNC_PIXEL_DEPTH") else None
+    vnc = VNCController(vnc_host, vnc_port, vnc_username, vnc_password,
+                        encodings=vnc_encodings, pixel_depth=vnc_pixel_depth)
+    if not await vnc.connect():
+        print("Failed to connect to VNC server")
+        return False
+    
+    try:
+        timings = await run_benchmark(vnc, args.iterations)
+        stats = vnc.stats()
+    finally:
+        await vnc.disconnect()
+    
+    print(f"{'path':<12}{'mean ms':>10}{'median ms':>12}{'min ms':>10}")
+    for path, samples in timings.items():
+        print(f"{path:<12}{statistics.mean(samples) * 1000:>10.1f}"
+              f"{statistics.median(samples) * 1000:>12.1f}{min(samples) * 1000:>10.1f}")
+    saved = statistics.mean(timings["tempfile"]) - statistics.mean(timings["in-memory"])
+    print(f"Saved per screenshot: {saved * 1000:.1f} ms")
+    print(f"Encodings: {','.join(stats['encodings'])}, pixel depth: {stats['pixel_depth']}")
+    print(f"Mean update: {stats['mean_update_bytes']} bytes for {stats['mean_update_pixels']} pixels "
+          f"({stats['bytes_per_pixel']} bytes/pixel), full update {stats['mean_full_update_ms']} ms")
+    return True
+
+if __name__ == "__main__":
+    success = asyncio.run(main())
+    sys.exit(0 if success else 1)
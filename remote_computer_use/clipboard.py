@@ -0,0 +1,59 @@
+"""
+Clipboard Module for Computer Use MCP Server
+Reads the remote X clipboard or primary selection over SSH as text, one page at a time
+"""
+import json
+import shlex
+
+# Selections xclip can read
+SELECTIONS = ("clipboard", "primary")
+# Characters returned per read; longer selections are read in pages by offset
+MAX_CHARS = 20000
+
+# Runs on the remote host with the selection on stdin. Decodes it as UTF-8 and prints
+# its length in characters with the requested page, so a page never splits a character.
+PAGE_SCRIPT = r'''
+import json, sys
+offset, max_chars = int(sys.argv[1]), int(sys.argv[2])
+text = sys.stdin.buffer.read().decode("utf-8", errors="replace")
+json.dump({"length": len(text), "text": text[offset:offset + max_chars]}, sys.stdout)
+'''
+
+
+async def read_selection(ssh, display_num, selection="clipboard", offset=0, max_chars=MAX_CHARS):
+    """
+    Read a page of the clipboard or primary selection of the remote display
+
+    Args:
+        ssh (SSHController): Controller for the desktop host
+        display_num (str): X display the desktop runs on
+        selection (str): 'clipboard' (ctrl+c) or 'primary' (the currently selected text)
+        offset (int): Character to start the page at
+        max_chars (int): Most characters to return
+
+    Returns:
+        dict: Page text, its offset, the selection's total length in characters,
+            whether text is left after the page and the offset to read it from
+    """
+    if selection not in SELECTIONS:
+        raise ValueError(f"Unknown selection: {selection}, expected one of {', '.join(SELECTIONS)}")
+    if offset < 0 or max_chars <= 0:
+        raise ValueError("offset must be 0 or more and max_chars more than 0")
+    # An empty selection makes xclip fail on stderr; read it as empty text instead
+    command = (f"DISPLAY=:{display_num} xclip -o -selection {selection} 2>/dev/null | "
+               f"python3 -c {shlex.quote(PAGE_SCRIPT)} {int(offset)} {int(max_chars)}")
+    result = await ssh.execute_command(command)
+    output = result.get("output", "")
+    try:
+        page = json.loads(output)
+    except ValueError:
+        raise Exception(f"Failed to read the {selection} selection: {result.get('error') or output}")
+    end = offset + len(page["text"])
+    truncated = end < page["length"]
+    return {
+        "text": page["text"],
+        "offset": offset,
+        "length": page["length"],
+        "truncated": truncated,
+        "next_offset": end if truncated else None,
+    }
@@ -0,0 +1,313 @@
+"""
+Desktop Pool Module for Computer Use MCP Server
+Leases the desktops of a pool to MCP sessions, with health checks and idle reclamation
+"""
+import asyncio
+import json
+import time
+import weakref
+from accessibility import AccessibilityTree
+from image_encoder import ScreenshotCache
+
+# Seconds a health check may take before the desktop counts as down
+HEALTH_TIMEOUT = 10.0
+
+
+class Desktop:
+    """
+    One desktop: its controllers and the per-desktop state the tools work with
+
+    Has the same desktop attributes as a single-desktop server's AppContext, so
+    tools use either one the same way.
+    """
+
+    def __init__(self, name, vnc, ssh, display_num, max_sessions=1, recorder=None, trajectories=None):
+        """
+        Initialize a desktop that is not connected yet
+
+        Args:
+            name (str): Name the desktop is reported under
+            vnc (VNCController): Controller for screenshots and, in server.py, input
+            ssh (SSHController): Controller for commands, or a LocalController
+            display_num (str): X display the desktop runs on
+            max_sessions (int): Most MCP sessions leased to the desktop at once
+            recorder (ScreenRecorder): Screen recorder, None when recording is off
+            trajectories (TrajectoryStore): Trajectory store the desktop's sessions record to
+        """
+        self.name = name
+        self.vnc = vnc
+        self.ssh = ssh
+        self.display_num = display_num
+        self.max_sessions = max_sessions
+        self.recorder = recorder
+        self.trajectories = trajectories
+        self.accessibility = AccessibilityTree(ssh, vnc, display_num)
+        self.sessions = 0
+        self.healthy = True
+        self.error = None
+        self.checked = None
+
+    async def start(self):
+        """Connect to the desktop and start its capture and recording"""
+        if self.vnc.host:
+            vnc_success = await self.vnc.connect()
+            if not vnc_success:
+                print(f"Warning: Failed to connect to VNC server of {self.name} on startup")
+
+        ssh_success = await self.ssh.connect()
+        if not ssh_success:
+            print(f"Warning: Failed to connect to SSH server of {self.name} on startup")
+
+        if self.vnc.frame_source and ssh_success:
+            try:
+                await self.vnc.frame_source.start()
+            except Exception as e:
+                print(f"Warning: Failed to start screen capture of {self.name}: {e}")
+
+        if self.recorder:
+            self.recorder.start()
+
+    async def stop(self):
+        """Stop recording and capture and disconnect"""
+        if self.recorder:
+            await self.recorder.stop()
+        if self.vnc.frame_source:
+            await self.vnc.frame_source.stop()
+        await self.vnc.disconnect()
+        await self.ssh.disconnect()
+
+    async def check(self, timeout=HEALTH_TIMEOUT):
+        """
+        Run a command and take a screenshot; a failure drops both connections so the
+        next check or tool call reconnects
+
+        Returns:
+            bool: Whether the desktop is healthy
+        """
+        try:
+            async with asyncio.timeout(timeout):
+                result = await self.ssh.execute_command("true")
+                if not result["success"]:
+                    raise Exception(result.get("error") or "Command failed")
+                await self.vnc.capture_screenshot()
+            self.healthy, self.error = True, None
+        except Exception as e:
+            self.healthy = False
+            self.error = str(e) or f"Health check took more than {timeout} seconds"
+            await self.vnc.disconnect()
+            await self.ssh.disconnect()
+        self.checked = time.time()
+        return self.healthy
+
+    def status(self):
+        """
+        Report the desktop's health and load
+
+        Returns:
+            dict: Name, health, last error and check time, leased and maximum sessions
+        """
+        return {
+            "name": self.name,
+            "healthy": self.healthy,
+            "error": self.error,
+            "checked": self.checked,
+            "sessions": self.sessions,
+            "max_sessions": self.max_sessions,
+        }
+
+
+class Lease:
+    """
+    A session's claim on a desktop, with the state that belongs to the session
+
+    Sessions sharing a desktop each get their own screenshot numbers and delta
+    frames, and their own trajectory recording.
+    """
+
+    def __init__(self, desktop):
+        """
+        Initialize a lease with fresh session state
+
+        Args:
+            desktop (Desktop): The leased desktop
+        """
+        self.desktop = desktop
+        self.last_used = time.monotonic()
+        # Screenshots sent to this session, for dedup and delta screenshots
+        self.screenshot_cache = ScreenshotCache(desktop.vnc.screenshot_cache.mode)
+        self.trajectories = desktop.trajectories.session() if desktop.trajectories else None
+
+    def close(self):
+        """Drop the session state; a recording still in progress is discarded"""
+        if self.trajectories is not None:
+            self.trajectories.finish(False)
+
+
+class DesktopPool:
+    """
+    Desktops shared by the MCP sessions of one server
+
+    A session is leased a desktop on its first tool call and keeps it until the
+    session ends, stays idle for idle_timeout or the desktop fails a health check;
+    its next call is then leased a desktop again. A new session gets the healthy
+    desktop with the fewest sessions below its max_sessions, waiting up to
+    lease_timeout for one to free up.
+    """
+
+    def __init__(self, desktops, idle_timeout=600.0, health_interval=30.0, lease_timeout=30.0):
+        """
+        Initialize a pool that is not started yet
+
+        Args:
+            desktops (list): Desktop instances, with unique names
+            idle_timeout (float): Seconds without a tool call before a lease is reclaimed
+            health_interval (float): Seconds between health checks of every desktop
+            lease_timeout (float): Seconds a new session waits for a free desktop
+        """
+        names = [desktop.name for desktop in desktops]
+        if not desktops or len(set(names)) != len(names):
+            raise ValueError("A desktop pool needs at least one desktop and unique desktop names")
+        self.desktops = desktops
+        self.idle_timeout = idle_timeout
+        self.health_interval = health_interval
+        self.lease_timeout = lease_timeout
+        self.reclaimed = 0
+        # Keyed by id() of the MCP session object, released when the session is collected
+        self._leases = {}
+        self._available = None
+        self._loop = None
+        self._task = None
+
+    @classmethod
+    def from_file(cls, path, build):
+        """
+        Load a pool from a JSON config file
+
+        The file holds pool settings and a "desktops" list; each entry is passed
+        to `build` as keyword arguments.
+
+        Args:
+            path (str): Config file, see desktops.example.json
+            build (callable): Makes a Desktop from one entry
+
+        Returns:
+            DesktopPool: Pool of the configured desktops
+        """
+        with open(path) as f:
+            config = json.load(f)
+        desktops = [build(**entry) for entry in config.get("desktops", [])]
+        return cls(
+            desktops,
+            idle_timeout=float(config.get("idle_timeout", 600)),
+            health_interval=float(config.get("health_interval", 30)),
+            lease_timeout=float(config.get("lease_timeout", 30)),
+        )
+
+    async def start(self):
+        """Connect every desktop and start the health check loop"""
+        self._loop = asyncio.get_running_loop()
+        self._available = asyncio.Condition()
+        await asyncio.gather(*(desktop.start() for desktop in self.desktops))
+        # Desktops that are down from the start get no sessions
+        await asyncio.gather(*(desktop.check() for desktop in self.desktops))
+        self._task = asyncio.create_task(self._maintain())
+
+    async def stop(self):
+        """Stop the health checks and disconnect every desktop"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await asyncio.gather(*(desktop.stop() for desktop in self.desktops))
+
+    def _pick(self):
+        free = [desktop for desktop in self.desktops
+                if desktop.healthy and desktop.sessions < desktop.max_sessions]
+        return min(free, key=lambda desktop: desktop.sessions, default=None)
+
+    async def lease(self, session):
+        """
+        Lease of an MCP session, leasing a desktop on the session's first call
+
+        Args:
+            session: The MCP session, ctx.session in a tool
+
+        Returns:
+            Lease: The session's desktop and session state
+        """
+        key = id(session)
+        lease = self._leases.get(key)
+        if lease is None:
+            async with self._available:
+                # Another call of the same session may have leased one while this waited
+                lease = self._leases.get(key)
+                if lease is None:
+                    try:
+                        await asyncio.wait_for(self._available.wait_for(lambda: self._pick() is not None),
+                                               self.lease_timeout)
+                    except TimeoutError:
+                        raise Exception(f"No desktop available: all {len(self.desktops)} desktops are "
+                                        f"busy or unhealthy") from None
+                    lease = Lease(self._pick())
+                    lease.desktop.sessions += 1
+                    self._leases[key] = lease
+                    weakref.finalize(session, self._session_closed, key, lease)
+        lease.last_used = time.monotonic()
+        return lease
+
+    def _session_closed(self, key, lease):
+        # Runs wherever the session object is collected, hand over to the event loop
+        if not self._loop.is_closed():
+            self._loop.call_soon_threadsafe(self._loop.create_task, self._release(key, lease))
+
+    async def _release(self, key, lease):
+        async with self._available:
+            if self._leases.get(key) is lease:
+                del self._leases[key]
+                lease.close()
+                lease.desktop.sessions -= 1
+                self._available.notify_all()
+
+    async def release(self, session):
+        """Give up a session's desktop, if it has one"""
+        lease = self._leases.get(id(session))
+        if lease is not None:
+            await self._release(id(session), lease)
+
+    def desktop_of(self, session):
+        """Name of the desktop leased to a session, None when it has none"""
+        lease = self._leases.get(id(session))
+        return lease.desktop.name if lease else None
+
+    async def _maintain(self):
+        while True:
+            await asyncio.sleep(self.health_interval)
+            try:
+                await asyncio.gather(*(desktop.check() for desktop in self.desktops))
+                now = time.monotonic()
+                for key, lease in list(self._leases.items()):
+                    if not lease.desktop.healthy or now - lease.last_used > self.idle_timeout:
+                        self.reclaimed += 1
+                        await self._release(key, lease)
+                async with self._available:
+                    # A desktop that recovered can take sessions again
+                    self._available.notify_all()
+            except Exception as e:
+                print(f"Desktop pool maintenance error: {e}")
+
+    def status(self):
+        """
+        Report every desktop's health and load
+
+        Returns:
+            dict: Leases held, leases reclaimed and one entry per desktop
+        """
+        return {
+            "leases": len(self._leases),
+            "reclaimed": self.reclaimed,
+            "idle_timeout": self.idle_timeout,
+            "desktops": [desktop.status() for desktop in self.desktops],
+        }
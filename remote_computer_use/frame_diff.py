@@ -0,0 +1,125 @@
+"""
+Frame Diff Module for Computer Use MCP Server
+Compares screen frames to find what changed between them
+"""
+import hashlib
+from collections import deque
+import numpy as np
+from PIL import ImageChops
+
+# Changes are grouped on a grid of tiles this many pixels square
+DELTA_TILE = 16
+# More separate changed regions than this are merged into one bounding box
+MAX_REGIONS = 8
+
+
+def changed_bbox(previous, current):
+    """
+    Find the bounding box of all pixels that differ between two frames
+
+    Args:
+        previous (PIL.Image): Earlier frame
+        current (PIL.Image): Later frame
+
+    Returns:
+        tuple: (left, upper, right, lower) box, None when the frames are identical
+    """
+    if previous.size != current.size:
+        return (0, 0, current.width, current.height)
+    return ImageChops.difference(previous, current).getbbox()
+
+
+def box_area(box):
+    """Area in pixels of a (left, upper, right, lower) box, 0 for None"""
+    if box is None:
+        return 0
+    return (box[2] - box[0]) * (box[3] - box[1])
+
+
+def rects_area(rects):
+    """Total area in pixels of (x, y, w, h) rectangles, overlaps counted twice"""
+    return sum(w * h for _, _, w, h in rects)
+
+
+def rects_intersect(rect, other):
+    """Whether two (x, y, w, h) rectangles overlap"""
+    x, y, w, h = rect
+    ox, oy, ow, oh = other
+    return x < ox + ow and ox < x + w and y < oy + oh and oy < y + h
+
+
+def frame_digest(image):
+    """
+    Checksum a frame's pixels, cheap next to encoding it
+
+    Args:
+        image (PIL.Image): Frame to checksum
+
+    Returns:
+        bytes: 16 byte digest that also covers the frame size and mode
+    """
+    digest = hashlib.blake2b(image.tobytes(), digest_size=16)
+    digest.update(f"{image.mode}{image.size}".encode())
+    return digest.digest()
+
+
+def changed_regions(previous, current, tile=DELTA_TILE, max_regions=MAX_REGIONS):
+    """
+    Find the separate rectangles of pixels that differ between two frames
+
+    Changed pixels are marked on a coarse tile grid, touching tiles are grouped, and
+    each group is shrunk to the exact box of its changed pixels.
+
+    Args:
+        previous (PIL.Image): Earlier frame
+        current (PIL.Image): Later frame
+        tile (int): Grid size in pixels, changes closer than this end up in one region
+        max_regions (int): Merge everything into one box when there are more groups
+
+    Returns:
+        list: (left, upper, right, lower) boxes, empty when the frames are identical
+    """
+    if previous.size != current.size or previous.mode != current.mode:
+        return [(0, 0, current.width, current.height)]
+    mask = np.asarray(previous) != np.asarray(current)
+    if mask.ndim == 3:
+        mask = mask.any(axis=2)
+    if not mask.any():
+        return []
+
+    height, width = mask.shape
+    rows, cols = -(-height // tile), -(-width // tile)
+    padded = np.zeros((rows * tile, cols * tile), dtype=bool)
+    padded[:height, :width] = mask
+    grid = padded.reshape(rows, tile, cols, tile).any(axis=(1, 3))
+
+    # Flood fill the changed tiles into 8-connected groups
+    seen = np.zeros_like(grid)
+    groups = []
+    for row, col in zip(*np.nonzero(grid)):
+        if seen[row, col]:
+            continue
+        seen[row, col] = True
+        top, left, bottom, right = row, col, row, col
+        queue = deque([(row, col)])
+        while queue:
+            r, c = queue.popleft()
+            top, left, bottom, right = min(top, r), min(left, c), max(bottom, r), max(right, c)
+            for nr in range(max(r - 1, 0), min(r + 2, rows)):
+                for nc in range(max(c - 1, 0), min(c + 2, cols)):
+                    if grid[nr, nc] and not seen[nr, nc]:
+                        seen[nr, nc] = True
+                        queue.append((nr, nc))
+        groups.append((top, left, bottom, right))
+    if len(groups) > max_regions:
+        groups = [(min(g[0] for g in groups), min(g[1] for g in groups),
+                   max(g[2] for g in groups), max(g[3] for g in groups))]
+
+    boxes = []
+    for top, left, bottom, right in groups:
+        y0, x0 = top * tile, left * tile
+        part = mask[y0:(bottom + 1) * tile, x0:(right + 1) * tile]
+        ys = np.nonzero(part.any(axis=1))[0]
+        xs = np.nonzero(part.any(axis=0))[0]
+        boxes.append((int(x0 + xs[0]), int(y0 + ys[0]), int(x0 + xs[-1] + 1), int(y0 + ys[-1] + 1)))
+    return boxes
@@ -0,0 +1,306 @@
+"""
+Screenshot Encoder Module for Computer Use MCP Server
+Encodes screenshots to PNG, JPEG or WebP without blocking the event loop
+"""
+import asyncio
+import io
+import multiprocessing
+import os
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, replace
+from PIL import Image
+from frame_diff import box_area, changed_regions, frame_digest
+
+# MCP image format name -> PIL encoder name
+FORMATS = {
+    "png": "PNG",
+    "jpeg": "JPEG",
+    "webp": "WEBP",
+}
+
+# Lowest quality the byte budget may push a lossy encoder down to
+MIN_QUALITY = 30
+# Give up shrinking after this many attempts and return the smallest result
+MAX_BUDGET_ATTEMPTS = 6
+
+# off: always encode; cache: resend the last encoding for an identical screen;
+# placeholder: answer an identical screen with a short "unchanged" note instead
+DEDUP_MODES = ("off", "cache", "placeholder")
+
+# A delta screenshot falls back to the full frame when more than this share changed
+DELTA_MAX_FRACTION = 0.5
+# Baseline frames kept for delta screenshots, one per captured view
+MAX_VIEWS = 4
+
+
+@dataclass(frozen=True)
+class EncodedImage:
+    """An encoded screenshot and the format name MCP uses for its MIME type"""
+    data: bytes
+    format: str
+    # Sequence number of the screenshot this encoding was first sent as
+    number: int | None = None
+    # True when served from ScreenshotCache because the screen had not changed
+    repeat: bool = False
+
+
+class ScreenshotCache:
+    """Remembers the last screenshot sent, so an identical screen is not encoded twice"""
+
+    def __init__(self, mode="cache"):
+        """
+        Initialize an empty cache
+
+        Args:
+            mode (str): One of DEDUP_MODES
+        """
+        if mode not in DEDUP_MODES:
+            raise ValueError(f"Unsupported screenshot dedup mode: {mode}")
+        self.mode = mode
+        # Screenshots sent so far, repeats not included
+        self.count = 0
+        self._last = None
+        self._frames = OrderedDict()
+
+    def lookup(self, digest, settings):
+        """
+        Return the cached encoding when the frame and encoder settings match the last one sent
+
+        Args:
+            digest (bytes): frame_digest of the new frame
+            settings (tuple): Encoder settings the frame would be encoded with
+
+        Returns:
+            EncodedImage: The earlier encoding marked as a repeat, or None
+        """
+        if self.mode == "off" or self._last is None:
+            return None
+        last_digest, last_settings, encoded = self._last
+        if last_digest != digest or last_settings != settings:
+            return None
+        # A repeat keeps the number it was sent under, so numbers stay consecutive
+        return replace(encoded, repeat=True)
+
+    def store(self, digest, settings, encoded):
+        """
+        Remember a freshly encoded screenshot and number it
+
+        Returns:
+            EncodedImage: The encoding with its screenshot number set
+        """
+        self.count += 1
+        encoded = replace(encoded, number=self.count)
+        self._last = (digest, settings, encoded)
+        return encoded
+
+    def remember_frame(self, view, image):
+        """
+        Record the frame just sent for a view and return the one sent before it
+
+        Args:
+            view (tuple): What was captured, None for the full screen or an (x, y, w, h) region
+            image (PIL.Image): Frame being sent
+
+        Returns:
+            PIL.Image: Previous frame sent for the same view, or None
+        """
+        previous = self._frames.pop(view, None)
+        self._frames[view] = image
+        while len(self._frames) > MAX_VIEWS:
+            self._frames.popitem(last=False)
+        return previous
+
+
+def _save(image, format, quality, colors):
+    """Encode once with fixed settings"""
+    if colors:
+        image = image.quantize(colors=colors)
+    if format != "png" and image.mode not in ("RGB", "L"):
+        image = image.convert("RGB")
+    buffer = io.BytesIO()
+    if format == "png":
+        image.save(buffer, format="PNG")
+    else:
+        image.save(buffer, format=FORMATS[format], quality=quality)
+    return buffer.getvalue()
+
+
+def encode_image(image, format="png", quality=80, colors=None, max_bytes=None, size=None):
+    """
+    Encode a PIL image, shrinking it until it fits the byte budget
+
+    Over budget, lossy formats first trade quality (down to MIN_QUALITY) and PNG
+    first drops to a 256 color palette; after that the image is downscaled.
+
+    Args:
+        image (PIL.Image): Image to encode
+        format (str): 'png', 'jpeg' or 'webp'
+        quality (int): Quality for lossy formats, 1-100
+        colors (int): Reduce to a palette of this many colors, None keeps full color
+        max_bytes (int): Target upper bound for the encoded size, None for no limit
+        size (tuple): Resample to this (width, height) before encoding, None keeps the size
+
+    Returns:
+        EncodedImage: Encoded bytes and format
+    """
+    if format not in FORMATS:
+        raise ValueError(f"Unsupported screenshot format: {format}")
+    if size and tuple(size) != image.size:
+        # reducing_gap lets Pillow box-reduce by an integer factor first, which is much
+        # cheaper than a full bilinear pass over a high-resolution frame
+        image = image.resize(tuple(size), Image.Resampling.BILINEAR, reducing_gap=2.0)
+    data = _save(image, format, quality, colors)
+    attempts = 0
+    while max_bytes and len(data) > max_bytes and attempts < MAX_BUDGET_ATTEMPTS:
+        attempts += 1
+        if format != "png" and quality > MIN_QUALITY:
+            quality = max(MIN_QUALITY, int(quality * 0.7))
+        elif format == "png" and not colors:
+            colors = 256
+        else:
+            # Encoded size is roughly proportional to the pixel count
+            scale = min(0.9, (max_bytes / len(data)) ** 0.5)
+            size = (max(1, int(image.width * scale)), max(1, int(image.height * scale)))
+            image = image.resize(size, Image.Resampling.BILINEAR)
+        data = _save(image, format, quality, colors)
+    return EncodedImage(data=data, format=format)
+
+
+def describe_regions(regions):
+    """Describe the boxes of a delta screenshot, in the order their images are sent"""
+    if not regions:
+        return "No change since the previous screenshot"
+    boxes = ", ".join(f"({x}, {y}, {w}, {h})" for (x, y, w, h), _ in regions)
+    return f"Changed regions since the previous screenshot as (x, y, width, height): {boxes}"
+
+
+class ScreenshotEncoder:
+    def __init__(self, format="png", quality=80, colors=None, max_bytes=None, workers=2):
+        """
+        Initialize screenshot encoder with output settings
+
+        Args:
+            format (str): 'png', 'jpeg' or 'webp'
+            quality (int): Quality for lossy formats, 1-100
+            colors (int): Reduce to a palette of this many colors, None keeps full color
+            max_bytes (int): Target upper bound for the encoded size, None for no limit
+            workers (int): Encoder processes, 0 encodes in a thread instead
+        """
+        format = format.lower()
+        format = "jpeg" if format == "jpg" else format
+        if format not in FORMATS:
+            raise ValueError(f"Unsupported screenshot format: {format}")
+        self.format = format
+        self.quality = quality
+        self.colors = colors
+        self.max_bytes = max_bytes
+        self.workers = workers
+        self._executor = None
+
+    @classmethod
+    def from_env(cls):
+        """
+        Build an encoder from SCREENSHOT_* environment variables
+
+        Returns:
+            ScreenshotEncoder: Encoder configured from the environment
+        """
+        colors = os.environ.get("SCREENSHOT_COLORS")
+        max_bytes = os.environ.get("SCREENSHOT_MAX_BYTES")
+        return cls(
+            format=os.environ.get("SCREENSHOT_FORMAT", "png"),
+            quality=int(os.environ.get("SCREENSHOT_QUALITY", "80")),
+            colors=int(colors) if colors else None,
+            max_bytes=int(max_bytes) if max_bytes else None,
+            workers=int(os.environ.get("SCREENSHOT_WORKERS", "2")),
+        )
+
+    def encode(self, image, size=None):
+        """
+        Encode a screenshot in the calling thread
+
+        Args:
+            image (PIL.Image): Screenshot to encode
+            size (tuple): Resample to this (width, height) before encoding
+
+        Returns:
+            EncodedImage: Encoded bytes and format
+        """
+        return encode_image(image, self.format, self.quality, self.colors, self.max_bytes, size)
+
+    async def encode_async(self, image, size=None, cache=None):
+        """
+        Encode a screenshot in the worker pool so the event loop keeps running
+
+        Args:
+            image (PIL.Image): Screenshot to encode
+            size (tuple): Resample to this (width, height) before encoding
+            cache (ScreenshotCache): Reuse the last encoding if the screen is unchanged
+
+        Returns:
+            EncodedImage: Encoded bytes and format
+        """
+        if cache is not None and cache.mode != "off":
+            settings = (self.format, self.quality, self.colors, self.max_bytes, size)
+            digest = frame_digest(image)
+            cached = cache.lookup(digest, settings)
+            if cached is not None:
+                return cached
+            return cache.store(digest, settings, await self.encode_async(image, size))
+        if not self.workers:
+            return await asyncio.to_thread(self.encode, image, size)
+        self.start()
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            self._executor, encode_image, image,
+            self.format, self.quality, self.colors, self.max_bytes, size
+        )
+
+    async def encode_delta(self, image, previous, size=None, max_fraction=DELTA_MAX_FRACTION):
+        """
+        Encode only the parts of a screenshot that changed since the previous one
+
+        Args:
+            image (PIL.Image): Screenshot to encode
+            previous (PIL.Image): Screenshot sent before it, at the same native size
+            size (tuple): (width, height) the full screenshot would be resampled to
+            max_fraction (float): Changed share of the screen above which the full frame is sent
+
+        Returns:
+            list: ((x, y, w, h), EncodedImage) per changed region in output coordinates,
+                empty when nothing changed, None when the full frame should be sent instead
+        """
+        if previous is None or previous.size != image.size:
+            return None
+        boxes = changed_regions(previous, image)
+        if sum(box_area(box) for box in boxes) > max_fraction * image.width * image.height:
+            return None
+        scale_x = size[0] / image.width if size else 1
+        scale_y = size[1] / image.height if size else 1
+        rects, jobs = [], []
+        for left, upper, right, lower in boxes:
+            x, y = int(left * scale_x), int(upper * scale_y)
+            w = max(1, round(right * scale_x) - x)
+            h = max(1, round(lower * scale_y) - y)
+            rects.append((x, y, w, h))
+            jobs.append(self.encode_async(image.crop((left, upper, right, lower)), size=(w, h)))
+        return list(zip(rects, await asyncio.gather(*jobs)))
+
+    def start(self):
+        """Start the worker processes now rather than on the first screenshot"""
+        if not self.workers or self._executor is not None:
+            return
+        # spawn, not fork: the VNC client runs a Twisted reactor thread
+        self._executor = ProcessPoolExecutor(
+            max_workers=self.workers,
+            mp_context=multiprocessing.get_context("spawn"),
+        )
+        for _ in range(self.workers):
+            self._executor.submit(int)
+
+    def shutdown(self):
+        """Stop the worker processes"""
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
@@ -0,0 +1,177 @@
+"""
+Input Batch Module for Computer Use MCP Server
+Builds sequences of RFB key and pointer events that are written to the socket at once
+"""
+from struct import pack
+from vncdotool.keys import KEYMAP
+
+# Characters typed as named keys rather than by their code point
+TYPED_KEYS = {
+    "\n": KEYMAP["enter"],
+    "\r": KEYMAP["enter"],
+    "\t": KEYMAP["tab"],
+    "\b": KEYMAP["bsp"],
+}
+
+
+# X keysym names and common spellings, matched case-insensitively alongside vncdotool's KEYMAP
+KEY_ALIASES = {
+    "escape": 0xFF1B, "return": 0xFF0D, "backspace": 0xFF08, "delete": 0xFFFF, "insert": 0xFF63,
+    "prior": 0xFF55, "page_up": 0xFF55, "pageup": 0xFF55, "next": 0xFF56, "page_down": 0xFF56,
+    "pagedown": 0xFF56, "print": 0xFF61, "menu": 0xFF67, "caps_lock": 0xFFE5, "num_lock": 0xFF7F,
+    "scroll_lock": 0xFF14, "sys_req": 0xFF15, "break": 0xFF6B,
+    "control": 0xFFE3, "control_l": 0xFFE3, "control_r": 0xFFE4,
+    "shift_l": 0xFFE1, "shift_r": 0xFFE2, "alt_l": 0xFFE9, "alt_r": 0xFFEA,
+    "meta_l": 0xFFE7, "meta_r": 0xFFE8, "super_l": 0xFFEB, "super_r": 0xFFEC,
+    "win": 0xFFEB, "windows": 0xFFEB, "cmd": 0xFFEB, "command": 0xFFEB,
+    "kp_enter": 0xFF8D, "kp_add": 0xFFAB, "kp_subtract": 0xFFAD, "kp_multiply": 0xFFAA,
+    "kp_divide": 0xFFAF, "kp_decimal": 0xFFAE,
+    **{f"kp_{digit}": 0xFFB0 + digit for digit in range(10)},
+    # F1-F35 are consecutive keysyms
+    **{f"f{number}": 0xFFBE + number - 1 for number in range(1, 36)},
+    # Punctuation by X keysym name, e.g. 'ctrl-plus'
+    "exclam": ord("!"), "quotedbl": ord('"'), "numbersign": ord("#"), "dollar": ord("$"),
+    "percent": ord("%"), "ampersand": ord("&"), "apostrophe": ord("'"), "parenleft": ord("("),
+    "parenright": ord(")"), "asterisk": ord("*"), "plus": ord("+"), "comma": ord(","),
+    "period": ord("."), "colon": ord(":"), "semicolon": ord(";"), "less": ord("<"),
+    "equal": ord("="), "greater": ord(">"), "question": ord("?"), "at": ord("@"),
+    "bracketleft": ord("["), "backslash": ord("\\"), "bracketright": ord("]"),
+    "asciicircum": ord("^"), "underscore": ord("_"), "grave": ord("`"), "braceleft": ord("{"),
+    "bar": ord("|"), "braceright": ord("}"), "asciitilde": ord("~"),
+}
+
+
+def keysym(key):
+    """
+    X11 keysym for a single character or a key name
+
+    A single character is taken literally, so 'A' and 'a' differ. Longer names are
+    looked up case-insensitively in vncdotool's KEYMAP ('esc', 'enter', 'pgdn') and
+    KEY_ALIASES (X keysym names such as 'Escape', 'Return', 'Page_Down', 'F13').
+    Latin-1 characters are their own keysym; other Unicode characters use the
+    0x01000000 + code point range X servers map to the right symbol.
+    """
+    if len(key) == 1:
+        if key in TYPED_KEYS:
+            return TYPED_KEYS[key]
+        code = ord(key)
+        return code if code <= 0xFF else 0x01000000 | code
+    name = key.lower()
+    if name in KEYMAP:
+        return KEYMAP[name]
+    if name in KEY_ALIASES:
+        return KEY_ALIASES[name]
+    raise ValueError(f"Unknown key: {key}")
+
+
+def split_keys(key):
+    """
+    Split a '-' joined combination into key names
+
+    A '-' right after a separator, or on its own, is the minus key itself:
+    'ctrl--' is ctrl and '-', 'ctrl-shift--' is ctrl, shift and '-'.
+    """
+    names = []
+    start = 0
+    while start < len(key):
+        # The first character of a name is never a separator
+        end = key.find("-", start + 1)
+        if end < 0:
+            end = len(key)
+        names.append(key[start:end])
+        start = end + 1
+    return names
+
+
+def decode_key(key):
+    """Keysyms for a key name or a '-' joined combination such as 'ctrl-c' or 'alt-F4'"""
+    return [keysym(k) for k in split_keys(key)]
+
+
+class InputBatch:
+    """
+    A sequence of key and pointer events, encoded as RFB client messages
+
+    Pointer events carry absolute positions and the full button mask, so the
+    batch tracks both starting from the pointer state it is created with.
+    """
+
+    def __init__(self, x=0, y=0, buttons=0):
+        """
+        Start an empty batch
+
+        Args:
+            x (int): Current pointer X coordinate
+            y (int): Current pointer Y coordinate
+            buttons (int): Currently pressed button mask
+        """
+        self.x = x
+        self.y = y
+        self.buttons = buttons
+        self.events = []
+
+    def __len__(self):
+        return len(self.events)
+
+    @property
+    def pointer(self):
+        """(x, y, buttons) after every event in the batch"""
+        return self.x, self.y, self.buttons
+
+    def _pointer_event(self):
+        self.events.append(pack("!BBHH", 5, self.buttons, self.x, self.y))
+
+    def _key_event(self, key, down):
+        self.events.append(pack("!BBxxI", 4, down, key))
+
+    def move(self, x, y):
+        self.x, self.y = x, y
+        self._pointer_event()
+        return self
+
+    def mouse_down(self, button):
+        self.buttons |= 1 << (button - 1)
+        self._pointer_event()
+        return self
+
+    def mouse_up(self, button):
+        self.buttons &= ~(1 << (button - 1))
+        self._pointer_event()
+        return self
+
+    def click(self, button=1, count=1):
+        for _ in range(count):
+            self.mouse_down(button)
+            self.mouse_up(button)
+        return self
+
+    def scroll(self, steps=1, direction="down"):
+        """Wheel clicks; X maps buttons 4-7 to up, down, left and right"""
+        button = {"up": 4, "down": 5, "left": 6, "right": 7}[direction]
+        return self.click(button, steps)
+
+    def key_down(self, key):
+        for sym in decode_key(key):
+            self._key_event(sym, True)
+        return self
+
+    def key_up(self, key):
+        for sym in reversed(decode_key(key)):
+            self._key_event(sym, False)
+        return self
+
+    def key(self, key):
+        """Press and release a key or combination such as 'ctrl-c'"""
+        return self.key_down(key).key_up(key)
+
+    def type(self, text):
+        """Press and release the key for every character of text"""
+        for char in text:
+            sym = keysym(char)
+            self._key_event(sym, True)
+            self._key_event(sym, False)
+        return self
+
+    def to_bytes(self):
+        """The whole batch as one buffer for a single socket write"""
+        return b"".join(self.events)
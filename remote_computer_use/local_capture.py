@@ -0,0 +1,241 @@
+"""
+Local Capture Module for Computer Use MCP Server
+Grabs an X display on the same host through the MIT-SHM extension, without VNC or SSH
+"""
+import asyncio
+import ctypes
+import ctypes.util
+import threading
+from PIL import Image, ImageGrab
+
+ZPIXMAP = 2
+ALL_PLANES = ctypes.c_ulong(-1).value
+IPC_PRIVATE = 0
+IPC_CREAT = 0o1000
+IPC_RMID = 0
+
+
+class XShmSegmentInfo(ctypes.Structure):
+    _fields_ = [
+        ("shmseg", ctypes.c_ulong),
+        ("shmid", ctypes.c_int),
+        ("shmaddr", ctypes.c_void_p),
+        ("readOnly", ctypes.c_int),
+    ]
+
+
+class XImage(ctypes.Structure):
+    # Leading fields of Xlib's XImage; the image is always allocated by Xlib
+    _fields_ = [
+        ("width", ctypes.c_int),
+        ("height", ctypes.c_int),
+        ("xoffset", ctypes.c_int),
+        ("format", ctypes.c_int),
+        ("data", ctypes.c_void_p),
+        ("byte_order", ctypes.c_int),
+        ("bitmap_unit", ctypes.c_int),
+        ("bitmap_bit_order", ctypes.c_int),
+        ("bitmap_pad", ctypes.c_int),
+        ("depth", ctypes.c_int),
+        ("bytes_per_line", ctypes.c_int),
+        ("bits_per_pixel", ctypes.c_int),
+        ("red_mask", ctypes.c_ulong),
+        ("green_mask", ctypes.c_ulong),
+        ("blue_mask", ctypes.c_ulong),
+    ]
+
+
+# Xlib's default error handler exits the process; errors are recorded here instead,
+# e.g. the BadAccess from XShmAttach when the X server cannot see this process's segments
+X_ERROR_HANDLER = ctypes.CFUNCTYPE(ctypes.c_int, ctypes.c_void_p, ctypes.c_void_p)
+_x_errors = []
+
+
+@X_ERROR_HANDLER
+def _record_x_error(display, event):
+    _x_errors.append(event)
+    return 0
+
+
+def _load_libraries():
+    """Load Xlib, its MIT-SHM extension and libc with the signatures used here"""
+    x11 = ctypes.CDLL(ctypes.util.find_library("X11"))
+    xext = ctypes.CDLL(ctypes.util.find_library("Xext"))
+    libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+    x11.XOpenDisplay.argtypes = [ctypes.c_char_p]
+    x11.XOpenDisplay.restype = ctypes.c_void_p
+    x11.XCloseDisplay.argtypes = [ctypes.c_void_p]
+    x11.XDefaultScreen.argtypes = [ctypes.c_void_p]
+    x11.XRootWindow.argtypes = [ctypes.c_void_p, ctypes.c_int]
+    x11.XRootWindow.restype = ctypes.c_ulong
+    x11.XDefaultVisual.argtypes = [ctypes.c_void_p, ctypes.c_int]
+    x11.XDefaultVisual.restype = ctypes.c_void_p
+    x11.XDefaultDepth.argtypes = [ctypes.c_void_p, ctypes.c_int]
+    x11.XDisplayWidth.argtypes = [ctypes.c_void_p, ctypes.c_int]
+    x11.XDisplayHeight.argtypes = [ctypes.c_void_p, ctypes.c_int]
+    x11.XSync.argtypes = [ctypes.c_void_p, ctypes.c_int]
+    x11.XDestroyImage.argtypes = [ctypes.POINTER(XImage)]
+    xext.XShmQueryExtension.argtypes = [ctypes.c_void_p]
+    xext.XShmCreateImage.argtypes = [ctypes.c_void_p, ctypes.c_void_p, ctypes.c_uint, ctypes.c_int,
+                                     ctypes.c_char_p, ctypes.POINTER(XShmSegmentInfo),
+                                     ctypes.c_uint, ctypes.c_uint]
+    xext.XShmCreateImage.restype = ctypes.POINTER(XImage)
+    xext.XShmAttach.argtypes = [ctypes.c_void_p, ctypes.POINTER(XShmSegmentInfo)]
+    xext.XShmDetach.argtypes = [ctypes.c_void_p, ctypes.POINTER(XShmSegmentInfo)]
+    xext.XShmGetImage.argtypes = [ctypes.c_void_p, ctypes.c_ulong, ctypes.POINTER(XImage),
+                                  ctypes.c_int, ctypes.c_int, ctypes.c_ulong]
+    libc.shmget.argtypes = [ctypes.c_int, ctypes.c_size_t, ctypes.c_int]
+    libc.shmat.argtypes = [ctypes.c_int, ctypes.c_void_p, ctypes.c_int]
+    libc.shmat.restype = ctypes.c_void_p
+    libc.shmdt.argtypes = [ctypes.c_void_p]
+    libc.shmctl.argtypes = [ctypes.c_int, ctypes.c_int, ctypes.c_void_p]
+    x11.XSetErrorHandler.argtypes = [X_ERROR_HANDLER]
+    x11.XSetErrorHandler.restype = ctypes.c_void_p
+    x11.XSetErrorHandler(_record_x_error)
+    return x11, xext, libc
+
+
+class LocalCapture:
+    """
+    Screenshots of an X display on this host, read through a shared memory segment
+
+    The X server copies the root window straight into memory mapped by this process,
+    so a capture costs one request and a memory copy: no encoding, no socket transfer.
+    Displays without MIT-SHM, e.g. a remote DISPLAY, are read with a plain GetImage.
+    Has the same interface as RemoteCapture, so it plugs into VNCController.frame_source.
+    """
+
+    def __init__(self, display_num):
+        """
+        Initialize a closed local capture
+
+        Args:
+            display_num (str): X display number to grab
+        """
+        self.display_num = display_num
+        self.frames = 0
+        self.shared_memory = None
+        self.error = None
+        self._display = None
+        self._image = None
+        self._shminfo = None
+        self._size = None
+        # Xlib connections are not safe to use from several threads at once
+        self._lock = threading.Lock()
+
+    async def start(self):
+        """Open the display and attach the shared memory segment"""
+        await asyncio.to_thread(self._open)
+
+    async def stop(self):
+        """Detach the shared memory segment and close the display"""
+        await asyncio.to_thread(self._close)
+
+    def _open(self):
+        with self._lock:
+            if self._display is not None:
+                return
+            self._x11, self._xext, self._libc = _load_libraries()
+            display = self._x11.XOpenDisplay(f":{self.display_num}".encode())
+            if not display:
+                raise Exception(f"Cannot open display :{self.display_num}")
+            self._display = display
+            screen = self._x11.XDefaultScreen(display)
+            self._root = self._x11.XRootWindow(display, screen)
+            self._size = (self._x11.XDisplayWidth(display, screen), self._x11.XDisplayHeight(display, screen))
+            self.shared_memory = bool(self._xext.XShmQueryExtension(display))
+            if self.shared_memory:
+                try:
+                    self._attach(screen)
+                except Exception as e:
+                    self.error = str(e)
+                    self.shared_memory = False
+
+    def _attach(self, screen):
+        x11, xext, libc = self._x11, self._xext, self._libc
+        display = self._display
+        shminfo = XShmSegmentInfo()
+        image = xext.XShmCreateImage(display, x11.XDefaultVisual(display, screen),
+                                     x11.XDefaultDepth(display, screen), ZPIXMAP, None,
+                                     ctypes.byref(shminfo), *self._size)
+        if not image:
+            raise Exception("XShmCreateImage failed")
+        shminfo.shmid = libc.shmget(IPC_PRIVATE, image.contents.bytes_per_line * image.contents.height,
+                                    IPC_CREAT | 0o600)
+        if shminfo.shmid < 0:
+            x11.XDestroyImage(image)
+            raise Exception(f"shmget failed: errno {ctypes.get_errno()}")
+        address = libc.shmat(shminfo.shmid, None, 0)
+        if address in (None, ctypes.c_void_p(-1).value):
+            libc.shmctl(shminfo.shmid, IPC_RMID, None)
+            x11.XDestroyImage(image)
+            raise Exception(f"shmat failed: errno {ctypes.get_errno()}")
+        shminfo.shmaddr = image.contents.data = address
+        shminfo.readOnly = 0
+        _x_errors.clear()
+        attached = xext.XShmAttach(display, ctypes.byref(shminfo))
+        x11.XSync(display, 0)
+        attached = attached and not _x_errors
+        # Marked for removal now, so the segment goes away with the last detach even on a crash
+        libc.shmctl(shminfo.shmid, IPC_RMID, None)
+        if not attached:
+            libc.shmdt(address)
+            x11.XDestroyImage(image)
+            raise Exception("XShmAttach failed")
+        self._image, self._shminfo = image, shminfo
+
+    def _close(self):
+        with self._lock:
+            if self._display is None:
+                return
+            if self._image:
+                self._xext.XShmDetach(self._display, ctypes.byref(self._shminfo))
+                self._x11.XSync(self._display, 0)
+                self._libc.shmdt(self._shminfo.shmaddr)
+                # The data pointer is ours, Xlib must not free it along with the image
+                self._image.contents.data = None
+                self._x11.XDestroyImage(self._image)
+                self._image = self._shminfo = None
+            self._x11.XCloseDisplay(self._display)
+            self._display = None
+
+    def _grab(self):
+        with self._lock:
+            if not self.shared_memory:
+                return ImageGrab.grab(xdisplay=f":{self.display_num}")
+            if not self._xext.XShmGetImage(self._display, self._root, self._image, 0, 0, ALL_PLANES):
+                raise Exception("XShmGetImage failed")
+            image = self._image.contents
+            if image.bits_per_pixel != 32:
+                raise Exception(f"Unsupported pixel layout: {image.bits_per_pixel} bits per pixel")
+            data = ctypes.string_at(image.data, image.bytes_per_line * image.height)
+            # 24-bit TrueColor on a little-endian server: blue, green, red, padding
+            return Image.frombuffer("RGB", self._size, data, "raw", "BGRX", image.bytes_per_line, 1)
+
+    async def capture(self):
+        """
+        Grab the current contents of the display
+
+        Returns:
+            PIL.Image: Screenshot image
+        """
+        if self._display is None:
+            await self.start()
+        image = await asyncio.to_thread(self._grab)
+        self.frames += 1
+        return image
+
+    def stats(self):
+        """
+        Report how frames are read
+
+        Returns:
+            dict: Display, whether MIT-SHM is used, frames captured, last setup error
+        """
+        return {
+            "source": "local",
+            "display": f":{self.display_num}",
+            "shared_memory": self.shared_memory,
+            "frames": self.frames,
+            "error": self.error,
+        }
@@ -0,0 +1,128 @@
+"""
+Local Controller Module for Computer Use MCP Server
+Runs commands and file I/O on this host, for desktops on the same machine as the server
+"""
+import asyncio
+import os
+import shutil
+import signal
+import tempfile
+from ssh_controller import SSHController
+
+
+class LocalController(SSHController):
+    """
+    Drop-in replacement for SSHController that runs everything as local subprocesses
+
+    Commands get the same result dicts as over SSH, so the tools work unchanged;
+    EditTool reads and writes files directly instead of through shell commands.
+    """
+
+    # Lets tools pick direct file I/O over shell round-trips
+    local = True
+
+    def __init__(self, display_num=1, shell=None):
+        """
+        Initialize local controller
+
+        Args:
+            display_num (str): X display number the desktop runs on
+            shell (str): Shell to run commands with, bash when installed, like an SSH login
+        """
+        super().__init__("localhost", None, None, None, None, display_num)
+        self.shell = shell or shutil.which("bash") or "/bin/sh"
+        # Commands start in the home directory, as they would over SSH
+        self.cwd = os.path.expanduser("~")
+
+    async def connect(self):
+        """
+        Nothing to connect to; marks the controller ready
+
+        Returns:
+            bool: Always True
+        """
+        self.client = True
+        return True
+
+    async def disconnect(self):
+        """Nothing to close"""
+        self.client = None
+
+    async def execute_command(self, command, input=None):
+        """
+        Execute command on this host
+
+        Args:
+            command (str): Command to execute
+            input (str): Text streamed to the command's stdin, which is then closed
+
+        Returns:
+            dict: Command execution result
+        """
+        try:
+            process = await asyncio.create_subprocess_exec(
+                self.shell, "-c", command,
+                stdin=asyncio.subprocess.PIPE if input is not None else asyncio.subprocess.DEVNULL,
+                stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.PIPE,
+                cwd=self.cwd,
+                start_new_session=True,
+            )
+            try:
+                output, error = await process.communicate(input.encode() if input is not None else None)
+            except asyncio.CancelledError:
+                # A timed out command is killed along with everything it started
+                os.killpg(process.pid, signal.SIGKILL)
+                await process.wait()
+                raise
+
+            output = output.decode(errors="replace") if output else ""
+            error = error.decode(errors="replace") if error else ""
+
+            if error:
+                return {"success": False, "error": error, "output": output}
+            return {"success": True, "output": output}
+        except Exception as e:
+            return {"success": False, "error": str(e)}
+
+    async def read_file(self, path):
+        """
+        Read a text file
+
+        Args:
+            path (str): Absolute path
+
+        Returns:
+            str: File content
+        """
+        def read():
+            with open(path, encoding="utf-8", errors="replace") as f:
+                return f.read()
+        return await asyncio.to_thread(read)
+
+    async def write_file(self, path, content):
+        """
+        Write a text file atomically, creating parent directories if needed
+
+        Args:
+            path (str): Absolute path
+            content (str): New file content
+        """
+        def write():
+            directory = os.path.dirname(path) or "/"
+            os.makedirs(directory, exist_ok=True)
+            fd, temporary = tempfile.mkstemp(dir=directory, prefix=".edit_tool_")
+            try:
+                with os.fdopen(fd, "w", encoding="utf-8") as f:
+                    f.write(content)
+                if os.path.exists(path):
+                    shutil.copymode(path, temporary)
+                else:
+                    # mkstemp creates the file readable by its owner only
+                    os.chmod(temporary, 0o644)
+                os.replace(temporary, path)
+            except BaseException:
+                if os.path.exists(temporary):
+                    os.remove(temporary)
+                raise
+        await asyncio.to_thread(write)
@@ -0,0 +1,280 @@
+"""
+Screen Recorder Module for Computer Use MCP Server
+Records the remote screen into a bounded, memory-mapped ring of keyframes and XOR delta frames
+"""
+import asyncio
+import mmap
+import os
+import struct
+import tempfile
+import threading
+import time
+import zlib
+from collections import deque
+from dataclasses import dataclass
+import numpy as np
+from PIL import Image
+
+# Every record in the file starts with magic, sequence number, timestamp, width,
+# height, keyframe flag and payload length, so the file can be inspected on its own
+RECORD_HEADER = struct.Struct("<4sIdHHBxxxI")
+RECORD_MAGIC = b"SREC"
+# Frames between keyframes; replay decodes at most this many deltas to reach a frame
+KEYFRAME_INTERVAL = 60
+# zlib level for frame payloads: XOR deltas are mostly zeros, so the fastest level
+# already shrinks them well and keeps recording cheap
+COMPRESSION_LEVEL = 1
+
+
+@dataclass(frozen=True)
+class RecordedFrame:
+    """Where a recorded frame lives in the ring file"""
+    seq: int
+    time: float
+    offset: int
+    length: int
+    width: int
+    height: int
+    keyframe: bool
+
+
+class ScreenRecorder:
+    """
+    Captures the screen at a fixed rate into a ring file of at most max_bytes
+
+    Keyframes hold a whole compressed RGB frame; other frames hold the compressed
+    XOR against the frame before them. Unchanged screens are not recorded at all.
+    When the ring is full the oldest frames are overwritten, along with any deltas
+    left without their keyframe.
+    """
+
+    def __init__(self, vnc, path=None, fps=2.0, max_bytes=256 * 1024 * 1024,
+                 keyframe_interval=KEYFRAME_INTERVAL, name=None):
+        """
+        Initialize a stopped recorder
+
+        Args:
+            vnc (VNCController): Controller to capture frames from
+            path (str): Ring file location, None for a temp file removed on stop
+            fps (float): Frames captured per second
+            max_bytes (int): Size of the ring file
+            keyframe_interval (int): Frames between keyframes
+            name (str): Desktop name for the temp file, when one process records several desktops
+        """
+        if fps <= 0:
+            raise ValueError("Recording fps must be positive")
+        self.vnc = vnc
+        # A temp file is removed on stop, an explicit path is kept for later inspection
+        self._temporary = path is None
+        suffix = f"-{name}" if name else ""
+        self.path = path or os.path.join(tempfile.gettempdir(), f"screen-recording-{os.getpid()}{suffix}.bin")
+        self.fps = fps
+        self.max_bytes = max_bytes
+        self.keyframe_interval = keyframe_interval
+        self.frames = deque()
+        self.dropped = 0
+        self._seq = 0
+        self._head = 0
+        self._since_keyframe = 0
+        self._previous = None
+        self._frame_seq = None
+        self._decoded = None
+        # Frames are written in a worker thread while replay reads them
+        self._lock = threading.Lock()
+        self._file = None
+        self._map = None
+        self._task = None
+
+    @classmethod
+    def from_env(cls, vnc, name=None):
+        """
+        Build a recorder from RECORD_* environment variables
+
+        Args:
+            vnc (VNCController): Controller to capture frames from
+            name (str): Desktop name added to the file name, for one recording per pooled desktop
+
+        Returns:
+            ScreenRecorder: Recorder configured from the environment, None when RECORD_FPS is unset or 0
+        """
+        fps = float(os.environ.get("RECORD_FPS", "0"))
+        if fps <= 0:
+            return None
+        path = os.environ.get("RECORD_PATH") or None
+        if path and name:
+            root, extension = os.path.splitext(path)
+            path = f"{root}-{name}{extension}"
+        return cls(
+            vnc,
+            path=path,
+            name=name,
+            fps=fps,
+            max_bytes=int(float(os.environ.get("RECORD_MAX_MB", "256")) * 1024 * 1024),
+            keyframe_interval=int(os.environ.get("RECORD_KEYFRAME_INTERVAL", str(KEYFRAME_INTERVAL))),
+        )
+
+    def start(self):
+        """Create the ring file and start capturing in the background"""
+        if self._task is not None:
+            return
+        self._file = open(self.path, "w+b")
+        self._file.truncate(self.max_bytes)
+        self._map = mmap.mmap(self._file.fileno(), self.max_bytes)
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Stop capturing and release the ring file"""
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+        self._map.close()
+        self._file.close()
+        self._map = self._file = None
+        if self._temporary:
+            os.remove(self.path)
+
+    async def _run(self):
+        interval = 1 / self.fps
+        while True:
+            started = time.monotonic()
+            try:
+                await self.capture()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"Screen recording error: {e}")
+            await asyncio.sleep(max(0.0, interval - (time.monotonic() - started)))
+
+    async def capture(self):
+        """
+        Record the current screen if it changed since the last recorded frame
+
+        Returns:
+            RecordedFrame: The frame written, None when the screen was unchanged
+        """
+        vnc = self.vnc
+        # With the mirror running an unchanged frame_seq means unchanged pixels
+        if vnc.mirror and self._frame_seq is not None and vnc.frame_seq == self._frame_seq:
+            return None
+        self._frame_seq = vnc.frame_seq
+        image = await vnc.capture_screenshot()
+        pixels = np.asarray(image.convert("RGB"))
+        return await asyncio.to_thread(self._write, pixels)
+
+    def _write(self, pixels):
+        """Compress a frame against the previous one and append it to the ring"""
+        previous = self._previous
+        keyframe = (previous is None or previous.shape != pixels.shape
+                    or self._since_keyframe + 1 >= self.keyframe_interval)
+        if keyframe:
+            payload = pixels
+        else:
+            payload = np.bitwise_xor(pixels, previous)
+            if not payload.any():
+                return None
+        data = zlib.compress(payload.tobytes(), COMPRESSION_LEVEL)
+        height, width = pixels.shape[:2]
+        size = RECORD_HEADER.size + len(data)
+        if size > self.max_bytes:
+            raise ValueError(f"Frame of {size} bytes does not fit a {self.max_bytes} byte recording")
+
+        with self._lock:
+            self._reclaim(size)
+            orphaned = not keyframe and not self.frames
+            if not orphaned:
+                frame = RecordedFrame(self._seq, time.time(), self._head, size, width, height,
+                                      keyframe)
+                self._map[self._head:self._head + RECORD_HEADER.size] = RECORD_HEADER.pack(
+                    RECORD_MAGIC, frame.seq, frame.time, width, height, keyframe, len(data))
+                self._map[self._head + RECORD_HEADER.size:self._head + size] = data
+                self.frames.append(frame)
+                self._head += size
+        if orphaned:
+            # The ring wrapped over the keyframe this delta builds on
+            self._previous = None
+            return self._write(pixels)
+        self._seq += 1
+        self._since_keyframe = 0 if keyframe else self._since_keyframe + 1
+        self._previous = pixels
+        return frame
+
+    def _reclaim(self, size):
+        """Drop the oldest frames until `size` bytes are free at the write position"""
+        frames = self.frames
+        if self._head + size > self.max_bytes:
+            # Wrap around; the frames still past the write position are the oldest
+            while frames and frames[0].offset >= self._head:
+                frames.popleft()
+                self.dropped += 1
+            self._head = 0
+        while frames and self._head <= frames[0].offset < self._head + size:
+            frames.popleft()
+            self.dropped += 1
+        # Deltas are useless without the keyframe they build on
+        while frames and not frames[0].keyframe:
+            frames.popleft()
+            self.dropped += 1
+
+    def _payload(self, frame):
+        start = frame.offset + RECORD_HEADER.size
+        data = zlib.decompress(self._map[start:frame.offset + frame.length])
+        return np.frombuffer(data, dtype=np.uint8).reshape(frame.height, frame.width, 3)
+
+    def frame(self, seq):
+        """
+        Reconstruct a recorded frame from its keyframe and the deltas after it
+
+        Sequential replay only applies one delta per frame, as the last decoded
+        frame is kept.
+
+        Args:
+            seq (int): Sequence number from the index
+
+        Returns:
+            tuple: (RecordedFrame, PIL.Image)
+        """
+        with self._lock:
+            frames = self.frames
+            if not frames or not frames[0].seq <= seq <= frames[-1].seq:
+                raise ValueError(f"Frame {seq} is not in the recording")
+            # Sequence numbers are consecutive within the ring
+            position = seq - frames[0].seq
+            start = position
+            while not frames[start].keyframe:
+                start -= 1
+            pixels = None
+            if self._decoded is not None and frames[start].seq <= self._decoded[0] <= seq:
+                decoded_seq, pixels = self._decoded
+                start = decoded_seq - frames[0].seq + 1
+            for i in range(start, position + 1):
+                payload = self._payload(frames[i])
+                pixels = payload.copy() if frames[i].keyframe else np.bitwise_xor(pixels, payload)
+            self._decoded = (seq, pixels)
+            return frames[position], Image.fromarray(pixels)
+
+    def index(self):
+        """
+        Describe what the ring currently holds
+
+        Returns:
+            dict: Recording settings, usage and one entry per frame
+        """
+        with self._lock:
+            frames = list(self.frames)
+        return {
+            "path": self.path,
+            "fps": self.fps,
+            "max_bytes": self.max_bytes,
+            "used_bytes": sum(frame.length for frame in frames),
+            "dropped_frames": self.dropped,
+            "frames": [
+                {"seq": frame.seq, "time": frame.time, "keyframe": frame.keyframe,
+                 "bytes": frame.length, "width": frame.width, "height": frame.height}
+                for frame in frames
+            ],
+        }
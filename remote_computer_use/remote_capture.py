@@ -0,0 +1,223 @@
+"""
+Remote Capture Module for Computer Use MCP Server
+Grabs the X display on the remote host and streams compressed frames back over SSH
+"""
+import asyncio
+import io
+import os
+import threading
+from PIL import Image
+
+# Stream codec -> ffmpeg encoder
+CODECS = {
+    "png": "png",
+    "jpeg": "mjpeg",
+}
+
+PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+PNG_END = b"IEND"
+JPEG_START = b"\xff\xd8"
+JPEG_END = b"\xff\xd9"
+# Bytes read from the SSH channel at a time
+READ_SIZE = 1 << 16
+# Frames that must arrive after a capture request before one is trusted to be newer
+# than the request: the first may have been grabbed before it and still in flight
+FRESH_FRAMES = 2
+
+
+def split_frames(buffer, codec):
+    """
+    Cut complete frames off the front of a stream buffer
+
+    Args:
+        buffer (bytearray): Stream bytes received so far, consumed in place
+        codec (str): One of CODECS
+
+    Returns:
+        list: Encoded frames, complete ones only
+    """
+    frames = []
+    while True:
+        if codec == "png":
+            if len(buffer) < len(PNG_SIGNATURE):
+                break
+            # Walk the chunks: 4 byte length, 4 byte type, data, 4 byte CRC
+            position = len(PNG_SIGNATURE)
+            end = None
+            while position + 8 <= len(buffer):
+                length = int.from_bytes(buffer[position:position + 4], "big")
+                chunk_type = bytes(buffer[position + 4:position + 8])
+                position += 12 + length
+                if chunk_type == PNG_END:
+                    end = position if position <= len(buffer) else None
+                    break
+        else:
+            end = buffer.find(JPEG_END, len(JPEG_START))
+            end = end + len(JPEG_END) if end >= 0 else None
+        if end is None:
+            break
+        frames.append(bytes(buffer[:end]))
+        del buffer[:end]
+    return frames
+
+
+class RemoteCapture:
+    """
+    Screenshots from an ffmpeg x11grab process on the remote host
+
+    x11grab reads the display through the MIT-SHM extension when the X server
+    offers it, and every frame is compressed before it leaves the remote host.
+    The stream runs continuously at `fps`; a capture waits for a frame grabbed
+    after it was requested.
+    """
+
+    def __init__(self, ssh, display_num, codec="jpeg", quality=80, fps=5.0):
+        """
+        Initialize a stopped remote capture
+
+        Args:
+            ssh (SSHController): Connected SSH controller for the desktop host
+            display_num (str): X display number to grab
+            codec (str): 'jpeg' or 'png', how frames are compressed on the remote host
+            quality (int): JPEG quality, 1-100
+            fps (float): Frames grabbed per second
+        """
+        if codec not in CODECS:
+            raise ValueError(f"Unsupported remote capture codec: {codec}")
+        self.ssh = ssh
+        self.display_num = display_num
+        self.codec = codec
+        self.quality = quality
+        self.fps = fps
+        self.frames = 0
+        self.bytes_received = 0
+        self.error = None
+        self._latest = None
+        self._ended = False
+        self._channel = None
+        self._thread = None
+        self._loop = None
+        self._arrived = None
+
+    @classmethod
+    def from_env(cls, ssh, display_num):
+        """
+        Build a remote capture from SCREENSHOT_SOURCE and REMOTE_CAPTURE_* environment variables
+
+        Returns:
+            RemoteCapture: Capture configured from the environment, None unless SCREENSHOT_SOURCE=ssh
+        """
+        if os.environ.get("SCREENSHOT_SOURCE", "vnc") != "ssh":
+            return None
+        return cls(
+            ssh,
+            display_num,
+            codec=os.environ.get("REMOTE_CAPTURE_CODEC", "jpeg"),
+            quality=int(os.environ.get("REMOTE_CAPTURE_QUALITY", "80")),
+            fps=float(os.environ.get("REMOTE_CAPTURE_FPS", "5")),
+        )
+
+    def command(self):
+        """Shell command that runs the grabber on the remote host"""
+        display = f":{self.display_num}"
+        options = ""
+        if self.codec == "jpeg":
+            # ffmpeg's MJPEG scale runs from 2 (best) to 31 (worst)
+            options = f" -q:v {round(31 - self.quality / 100 * 29)}"
+        return (f"DISPLAY={display} exec ffmpeg -loglevel error -nostdin -f x11grab -draw_mouse 1 "
+                f"-framerate {self.fps} -i {display} -f image2pipe -c:v {CODECS[self.codec]}{options} -")
+
+    async def start(self):
+        """Start the remote grabber and the thread that reads its frames"""
+        if self._thread is not None:
+            return
+        if not self.ssh.client:
+            success = await self.ssh.connect()
+            if not success:
+                raise Exception("Failed to connect to SSH server")
+        self._loop = asyncio.get_running_loop()
+        self._arrived = asyncio.Condition()
+        self.error = None
+        self._ended = False
+        self._channel = await asyncio.to_thread(self.ssh.client.get_transport().open_session)
+        await asyncio.to_thread(self._channel.exec_command, self.command())
+        self._thread = threading.Thread(target=self._read, name="remote-capture", daemon=True)
+        self._thread.start()
+
+    async def stop(self):
+        """Stop the remote grabber"""
+        if self._channel is not None:
+            await asyncio.to_thread(self._channel.close)
+        if self._thread is not None:
+            await asyncio.to_thread(self._thread.join)
+        self._channel = self._thread = None
+
+    @property
+    def running(self):
+        return self._thread is not None and not self._ended
+
+    def _read(self):
+        buffer = bytearray()
+        channel = self._channel
+        try:
+            while True:
+                data = channel.recv(READ_SIZE)
+                if not data:
+                    break
+                self.bytes_received += len(data)
+                buffer += data
+                for frame in split_frames(buffer, self.codec):
+                    self._loop.call_soon_threadsafe(self._loop.create_task, self._publish(frame))
+            if channel.recv_stderr_ready():
+                self.error = channel.recv_stderr(READ_SIZE).decode(errors="replace").strip()
+        except Exception as e:
+            self.error = str(e)
+        self.error = self.error or "Remote capture stream ended"
+        self._ended = True
+        self._loop.call_soon_threadsafe(self._loop.create_task, self._publish(None))
+
+    async def _publish(self, frame):
+        async with self._arrived:
+            if frame is not None:
+                self.frames += 1
+                self._latest = frame
+            self._arrived.notify_all()
+
+    async def capture(self, timeout=5.0):
+        """
+        Return a frame grabbed after this call
+
+        Args:
+            timeout (float): Seconds to wait for the stream
+
+        Returns:
+            PIL.Image: Screenshot image
+        """
+        if not self.running:
+            await self.stop()
+            await self.start()
+        target = self.frames + FRESH_FRAMES
+        async with self._arrived:
+            await asyncio.wait_for(
+                self._arrived.wait_for(lambda: self.frames >= target or not self.running), timeout)
+        if self.frames < target:
+            raise Exception(f"Remote capture failed: {self.error}")
+        image = await asyncio.to_thread(Image.open, io.BytesIO(self._latest))
+        await asyncio.to_thread(image.load)
+        return image
+
+    def stats(self):
+        """
+        Report stream traffic
+
+        Returns:
+            dict: Codec, frame rate, frames and bytes received, last error
+        """
+        return {
+            "codec": self.codec,
+            "fps": self.fps,
+            "frames": self.frames,
+            "bytes_received": self.bytes_received,
+            "bytes_per_frame": self.bytes_received // self.frames if self.frames else None,
+            "error": self.error,
+        }
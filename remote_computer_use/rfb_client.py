@@ -0,0 +1,419 @@
+"""
+Asyncio RFB Client Module for Computer Use MCP Server
+Speaks the VNC (RFB 3.3-3.8) protocol directly on the event loop
+"""
+import asyncio
+import time
+from collections import deque
+from struct import pack, unpack
+import numpy as np
+from PIL import Image
+from vncdotool.client import RGB32, BGR16 as PIXEL_FORMAT_BGR16, AuthenticationError, ProtocolError
+from vncdotool.rfb import Encoding, PixelFormat, _vnc_des, des_encrypt
+from frame_diff import rects_area
+from input_batch import decode_key
+
+# Encodings this client decodes; everything else in a preference list is rejected
+SUPPORTED_ENCODINGS = (Encoding.RAW, Encoding.COPY_RECTANGLE)
+# Pseudo-encodings always offered after the configured ones
+PSEUDO_ENCODINGS = (Encoding.PSEUDO_DESKTOP_SIZE, Encoding.PSEUDO_LAST_RECT)
+# Same limits as the vncdotool backend, see vnc_controller
+DIRTY_HISTORY = 256
+STATS_HISTORY = 256
+
+SECURITY_NONE = 1
+SECURITY_VNC = 2
+
+
+class AsyncRFBClient:
+    """
+    VNC client whose commands are coroutines on the running event loop
+
+    It offers the command surface VNCController uses on the vncdotool client
+    (captureImage, snapshotImage, startMirror, mouse and key events), so the
+    controller can drive either backend. Updates are decoded with Pillow's raw
+    decoders straight into an in-memory screen image.
+    """
+
+    def __init__(self, encodings=None, pixel_format=None):
+        """
+        Initialize an unconnected client
+
+        Args:
+            encodings (list): rfb.Encoding preference from SUPPORTED_ENCODINGS, None for raw
+            pixel_format (rfb.PixelFormat): Format to request, None keeps the server's
+                native format when it is true color
+        """
+        for encoding in encodings or []:
+            if encoding not in SUPPORTED_ENCODINGS:
+                raise ValueError(f"The asyncio VNC backend cannot decode {Encoding(encoding).name}")
+        self.encodings = list(encodings or [Encoding.RAW])
+        self.pixel_format = pixel_format
+        self.width = 0
+        self.height = 0
+        self.name = b""
+        self.screen = None
+        self._rawmode = None
+        self.capture = None
+        self.cut_text = ""
+        self.x = 0
+        self.y = 0
+        self.buttons = 0
+        # Same bookkeeping as vnc_controller.FramebufferClient
+        self.frame_seq = 0
+        self.dirty_rects = deque(maxlen=DIRTY_HISTORY)
+        self.bytes_received = 0
+        self.updates = 0
+        self.update_history = deque(maxlen=STATS_HISTORY)
+        self.mirroring = False
+        self.mirror_interval = 0.05
+        self._mirror_call = None
+        self._requested_at = None
+        self._waiters = []
+        self._reader = None
+        self._writer = None
+        self._task = None
+        self._closed = True
+
+    @property
+    def protocol(self):
+        """The client itself, standing in for the threaded vncdotool proxy's protocol"""
+        return self
+
+    async def connect(self, host, port, password=None, timeout=10.0):
+        """
+        Open the connection, authenticate and start reading server messages
+
+        Args:
+            host (str): VNC server hostname or IP
+            port (int): VNC server port
+            password (str): VNC password, None when the server needs none
+            timeout (float): Seconds allowed for connecting and the handshake
+
+        Returns:
+            AsyncRFBClient: This client
+        """
+        self._reader, self._writer = await asyncio.wait_for(
+            asyncio.open_connection(host, port), timeout
+        )
+        self._closed = False
+        try:
+            await asyncio.wait_for(self._handshake(password), timeout)
+        except BaseException:
+            await self.disconnect()
+            raise
+        self._task = asyncio.create_task(self._read_messages())
+        return self
+
+    async def disconnect(self):
+        """Close the connection"""
+        self.stopMirror()
+        self._closed = True
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        if self._writer is not None:
+            self._writer.close()
+            try:
+                await self._writer.wait_closed()
+            except (ConnectionError, OSError):
+                pass
+            self._writer = None
+        self._fail_waiters(ConnectionError("VNC connection closed"))
+        return self
+
+    async def _read(self, size):
+        data = await self._reader.readexactly(size)
+        self.bytes_received += size
+        return data
+
+    async def _read_reason(self):
+        (length,) = unpack("!I", await self._read(4))
+        return (await self._read(length)).decode("utf-8", "replace")
+
+    async def _handshake(self, password):
+        version = await self._read(12)
+        if not version.startswith(b"RFB "):
+            raise ProtocolError(f"invalid initial server response {version!r}")
+        server_version = (int(version[4:7]), int(version[8:11]))
+        # Anything newer (or Apple's 3.889) talks 3.8
+        minor = 8 if server_version >= (3, 8) else 7 if server_version >= (3, 7) else 3
+        self._writer.write(b"RFB 003.%03d\n" % minor)
+
+        if minor >= 7:
+            (count,) = await self._read(1)
+            if count == 0:
+                raise ProtocolError(f"Connection refused: {await self._read_reason()}")
+            offered = await self._read(count)
+            if SECURITY_VNC in offered:
+                security = SECURITY_VNC
+            elif SECURITY_NONE in offered:
+                security = SECURITY_NONE
+            else:
+                raise ProtocolError(f"unsupported security types: {list(offered)}")
+            self._writer.write(pack("!B", security))
+        else:
+            (security,) = unpack("!I", await self._read(4))
+            if security == 0:
+                raise ProtocolError(f"Connection refused: {await self._read_reason()}")
+
+        if security == SECURITY_VNC:
+            if password is None:
+                raise AuthenticationError("password required, but none provided")
+            challenge = await self._read(16)
+            self._writer.write(des_encrypt(_vnc_des(password), challenge))
+        if security == SECURITY_VNC or minor >= 8:
+            (result,) = unpack("!I", await self._read(4))
+            if result != 0:
+                reason = await self._read_reason() if minor >= 8 else "authentication failed"
+                raise AuthenticationError(reason)
+
+        # Shared session, so other viewers stay connected
+        self._writer.write(pack("!B", 1))
+        self.width, self.height, native, name_length = unpack("!HH16sI", await self._read(24))
+        self.name = await self._read(name_length)
+        native = PixelFormat.from_bytes(native)
+        if self.pixel_format is None:
+            self.pixel_format = native if native.truecolor and native.bpp in (16, 32) else RGB32
+        if self.pixel_format != native:
+            self._writer.write(pack("!Bxxx16s", 0, self.pixel_format.to_bytes()))
+        encodings = [*self.encodings, *PSEUDO_ENCODINGS]
+        self._writer.write(pack(f"!BxH{len(encodings)}i", 2, len(encodings), *encodings))
+        self._rawmode = self._pil_rawmode(self.pixel_format)
+        self.screen = Image.new("RGB", (self.width, self.height))
+        await self._writer.drain()
+
+    async def _read_messages(self):
+        try:
+            while True:
+                (message,) = await self._read(1)
+                if message == 0:
+                    await self._read_update()
+                elif message == 1:
+                    # Colour map entries, unused with a true color pixel format
+                    _, _, count = unpack("!xHH", await self._read(5))
+                    await self._read(6 * count)
+                elif message == 2:
+                    pass  # bell
+                elif message == 3:
+                    (length,) = unpack("!xxxI", await self._read(7))
+                    self.cut_text = (await self._read(length)).decode("latin-1")
+                else:
+                    raise ProtocolError(f"unknown message received {message}")
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            self._closed = True
+            self.stopMirror()
+            self._fail_waiters(e if isinstance(e, ProtocolError) else ConnectionError(f"VNC connection lost: {e}"))
+
+    async def _read_update(self):
+        start_bytes = self.bytes_received - 1
+        (count,) = unpack("!xH", await self._read(3))
+        bypp = self.pixel_format.bypp
+        rectangles = []
+        while count:
+            count -= 1
+            x, y, w, h, encoding = unpack("!HHHHi", await self._read(12))
+            if encoding == Encoding.RAW:
+                data = await self._read(w * h * bypp)
+                if w and h:
+                    self.screen.paste(self._decode_pixels(data, w, h), (x, y))
+                rectangles.append((x, y, w, h))
+            elif encoding == Encoding.COPY_RECTANGLE:
+                src_x, src_y = unpack("!HH", await self._read(4))
+                self.screen.paste(self.screen.crop((src_x, src_y, src_x + w, src_y + h)), (x, y))
+                rectangles.append((x, y, w, h))
+            elif encoding == Encoding.PSEUDO_DESKTOP_SIZE:
+                self._resize(w, h)
+            elif encoding == Encoding.PSEUDO_LAST_RECT:
+                break
+            else:
+                raise ProtocolError(f"unsupported encoding received {encoding}")
+        self._commit(rectangles, self.bytes_received - start_bytes)
+
+    @staticmethod
+    def _pil_rawmode(pf):
+        """Pillow raw decoder for a pixel format, None when NumPy has to unpack it"""
+        if pf.bpp == 32 and (pf.redmax, pf.greenmax, pf.bluemax) == (255, 255, 255):
+            order = {shift // 8: channel for shift, channel in
+                     ((pf.redshift, "R"), (pf.greenshift, "G"), (pf.blueshift, "B"))}
+            rawmode = "".join(order.get(i, "X") for i in range(4))
+            rawmode = rawmode[::-1] if pf.bigendian else rawmode
+            if rawmode in ("RGBX", "BGRX", "XRGB", "XBGR"):
+                return rawmode
+        if pf == PIXEL_FORMAT_BGR16:
+            return "BGR;16"
+        return None
+
+    def _decode_pixels(self, data, w, h):
+        """Convert a rectangle of wire pixels to an RGB image"""
+        if self._rawmode:
+            return Image.frombuffer("RGB", (w, h), data, "raw", self._rawmode, 0, 1)
+        pf = self.pixel_format
+        dtype = {8: "u1", 16: "u2", 32: "u4"}[pf.bpp]
+        values = np.frombuffer(data, dtype=(">" if pf.bigendian else "<") + dtype).reshape(h, w).astype(np.uint32)
+        return Image.fromarray(np.stack([((values >> shift) & limit) * 255 // limit for shift, limit in (
+            (pf.redshift, pf.redmax), (pf.greenshift, pf.greenmax), (pf.blueshift, pf.bluemax)
+        )], axis=-1).astype(np.uint8))
+
+    def _resize(self, width, height):
+        resized = Image.new("RGB", (width, height))
+        resized.paste(self.screen, (0, 0))
+        self.screen, self.width, self.height = resized, width, height
+
+    def _commit(self, rectangles, size):
+        latency = time.perf_counter() - self._requested_at if self._requested_at else None
+        self._requested_at = None
+        self.updates += 1
+        self.update_history.append((size, rects_area(rectangles), latency))
+        if rectangles:
+            self.frame_seq += 1
+            for rect in rectangles:
+                self.dirty_rects.append((self.frame_seq, rect))
+            waiters, self._waiters = self._waiters, []
+            for waiter in waiters:
+                if not waiter.done():
+                    waiter.set_result(self)
+        elif self._waiters:
+            # Nothing was painted; ask again until a capture has pixels to show
+            self.framebufferUpdateRequest()
+        if self.mirroring and self._mirror_call is None:
+            loop = asyncio.get_running_loop()
+            self._mirror_call = loop.call_later(self.mirror_interval, self._request_mirror_update)
+
+    def _fail_waiters(self, error):
+        waiters, self._waiters = self._waiters, []
+        for waiter in waiters:
+            if not waiter.done():
+                waiter.set_exception(error)
+
+    def _send(self, data):
+        if self._closed:
+            raise ConnectionError("VNC connection closed")
+        self._writer.write(data)
+
+    def framebufferUpdateRequest(self, x=0, y=0, width=None, height=None, incremental=False):
+        if not incremental and self._requested_at is None:
+            self._requested_at = time.perf_counter()
+        width = self.width if width is None else width
+        height = self.height if height is None else height
+        self._send(pack("!BBHHHH", 3, incremental, x, y, width, height))
+
+    def _image(self, box=None):
+        return self.screen.crop(box) if box else self.screen.copy()
+
+    async def captureImage(self, incremental=False, box=None):
+        """
+        Request a framebuffer update and keep a copy of the screen in `capture`
+
+        Args:
+            incremental (bool): Only request regions changed since the last update
+            box (tuple): Optional (left, upper, right, lower) crop box
+
+        Returns:
+            AsyncRFBClient: This client, with `capture` holding the PIL.Image
+        """
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        self.framebufferUpdateRequest(incremental=incremental)
+        await waiter
+        self.capture = self._image(box)
+        return self
+
+    async def snapshotImage(self, box=None):
+        """Copy the mirrored framebuffer into `capture` without asking the server for anything"""
+        self.capture = self._image(box)
+        return self
+
+    async def startMirror(self, interval=None):
+        """
+        Keep the framebuffer in sync with incremental update requests
+
+        Returns:
+            AsyncRFBClient: This client, once the first full frame arrived
+        """
+        if interval is not None:
+            self.mirror_interval = interval
+        self.mirroring = True
+        await self.captureImage()
+        return self
+
+    def stopMirror(self):
+        """Stop issuing incremental update requests"""
+        self.mirroring = False
+        if self._mirror_call is not None:
+            self._mirror_call.cancel()
+            self._mirror_call = None
+        return self
+
+    def _request_mirror_update(self):
+        self._mirror_call = None
+        if self.mirroring and not self._closed:
+            self.framebufferUpdateRequest(incremental=True)
+
+    def pointerEvent(self, x, y, buttonmask=0):
+        self._send(pack("!BBHH", 5, buttonmask, x, y))
+
+    def keyEvent(self, key, down=True):
+        self._send(pack("!BBxxI", 4, down, key))
+
+    @staticmethod
+    def _decode_key(key):
+        """Key name or character to keysyms, with vncdotool's names and '-' combinations"""
+        return decode_key(key)
+
+    async def sendEvents(self, data, pointer=None):
+        """
+        Write a pre-encoded batch of input events in one write
+
+        Args:
+            data (bytes): RFB key and pointer event messages
+            pointer (tuple): (x, y, buttons) pointer state after the batch
+        """
+        self._send(data)
+        if pointer is not None:
+            self.x, self.y, self.buttons = pointer
+        return await self._flush()
+
+    async def _flush(self):
+        await self._writer.drain()
+        return self
+
+    async def mouseMove(self, x, y):
+        self.x, self.y = x, y
+        self.pointerEvent(x, y, self.buttons)
+        return await self._flush()
+
+    async def mouseDown(self, button):
+        self.buttons |= 1 << (button - 1)
+        self.pointerEvent(self.x, self.y, self.buttons)
+        return await self._flush()
+
+    async def mouseUp(self, button):
+        self.buttons &= ~(1 << (button - 1))
+        self.pointerEvent(self.x, self.y, self.buttons)
+        return await self._flush()
+
+    async def mousePress(self, button):
+        self.pointerEvent(self.x, self.y, self.buttons | 1 << (button - 1))
+        self.pointerEvent(self.x, self.y, self.buttons)
+        return await self._flush()
+
+    async def keyDown(self, key):
+        for keysym in self._decode_key(key):
+            self.keyEvent(keysym, down=True)
+        return await self._flush()
+
+    async def keyUp(self, key):
+        for keysym in self._decode_key(key):
+            self.keyEvent(keysym, down=False)
+        return await self._flush()
+
+    async def keyPress(self, key):
+        keysyms = self._decode_key(key)
+        for keysym in keysyms:
+            self.keyEvent(keysym, down=True)
+        for keysym in reversed(keysyms):
+            self.keyEvent(keysym, down=False)
+        return await self._flush()
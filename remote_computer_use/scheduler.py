@@ -0,0 +1,126 @@
+"""
+Action Scheduler Module for Computer Use MCP Server
+Serializes input to one desktop, coalescing redundant actions and sharing screenshots
+"""
+import asyncio
+import time
+from collections import deque
+
+
+class _Action:
+    """A queued input action and every caller waiting on its result"""
+
+    def __init__(self, run, coalesce):
+        self.run = run
+        self.coalesce = coalesce
+        self.waiters = [asyncio.get_running_loop().create_future()]
+        self.queued_at = time.monotonic()
+
+
+class ActionScheduler:
+    """
+    Runs a desktop's input actions one at a time, in the order they were submitted
+
+    A queued action with a coalesce key is replaced by a later action with the same
+    key submitted right behind it, e.g. a mouse move superseded by the next move;
+    both callers get the later action's result. Concurrent screenshot requests with
+    no input completed in between share a single capture.
+    """
+
+    def __init__(self):
+        self._queue = deque()
+        self._worker = None
+        self._capture = None
+        # Bumped after every input action, so a capture can tell whether it is stale
+        self._generation = 0
+        self.max_depth = 0
+        self.executed = 0
+        self.coalesced = 0
+        self.captures = 0
+        self.shared_captures = 0
+        self._wait_total = 0.0
+
+    @property
+    def depth(self):
+        """Input actions queued or running"""
+        return len(self._queue) + (1 if self._worker is not None and not self._worker.done() else 0)
+
+    async def submit(self, run, coalesce=None):
+        """
+        Queue an input action and wait for it to run
+
+        Args:
+            run (callable): Coroutine function that performs the action
+            coalesce (str): Key under which a later identical action may replace this one
+                while it is still queued, None to always run it
+
+        Returns:
+            The result of the action that ran on this caller's behalf
+        """
+        queue = self._queue
+        if coalesce is not None and queue and queue[-1].coalesce == coalesce:
+            action = queue[-1]
+            action.run = run
+            action.waiters.append(asyncio.get_running_loop().create_future())
+            self.coalesced += 1
+        else:
+            action = _Action(run, coalesce)
+            queue.append(action)
+        self.max_depth = max(self.max_depth, self.depth)
+        if self._worker is None or self._worker.done():
+            self._worker = asyncio.create_task(self._drain())
+        return await action.waiters[-1]
+
+    async def _drain(self):
+        while self._queue:
+            action = self._queue.popleft()
+            self._wait_total += time.monotonic() - action.queued_at
+            try:
+                result = await action.run()
+            except Exception as e:
+                for waiter in action.waiters:
+                    if not waiter.done():
+                        waiter.set_exception(e)
+            else:
+                for waiter in action.waiters:
+                    if not waiter.done():
+                        waiter.set_result(result)
+            finally:
+                self.executed += 1
+                self._generation += 1
+
+    async def capture(self, grab):
+        """
+        Take a screenshot, joining one already in progress if no input ran since it started
+
+        Args:
+            grab (callable): Coroutine function that captures the screen
+
+        Returns:
+            The captured screenshot
+        """
+        if self._capture is not None and not self._capture[1].done() and self._capture[0] == self._generation:
+            self.shared_captures += 1
+            return await asyncio.shield(self._capture[1])
+        self.captures += 1
+        task = asyncio.ensure_future(grab())
+        self._capture = (self._generation, task)
+        return await asyncio.shield(task)
+
+    def metrics(self):
+        """
+        Report queue and coalescing counters
+
+        Returns:
+            dict: Current and maximum queue depth, actions run and coalesced, mean queue
+                wait, captures taken and shared
+        """
+        return {
+            "queue_depth": self.depth,
+            "max_queue_depth": self.max_depth,
+            "actions_executed": self.executed,
+            "actions_coalesced": self.coalesced,
+            "mean_queue_wait_ms": round(self._wait_total / self.executed * 1000, 2) if self.executed else 0,
+            "captures": self.captures,
+            "shared_captures": self.shared_captures,
+        }
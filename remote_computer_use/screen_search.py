@@ -0,0 +1,267 @@
+"""
+Screen Search Module for Computer Use MCP Server
+Finds things on the screen: a reference image patch by normalized cross-correlation,
+and likely interactive elements by edge and connected-component analysis
+"""
+import numpy as np
+
+# Smallest template side, in pixels, the coarsest pyramid level may shrink it to
+MIN_TEMPLATE_SIDE = 12
+# Halve the screen and template at most this many times for the coarse search
+MAX_PYRAMID_LEVELS = 3
+# Coarse candidates refined at full resolution per requested match
+CANDIDATES_PER_MATCH = 4
+# Downsampling aliases fine detail, so a true match can score far lower at the coarse
+# level than at full resolution; the best coarse peaks above this floor are all refined
+COARSE_MIN_SCORE = 0.2
+# Windows flatter than this per-pixel variance score 0 instead of dividing by ~0
+MIN_VARIANCE = 1.0
+
+# Gray level step between neighbouring pixels that counts as an edge
+EDGE_THRESHOLD = 24
+# Edges are pooled into cells this many pixels square before grouping
+ELEMENT_CELL = 2
+# Edge cells closer than this many cells horizontally join, so letters form words
+ELEMENT_JOIN = 3
+# Element size limits in pixels; larger boxes are windows and panels
+MIN_ELEMENT_SIDE = 8
+MAX_ELEMENT_HEIGHT = 120
+MAX_ELEMENT_WIDTH = 600
+
+
+def _window_sums(array, h, w):
+    """Sum of every h x w window of a 2D array, via an integral image"""
+    integral = np.zeros((array.shape[0] + 1, array.shape[1] + 1))
+    integral[1:, 1:] = array.cumsum(axis=0).cumsum(axis=1)
+    return integral[h:, w:] - integral[:-h, w:] - integral[h:, :-w] + integral[:-h, :-w]
+
+
+def ncc_map(image, template):
+    """
+    Normalized cross-correlation of a template at every position of an image
+
+    The correlation is computed with FFTs and the per-window normalization with
+    integral images, so the cost does not grow with the template size.
+
+    Args:
+        image (np.ndarray): 2D grayscale image
+        template (np.ndarray): 2D grayscale template, no larger than the image
+
+    Returns:
+        np.ndarray: Scores in [-1, 1] for each top-left position, shape (H - h + 1, W - w + 1)
+    """
+    h, w = template.shape
+    height, width = image.shape
+    n = h * w
+    centered = template - template.mean()
+    template_norm = np.sqrt((centered * centered).sum())
+    if template_norm == 0:
+        raise ValueError("Template has no contrast to match on")
+
+    shape = (height, width)
+    spectrum = np.fft.rfft2(image) * np.conj(np.fft.rfft2(centered, s=shape))
+    corr = np.fft.irfft2(spectrum, s=shape)[:height - h + 1, :width - w + 1]
+
+    sums = _window_sums(image, h, w)
+    variance = _window_sums(image * image, h, w) - sums * sums / n
+    scores = np.zeros_like(corr)
+    textured = variance > MIN_VARIANCE * n
+    scores[textured] = corr[textured] / (template_norm * np.sqrt(variance[textured]))
+    return scores
+
+
+def _peaks(scores, count, min_score, distance):
+    """Highest scores at least `distance` apart, as (row, col, score), best first"""
+    scores = scores.copy()
+    peaks = []
+    while len(peaks) < count:
+        row, col = np.unravel_index(scores.argmax(), scores.shape)
+        score = scores[row, col]
+        if score < min_score:
+            break
+        peaks.append((row, col, score))
+        scores[max(row - distance, 0):row + distance + 1, max(col - distance, 0):col + distance + 1] = -np.inf
+    return peaks
+
+
+def locate(screen, template, threshold=0.8, max_results=5):
+    """
+    Find where a template appears on a screenshot
+
+    Both images are shrunk by a power of two for a coarse search, then each
+    candidate is refined with an exact search around it at full resolution.
+
+    Args:
+        screen (PIL.Image): Screenshot to search
+        template (PIL.Image): Reference patch to find
+        threshold (float): Minimum normalized cross-correlation score, 0-1
+        max_results (int): Maximum number of matches to return
+
+    Returns:
+        list: Matches as dicts with the center x/y, left/top/width/height box and score,
+            best first
+    """
+    screen = screen.convert("L")
+    template = template.convert("L")
+    w, h = template.size
+    if w > screen.width or h > screen.height:
+        raise ValueError("Template is larger than the screen")
+
+    level = 0
+    while level < MAX_PYRAMID_LEVELS and min(w, h) >> (level + 1) >= MIN_TEMPLATE_SIDE:
+        level += 1
+    factor = 1 << level
+    coarse_screen = screen.reduce(factor) if factor > 1 else screen
+    coarse_template = template.reduce(factor) if factor > 1 else template
+    coarse_scores = ncc_map(np.asarray(coarse_screen, dtype=np.float64),
+                            np.asarray(coarse_template, dtype=np.float64))
+    candidates = _peaks(coarse_scores, max_results * CANDIDATES_PER_MATCH,
+                        min(threshold, COARSE_MIN_SCORE), max(1, min(coarse_template.size) // 2))
+
+    full_screen = np.asarray(screen, dtype=np.float64)
+    full_template = np.asarray(template, dtype=np.float64)
+    matches = []
+    for row, col, _ in candidates:
+        # The true position lies within one coarse pixel of the candidate
+        top = min(max(row * factor - factor, 0), screen.height - h)
+        left = min(max(col * factor - factor, 0), screen.width - w)
+        bottom = min(row * factor + factor, screen.height - h)
+        right = min(col * factor + factor, screen.width - w)
+        scores = ncc_map(full_screen[top:bottom + h, left:right + w], full_template)
+        y, x = np.unravel_index(scores.argmax(), scores.shape)
+        score = float(scores[y, x])
+        if score < threshold:
+            continue
+        x, y = int(left + x), int(top + y)
+        if any(abs(x - mx) < w // 2 and abs(y - my) < h // 2 for _, mx, my in matches):
+            continue
+        matches.append((score, x, y))
+
+    matches.sort(reverse=True)
+    return [
+        {"x": x + w // 2, "y": y + h // 2, "left": x, "top": y, "width": w, "height": h,
+         "score": round(score, 3)}
+        for score, x, y in matches[:max_results]
+    ]
+
+
+def label_components(mask):
+    """
+    Label the 4-connected components of a boolean mask
+
+    Uses hooking and pointer jumping over all neighbour pairs at once, which
+    takes a handful of vectorized passes instead of a per-pixel flood fill.
+
+    Args:
+        mask (np.ndarray): 2D boolean array
+
+    Returns:
+        np.ndarray: Component label of every True cell (the smallest flat index in
+            its component), -1 elsewhere
+    """
+    index = np.arange(mask.size).reshape(mask.shape)
+    horizontal = mask[:, :-1] & mask[:, 1:]
+    vertical = mask[:-1, :] & mask[1:, :]
+    a = np.concatenate([index[:, :-1][horizontal], index[:-1, :][vertical]])
+    b = np.concatenate([index[:, 1:][horizontal], index[1:, :][vertical]])
+    parent = index.ravel().copy()
+    while True:
+        root_a, root_b = parent[a], parent[b]
+        differ = root_a != root_b
+        if not differ.any():
+            break
+        low = np.minimum(root_a[differ], root_b[differ])
+        np.minimum.at(parent, root_a[differ], low)
+        np.minimum.at(parent, root_b[differ], low)
+        while True:
+            jumped = parent[parent]
+            if np.array_equal(jumped, parent):
+                break
+            parent = jumped
+    labels = np.where(mask.ravel(), parent, -1)
+    return labels.reshape(mask.shape)
+
+
+def _classify(image, left, top, right, bottom):
+    """Guess what kind of element a box is from its shape and fill"""
+    width, height = right - left, bottom - top
+    aspect = width / height
+    inside = image[top + 2:bottom - 2, left + 2:right - 2]
+    flat = inside.size > 0 and inside.std() < 12
+    if 0.6 <= aspect <= 1.6 and max(width, height) <= 64:
+        return "icon"
+    if aspect >= 4 and 16 <= height <= 48 and flat:
+        return "text_field"
+    if 1.5 <= aspect <= 12 and 16 <= height <= 60:
+        return "button"
+    return "text" if height <= 24 else "element"
+
+
+def detect_elements(screen, max_elements=100):
+    """
+    Find likely interactive elements: buttons, text fields, icons and text labels
+
+    Edges are pooled into small cells, joined horizontally so letters become
+    words, and grouped into connected components whose boxes are classified by
+    shape. This is a heuristic; boxes are click candidates, not a widget tree.
+
+    Args:
+        screen (PIL.Image): Screenshot to analyse
+        max_elements (int): Maximum number of elements to return
+
+    Returns:
+        list: Elements as dicts with a type, center x/y and left/top/width/height box,
+            in reading order
+    """
+    image = np.asarray(screen.convert("L"), dtype=np.int16)
+    edges = np.zeros(image.shape, dtype=bool)
+    edges[:, 1:] |= np.abs(np.diff(image, axis=1)) > EDGE_THRESHOLD
+    edges[1:, :] |= np.abs(np.diff(image, axis=0)) > EDGE_THRESHOLD
+
+    cell = ELEMENT_CELL
+    rows, cols = -(-edges.shape[0] // cell), -(-edges.shape[1] // cell)
+    padded = np.zeros((rows * cell, cols * cell), dtype=bool)
+    padded[:edges.shape[0], :edges.shape[1]] = edges
+    grid = padded.reshape(rows, cell, cols, cell).any(axis=(1, 3))
+    joined = grid.copy()
+    for shift in range(1, ELEMENT_JOIN + 1):
+        joined[:, shift:] |= grid[:, :-shift]
+
+    labels = label_components(joined)
+    # Boxes come from the real edge cells, not the gaps filled in to join them
+    cells = grid & (labels >= 0)
+    if not cells.any():
+        return []
+    ys, xs = np.nonzero(cells)
+    components, inverse = np.unique(labels[cells], return_inverse=True)
+    count = len(components)
+    top = np.full(count, rows)
+    left = np.full(count, cols)
+    bottom = np.zeros(count, dtype=np.int64)
+    right = np.zeros(count, dtype=np.int64)
+    np.minimum.at(top, inverse, ys)
+    np.minimum.at(left, inverse, xs)
+    np.maximum.at(bottom, inverse, ys)
+    np.maximum.at(right, inverse, xs)
+
+    height, width = image.shape
+    boxes = []
+    for t, l, b, r in zip(top * cell, left * cell, (bottom + 1) * cell, (right + 1) * cell):
+        t, l, b, r = int(t), int(l), min(int(b), height), min(int(r), width)
+        if min(r - l, b - t) < MIN_ELEMENT_SIDE:
+            continue
+        if b - t > MAX_ELEMENT_HEIGHT or r - l > MAX_ELEMENT_WIDTH:
+            continue
+        boxes.append((l, t, r, b, _classify(image, l, t, r, b)))
+
+    # Labels and glyphs inside a button or field belong to it
+    containers = [box for box in boxes if box[4] in ("button", "text_field")]
+    elements = []
+    for l, t, r, b, kind in boxes:
+        if any(cl <= l and ct <= t and r <= cr and b <= cb and (cl, ct, cr, cb) != (l, t, r, b)
+               for cl, ct, cr, cb, _ in containers):
+            continue
+        elements.append({"type": kind, "x": (l + r) // 2, "y": (t + b) // 2,
+                         "left": l, "top": t, "width": r - l, "height": b - t})
+    elements.sort(key=lambda element: (element["top"] // 10, element["left"]))
+    return elements[:max_elements]
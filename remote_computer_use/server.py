@@ -9,10 +9,20 @@ from dataclasses import dataclass
 from contextlib import asynccontextmanager
 from typing import AsyncIterator, Optional, Dict, Any, List
 import io
+import json
+import base64
+from PIL import Image as PILImage
 from mcp.server.fastmcp import FastMCP, Image, Context
 from vnc_controller import VNCController
 from ssh_controller import SSHController
-import time
+from recorder import ScreenRecorder
+from remote_capture import RemoteCapture
+from local_controller import LocalController
+from local_capture import LocalCapture
+from desktop_pool import Desktop, DesktopPool, Lease
+from accessibility import MAX_DEPTH, MAX_NODES, format_tree
+from image_encoder import ScreenshotEncoder, describe_regions, encode_image
+from screen_search import detect_elements, locate
 # import dotenv
 # dotenv.load_dotenv()
 
@@ -20,9 +30,13 @@ import time
 @dataclass
 class AppContext:
     """Application context for lifespan management"""
-    vnc: VNCController
-    ssh: SSHController
-    display_num : str
+    encoder: ScreenshotEncoder
+    # lease of the only desktop, shared by every session, or None when desktops are leased from the pool
+    lease: Optional[Lease] = None
+    pool: Optional[DesktopPool] = None
+    # action tools return a crop of this radius plus a thumbnail, 0 for the full screen
+    focus_radius: int = 0
+    thumbnail_width: int = 320
 
 # Define lifespan for connection management
 @asynccontextmanager
@@ -44,36 +58,98 @@ async def app_lifespan(server: FastMCP) -> AsyncIterator[AppContext]:
     pem_file = os.environ.get("PEM_FILE", "")
     ssh_port = int(os.environ.get("SSH_PORT", "22"))
     display_num = os.environ.get("DISPLAY_NUM", "1")
+    # keep a live framebuffer mirror so screenshots are served from memory
+    vnc_mirror = os.environ.get("VNC_MIRROR", "1") in ["1", "true", "True"]
+    vnc_mirror_interval = float(os.environ.get("VNC_MIRROR_INTERVAL", "0.05"))
+    # per-action overrides for how long to wait for the screen to settle, as JSON
+    settle_profiles = json.loads(os.environ.get("SETTLE_PROFILES", "{}"))
+    # off, cache (resend the last encoding for an unchanged screen) or placeholder
+    screenshot_dedup = os.environ.get("SCREENSHOT_DEDUP", "cache")
+    # RFB encoding preference such as "zrle,copyrect,raw" and optional 16-bit color
+    vnc_encodings = [name.strip() for name in os.environ.get("VNC_ENCODINGS", "").split(",") if name.strip()]
+    vnc_pixel_depth = int(os.environ["VNC_PIXEL_DEPTH"]) if os.environ.get("VNC_PIXEL_DEPTH") else None
+    # vncdotool (default) or asyncio, which speaks RFB on the event loop without thread hops
+    vnc_backend = os.environ.get("VNC_BACKEND", "vncdotool")
+    # seconds between input events; 0 writes each action's events in one batch
+    vnc_input_pacing = float(os.environ.get("VNC_INPUT_PACING", "0"))
+    # ssh (default) or local for a desktop on this host: commands run as subprocesses
+    # and screenshots are read from the X server through shared memory
+    desktop_backend = os.environ.get("DESKTOP_BACKEND", "ssh")
+    # crop action screenshots to this many pixels around the action point, 0 keeps the full screen
+    focus_radius = int(os.environ.get("FOCUS_RADIUS", "0"))
+    focus_thumbnail_width = int(os.environ.get("FOCUS_THUMBNAIL_WIDTH", "320"))
 
     
+    # JSON file describing a pool of desktops shared by the MCP sessions, see desktops.example.json
+    desktop_pool_file = os.environ.get("DESKTOP_POOL")
+    
     # Validate required environment variables
-    if not vnc_host:
-        raise ValueError("VNC_HOST environment variable is required")
-    if not vnc_password:
-        raise ValueError("VNC_PASSWORD environment variable is required")
-    if not vnc_username:
-        raise ValueError("VNC_USERNAME environment variable is required")
+    if not desktop_pool_file:
+        if not vnc_host:
+            raise ValueError("VNC_HOST environment variable is required")
+        if not vnc_password:
+            raise ValueError("VNC_PASSWORD environment variable is required")
+        if not vnc_username:
+            raise ValueError("VNC_USERNAME environment variable is required")
+    
+    encoder = ScreenshotEncoder.from_env()
+    encoder.start()
+    
+    def build_desktop(name="default", vnc_host=vnc_host, vnc_port=vnc_port, vnc_username=vnc_username,
+                      vnc_password=vnc_password, pem_file=pem_file, ssh_port=ssh_port,
+                      display_num=display_num, desktop_backend=desktop_backend, max_sessions=1):
+        """Controllers for one desktop, configured by the environment or a pool entry"""
+        # Input always goes through VNC here, even for a local desktop
+        if not (vnc_host and vnc_password and vnc_username):
+            raise ValueError(f"Desktop {name}: vnc_host, vnc_username and vnc_password are required")
+        display_num = str(display_num)
+        # Initialize controllers
+        vnc_controller = VNCController(vnc_host, int(vnc_port), vnc_username, vnc_password,
+                                       mirror=vnc_mirror, mirror_interval=vnc_mirror_interval,
+                                       settle_profiles=settle_profiles,
+                                       screenshot_dedup=screenshot_dedup,
+                                       encodings=vnc_encodings, pixel_depth=vnc_pixel_depth,
+                                       backend=vnc_backend, input_pacing=vnc_input_pacing)
+        if desktop_backend == "local":
+            ssh_controller = LocalController(display_num)
+            vnc_controller.frame_source = LocalCapture(display_num)
+        else:
+            ssh_controller = SSHController(vnc_host, int(ssh_port), vnc_username, vnc_password,pem_file, display_num)
+            # SCREENSHOT_SOURCE=ssh grabs the display on the remote host and streams compressed frames over SSH
+            vnc_controller.frame_source = RemoteCapture.from_env(ssh_controller, display_num)
+        # RECORD_FPS > 0 keeps a bounded recording of the screen for replay and debugging
+        recorder = ScreenRecorder.from_env(vnc_controller, name if desktop_pool_file else None)
+        return Desktop(name, vnc_controller, ssh_controller, display_num, max_sessions=max_sessions,
+                       recorder=recorder)
+    
+    def build_pool_desktop(**entry):
+        """Controllers for one pool entry; a local desktop must name the VNC server of this host"""
+        # Falling back to VNC_HOST would send input to another machine than the screenshots come from
+        if entry.get("desktop_backend", desktop_backend) == "local" and not entry.get("vnc_host"):
+            raise ValueError(f"Desktop {entry.get('name', 'default')}: a local desktop needs its own vnc_host, "
+                             "the VNC server of its display on this host")
+        return build_desktop(**entry)
     
-    # Initialize controllers
-    vnc_controller = VNCController(vnc_host, vnc_port, vnc_username, vnc_password)
-    ssh_controller = SSHController(vnc_host, ssh_port, vnc_username, vnc_password,pem_file, display_num)
+    pool = DesktopPool.from_file(desktop_pool_file, build_pool_desktop) if desktop_pool_file else None
+    desktop = None if pool else build_desktop()
     
     try:
         # Connect on startup
-        vnc_success = await vnc_controller.connect()
-        if not vnc_success:
-            print("Warning: Failed to connect to VNC server on startup")
-            
-        ssh_success = await ssh_controller.connect()
-        if not ssh_success:
-            print("Warning: Failed to connect to SSH server on startup")
+        if pool:
+            await pool.start()
+        else:
+            await desktop.start()
         
         # Yield context to server
-        yield AppContext(vnc=vnc_controller, ssh=ssh_controller,display_num=display_num)
+        yield AppContext(encoder=encoder, lease=Lease(desktop) if desktop else None, pool=pool, focus_radius=focus_radius,
+                         thumbnail_width=focus_thumbnail_width)
     finally:
         # Disconnect on shutdown
-        await vnc_controller.disconnect()
-        await ssh_controller.disconnect()
+        if pool:
+            await pool.stop()
+        else:
+            await desktop.stop()
+        encoder.shutdown()
 
 # Create MCP server
 mcp = FastMCP(
@@ -83,9 +159,125 @@ mcp = FastMCP(
 )
 
 
+async def get_lease(ctx: Context) -> Lease:
+    """
+    The desktop a request works on with its session's state: the server's only desktop, or with
+    DESKTOP_POOL the one leased to the request's MCP session, leasing one on the session's first call
+    """
+    context = ctx.request_context.lifespan_context
+    if context.pool is None:
+        return context.lease
+    try:
+        return await context.pool.lease(ctx.session)
+    except Exception as e:
+        raise ValueError(f"{e}")
+
+
+async def get_desktop(ctx: Context) -> Desktop:
+    """The desktop a request works on, see get_lease"""
+    return (await get_lease(ctx)).desktop
+
+
+async def get_recorder() -> ScreenRecorder:
+    """Screen recorder of the request's desktop, for resources that get no request context"""
+    recorder = (await get_desktop(mcp.get_context())).recorder
+    if recorder is None:
+        raise ValueError("Screen recording is off, set RECORD_FPS to enable it")
+    return recorder
+
+
+@mcp.resource("recording://index", mime_type="application/json")
+async def recording_index() -> str:
+    """Frames currently held by the screen recording, oldest first, with their sequence numbers and times"""
+    return json.dumps((await get_recorder()).index())
+
+
+@mcp.resource("recording://frames/{seq}", mime_type="image/png")
+async def recording_frame(seq: str) -> bytes:
+    """One recorded frame as PNG, rebuilt from its keyframe and deltas"""
+    _, image = await asyncio.to_thread((await get_recorder()).frame, int(seq))
+    encoded = await asyncio.to_thread(encode_image, image, "png")
+    return encoded.data
+
+
+async def encode_screenshot(ctx: Context, screenshot, region=None, delta=False) -> Image:
+    """
+    Encode a PIL screenshot with the configured encoder, off the event loop
+    
+    An unchanged screen reuses the last encoding. In placeholder mode it is answered
+    with a short note instead, and new screenshots are labelled with their number.
+    
+    Args:
+        ctx: MCP request context holding the encoder
+        screenshot: PIL Image to encode
+        region: (x, y, w, h) the screenshot was cropped to, None for the full screen
+        delta: Send only the regions changed since the previous screenshot of the same region
+        
+    Returns:
+        Image: Encoded screenshot
+    """
+    context = ctx.request_context.lifespan_context
+    # Numbers and delta frames of the screenshots this session was sent
+    cache = (await get_lease(ctx)).screenshot_cache
+    previous = cache.remember_frame(region, screenshot)
+    if delta:
+        regions = await context.encoder.encode_delta(screenshot, previous)
+        if regions is not None:
+            # Report boxes in screen coordinates
+            left, top = region[:2] if region else (0, 0)
+            regions = [((x + left, y + top, w, h), encoded) for (x, y, w, h), encoded in regions]
+            return [describe_regions(regions)] + [Image(data=encoded.data, format=encoded.format)
+                                                  for _, encoded in regions]
+    encoded = await context.encoder.encode_async(screenshot, cache=cache)
+    if cache.mode != "placeholder":
+        return Image(data=encoded.data, format=encoded.format)
+    if encoded.repeat:
+        return f"Screen unchanged since screenshot {encoded.number}"
+    return [f"Screenshot {encoded.number}", Image(data=encoded.data, format=encoded.format)]
+
+
+async def encode_action_screenshot(ctx: Context, screenshot, point, focus_radius=None):
+    """
+    Encode the screenshot returned by an action tool, focused on the action point if asked
+    
+    With a focus radius the full screenshot is replaced by a crop around the point,
+    encoded like capture_region, and a low-resolution thumbnail of the whole screen.
+    
+    Args:
+        ctx: MCP request context holding the encoder
+        screenshot: PIL Image of the full screen
+        point: (x, y) the action happened at
+        focus_radius: Half the side of the crop in pixels, None for the FOCUS_RADIUS default,
+            0 for the full screen
+        
+    Returns:
+        Image: Encoded screenshot, or a description followed by the crop and thumbnail
+    """
+    context = ctx.request_context.lifespan_context
+    radius = context.focus_radius if focus_radius is None else focus_radius
+    if not radius:
+        return await encode_screenshot(ctx, screenshot)
+    
+    width, height = screenshot.size
+    x, y = min(max(point[0], 0), width - 1), min(max(point[1], 0), height - 1)
+    w, h = min(2 * radius, width), min(2 * radius, height)
+    left = min(max(x - radius, 0), width - w)
+    top = min(max(y - radius, 0), height - h)
+    region = (left, top, w, h)
+    crop = await encode_screenshot(ctx, screenshot.crop((left, top, left + w, top + h)), region=region)
+    
+    thumb_width = min(context.thumbnail_width, width)
+    thumb_height = max(1, round(height * thumb_width / width))
+    thumbnail = await context.encoder.encode_async(screenshot, size=(thumb_width, thumb_height))
+    note = (f"Region ({left}, {top}, {w}, {h}) around ({x}, {y}) as (x, y, width, height), "
+            f"then the full {width}x{height} screen at {thumb_width}x{thumb_height}")
+    return ([note] + (crop if isinstance(crop, list) else [crop])
+            + [Image(data=thumbnail.data, format=thumbnail.format)])
+
+
 # Define MCP tools
 @mcp.tool()
-async def capture_region(ctx: Context,x: int, y: int, w: int, h: int) -> Image:
+async def capture_region(ctx: Context,x: int, y: int, w: int, h: int, delta: bool = False) -> Image:
     """
     Capture screenshot only represents of a region of the remote desktop
     
@@ -94,39 +286,178 @@ async def capture_region(ctx: Context,x: int, y: int, w: int, h: int) -> Image:
         y: Y coordinate (pixels from the top edge)
         w: Width of the region
         h: Hight of the region
+        delta: Return only the parts changed since the previous capture of this region, with their (x, y, width, height) boxes
         
     Returns:
         Image: Screenshot of the remote desktop
     """
-    vnc = ctx.request_context.lifespan_context.vnc
+    vnc = (await get_desktop(ctx)).vnc
     screenshot = await vnc.capture_region(x,y,w,h)
     
-    # Convert PIL Image to bytes
-    img_bytes = io.BytesIO()
-    screenshot.save(img_bytes, format="PNG")
+    return await encode_screenshot(ctx, screenshot, region=(x, y, w, h), delta=delta)
+
+@mcp.tool()
+async def locate_on_screen(ctx: Context, template: str, threshold: float = 0.8, max_results: int = 5,
+                           x: int = None, y: int = None, w: int = None, h: int = None) -> Dict[str, Any]:
+    """
+    Find where a reference image patch appears on the remote desktop, without a screenshot round-trip
+    
+    Args:
+        template: Base64 encoded PNG or JPEG of the patch to find, e.g. a toolbar icon
+        threshold: Minimum match score from 0 to 1, default to 0.8
+        max_results: Maximum number of matches to return, default to 5
+        x: X coordinate of the region to search, leave x, y, w and h unset to search the whole screen
+        y: Y coordinate of the region to search
+        w: Width of the region to search
+        h: Hight of the region to search
+        
+    Returns:
+        dict: matches, best first, each with the center x/y to click, the left/top/width/height box and the score
+    """
+    vnc = (await get_desktop(ctx)).vnc
+    region = (x, y, w, h)
+    if None in region:
+        if any(value is not None for value in region):
+            raise ValueError("x, y, w and h must be given together")
+        region = None
+    try:
+        if template.startswith("data:"):
+            template = template.split(",", 1)[1]
+        patch = PILImage.open(io.BytesIO(base64.b64decode(template)))
+        patch.load()
+    except Exception as e:
+        raise ValueError(f"Failed to decode template image: {e}")
+    
+    try:
+        if region:
+            screenshot = await vnc.capture_region(*region)
+        else:
+            screenshot = await vnc.capture_screenshot()
+        # NumPy work, kept off the event loop
+        matches = await asyncio.to_thread(locate, screenshot, patch, threshold, max_results)
+    except Exception as e:
+        raise ValueError(f"{e}")
     
-    return Image(data=img_bytes.getvalue(), format="png")
+    if region:
+        for match in matches:
+            for key, offset in (("x", x), ("left", x), ("y", y), ("top", y)):
+                match[key] += offset
+    return {"matches": matches}
 
 @mcp.tool()
-async def capture_screenshot(ctx: Context) -> Image:
+async def find_ui_elements(ctx: Context, max_elements: int = 100,
+                           x: int = None, y: int = None, w: int = None, h: int = None) -> Dict[str, Any]:
+    """
+    List likely interactive elements on the remote desktop (buttons, text fields, icons and text labels)
+    with their boxes and center coordinates, as a lighter alternative to reading a full screenshot.
+    Detection is heuristic, so confirm with a screenshot when a click target is ambiguous.
+    
+    Args:
+        max_elements: Maximum number of elements to return, default to 100
+        x: X coordinate of the region to analyse, leave x, y, w and h unset to analyse the whole screen
+        y: Y coordinate of the region to analyse
+        w: Width of the region to analyse
+        h: Hight of the region to analyse
+        
+    Returns:
+        dict: elements in reading order, each with a type, the center x/y to click and the left/top/width/height box
+    """
+    vnc = (await get_desktop(ctx)).vnc
+    region = (x, y, w, h)
+    if None in region:
+        if any(value is not None for value in region):
+            raise ValueError("x, y, w and h must be given together")
+        region = None
+    try:
+        if region:
+            screenshot = await vnc.capture_region(*region)
+        else:
+            screenshot = await vnc.capture_screenshot()
+        # NumPy work, kept off the event loop
+        elements = await asyncio.to_thread(detect_elements, screenshot, max_elements)
+    except Exception as e:
+        raise ValueError(f"{e}")
+    
+    if region:
+        for element in elements:
+            for key, offset in (("x", x), ("left", x), ("y", y), ("top", y)):
+                element[key] += offset
+    return {"elements": elements}
+
+@mcp.tool()
+async def accessibility_tree(ctx: Context, max_depth: int = MAX_DEPTH, max_nodes: int = MAX_NODES) -> Dict[str, Any]:
+    """
+    List the widgets on screen from the desktop's accessibility tree (AT-SPI): role, name, exact
+    bounds and focus, as an indented outline. A few KB instead of a screenshot, and the bounds give
+    exact click coordinates. Applications that do not support accessibility are missing from it.
+    The result is cached until the screen changes.
+    
+    Args:
+        max_depth: Deepest widget nesting to walk, default to 30
+        max_nodes: Most widgets to list, default to 400
+        
+    Returns:
+        dict: tree with one 'role "name" (x, y, width, height) [focused]' line per widget, the widget count and whether it came from the cache
+    """
+    accessibility = (await get_desktop(ctx)).accessibility
+    try:
+        rows, cached = await accessibility.rows(max_depth, max_nodes)
+    except Exception as e:
+        raise ValueError(f"{e}")
+    return {"tree": format_tree(rows), "widgets": len(rows), "cached": cached}
+
+@mcp.tool()
+async def capture_screenshot(ctx: Context, delta: bool = False) -> Image:
     """
     Capture a screenshot of the remote desktop
     
+    Args:
+        delta: Return only the parts changed since the previous screenshot, with their (x, y, width, height) boxes. A full screenshot is returned when most of the screen changed
+    
     Returns:
         Image: Screenshot of the remote desktop
     """
-    vnc = ctx.request_context.lifespan_context.vnc
+    vnc = (await get_desktop(ctx)).vnc
     try:
         screenshot = await vnc.capture_screenshot()
     except Exception as e:
         raise ValueError(f"{e}")
 
     
-    # Convert PIL Image to bytes
-    img_bytes = io.BytesIO()
-    screenshot.save(img_bytes, format="PNG")
+    return await encode_screenshot(ctx, screenshot, delta=delta)
+
+@mcp.tool()
+async def wait_for_change(ctx: Context, x: int = None, y: int = None, w: int = None, h: int = None,
+                          timeout: float = 10) -> Image:
+    """
+    Wait until the screen, or a region of it, changes and return a screenshot.
+    Use this instead of repeated screenshots while waiting for a page load, dialog or installer.
     
-    return Image(data=img_bytes.getvalue(), format="png")
+    Args:
+        x: X coordinate of the region to watch, leave x, y, w and h unset to watch the whole screen
+        y: Y coordinate of the region to watch
+        w: Width of the region to watch
+        h: Hight of the region to watch
+        timeout: Seconds to wait at most, default to 10
+        
+    Returns:
+        Image: Whether the screen changed and how long it waited, then a screenshot
+    """
+    vnc = (await get_desktop(ctx)).vnc
+    region = (x, y, w, h)
+    if None in region:
+        if any(value is not None for value in region):
+            raise ValueError("x, y, w and h must be given together")
+        region = None
+    try:
+        changed, waited = await vnc.wait_for_change(region, timeout)
+        screenshot = await vnc.capture_screenshot()
+    except Exception as e:
+        raise ValueError(f"{e}")
+    
+    status = f"Screen changed after {waited:.2f}s" if changed else f"No change within {timeout}s"
+    result = await encode_screenshot(ctx, screenshot)
+    return [status] + (result if isinstance(result, list) else [result])
 
 @mcp.tool()
 async def mouse_double_click(ctx: Context, x: int, y: int) -> Image:
@@ -140,19 +471,18 @@ async def mouse_double_click(ctx: Context, x: int, y: int) -> Image:
     Returns:
         str: execution result
     """
-    vnc = ctx.request_context.lifespan_context.vnc
+    vnc = (await get_desktop(ctx)).vnc
     try:
-        await vnc.mouse_click(x, y, 1)
-        time.sleep(0.1)
-        await vnc.mouse_click(x, y, 1)
-        time.sleep(3)
-    except:
+        await vnc.mouse_double_click(x, y)
+        # Return once the screen stops changing instead of always sleeping
+        await vnc.wait_for_settle(action="double_click")
+    except Exception as e:
         raise ValueError(f"Failed to double-click, error:{e}")
     
     return  'Double-click executed, please capture a new screenshot in next turn to see the result'
 
 @mcp.tool()
-async def mouse_click(ctx: Context, x: int, y: int, button: int = 1) -> Image:
+async def mouse_click(ctx: Context, x: int, y: int, button: int = 1, focus_radius: int = None) -> Image:
     """
     Click at the specified coordinates and return a screenshot,
     
@@ -160,11 +490,12 @@ async def mouse_click(ctx: Context, x: int, y: int, button: int = 1) -> Image:
         x: X coordinate (pixels from the left edge)
         y: Y coordinate (pixels from the top edge)
         button: Mouse button (1=Click the left mouse button, 2=Click the middle mouse button, 3=Click the right mouse button)
+        focus_radius: Return only this many pixels around the action point plus a small thumbnail of the screen, 0 for the full screenshot, unset for the server default
         
     Returns:
         Image: Screenshot after clicking
     """
-    vnc = ctx.request_context.lifespan_context.vnc
+    vnc = (await get_desktop(ctx)).vnc
     try:
         await vnc.mouse_click(x, y, button)
         
@@ -173,25 +504,22 @@ async def mouse_click(ctx: Context, x: int, y: int, button: int = 1) -> Image:
     except Exception as e:
         raise ValueError(f"{e}")
     
-    # Convert PIL Image to bytes
-    img_bytes = io.BytesIO()
-    screenshot.save(img_bytes, format="PNG")
-    
-    return Image(data=img_bytes.getvalue(), format="png")
+    return await encode_action_screenshot(ctx, screenshot, (x, y), focus_radius)
 
 @mcp.tool()
-async def mouse_move(ctx: Context, x: int, y: int) -> Image:
+async def mouse_move(ctx: Context, x: int, y: int, focus_radius: int = None) -> Image:
     """
     Move mouse to the specified coordinates and return a screenshot
 
     Args:
         x: X coordinate (pixels from the left edge)
         y: Y coordinate (pixels from the top edge)
+        focus_radius: Return only this many pixels around the action point plus a small thumbnail of the screen, 0 for the full screenshot, unset for the server default
         
     Returns:
         Image: Screenshot after moving mouse
     """
-    vnc = ctx.request_context.lifespan_context.vnc
+    vnc = (await get_desktop(ctx)).vnc
     try:
         await vnc.mouse_move(x, y)
         # Capture screenshot after moving mouse
@@ -199,11 +527,7 @@ async def mouse_move(ctx: Context, x: int, y: int) -> Image:
     except Exception as e:
         raise ValueError(f"{e}")
     
-    # Convert PIL Image to bytes
-    img_bytes = io.BytesIO()
-    screenshot.save(img_bytes, format="PNG")
-    
-    return Image(data=img_bytes.getvalue(), format="png")
+    return await encode_action_screenshot(ctx, screenshot, (x, y), focus_radius)
 
 @mcp.tool()
 async def mouse_scroll(ctx: Context, steps: int = 1, direction: str = "down") -> Image:
@@ -217,7 +541,7 @@ async def mouse_scroll(ctx: Context, steps: int = 1, direction: str = "down") ->
     Returns:
         Image: Screenshot after scrolling
     """
-    vnc = ctx.request_context.lifespan_context.vnc
+    vnc = (await get_desktop(ctx)).vnc
     
     try:
         await vnc.mouse_scroll(steps, direction)
@@ -227,24 +551,21 @@ async def mouse_scroll(ctx: Context, steps: int = 1, direction: str = "down") ->
     except Exception as e:
         raise ValueError(f"{e}")
     
-    # Convert PIL Image to bytes
-    img_bytes = io.BytesIO()
-    screenshot.save(img_bytes, format="PNG")
-    
-    return Image(data=img_bytes.getvalue(), format="png")
+    return await encode_screenshot(ctx, screenshot)
 
 @mcp.tool()
-async def type_text(ctx: Context, text: str) -> Image:
+async def type_text(ctx: Context, text: str, focus_radius: int = None) -> Image:
     """
     Type the specified text and return a screenshot
     
     Args:
         text: Text to type
+        focus_radius: Return only this many pixels around the mouse pointer plus a small thumbnail of the screen, 0 for the full screenshot, unset for the server default
         
     Returns:
         Image: Screenshot after typing text
     """
-    vnc = ctx.request_context.lifespan_context.vnc
+    vnc = (await get_desktop(ctx)).vnc
     try :
         await vnc.type_text(text)
         
@@ -253,24 +574,21 @@ async def type_text(ctx: Context, text: str) -> Image:
     except Exception as e:
         raise ValueError(f"{e}")
     
-    # Convert PIL Image to bytes
-    img_bytes = io.BytesIO()
-    screenshot.save(img_bytes, format="PNG")
-    
-    return Image(data=img_bytes.getvalue(), format="png")
+    return await encode_action_screenshot(ctx, screenshot, vnc.pointer, focus_radius)
 
 @mcp.tool()
-async def key_press(ctx: Context, key: str) -> Image:
+async def key_press(ctx: Context, key: str, focus_radius: int = None) -> Image:
     """
     Press a key and return a screenshot
     
     Args:
-        key: Key to press (e.g., 'enter', 'escape', etc.)
+        key: Key or '-' joined combination to press, case-insensitive (e.g., 'enter', 'escape', 'ctrl-c', 'alt-F4', 'ctrl--')
+        focus_radius: Return only this many pixels around the mouse pointer plus a small thumbnail of the screen, 0 for the full screenshot, unset for the server default
         
     Returns:
         Image: Screenshot after pressing key
     """
-    vnc = ctx.request_context.lifespan_context.vnc
+    vnc = (await get_desktop(ctx)).vnc
     try:
         await vnc.key_press(key)
         
@@ -278,11 +596,32 @@ async def key_press(ctx: Context, key: str) -> Image:
         screenshot = await vnc.capture_screenshot()
     except Exception as e:
         raise ValueError(f"{e}")
-    # Convert PIL Image to bytes
-    img_bytes = io.BytesIO()
-    screenshot.save(img_bytes, format="PNG")
+    return await encode_action_screenshot(ctx, screenshot, vnc.pointer, focus_radius)
+
+@mcp.tool()
+async def vnc_stats(ctx: Context) -> Dict[str, Any]:
+    """
+    Report VNC connection traffic: negotiated encodings and pixel depth, bytes received per
+    framebuffer update and full update latency. Useful for tuning VNC_ENCODINGS on slow links.
+    Also reports the action queue depth, coalesced actions and shared screenshots.
     
-    return Image(data=img_bytes.getvalue(), format="png")
+    Returns:
+        dict: Connection statistics
+    """
+    return (await get_desktop(ctx)).vnc.stats()
+
+@mcp.tool()
+async def desktop_pool_status(ctx: Context) -> Dict[str, Any]:
+    """
+    Report the desktops of the pool: health, last health check error and leased sessions, plus which desktop this session uses
+    
+    Returns:
+        dict: Pool status, or a note when the server runs a single desktop
+    """
+    context = ctx.request_context.lifespan_context
+    if context.pool is None:
+        return {"pool": False, "desktop": context.lease.desktop.name}
+    return {"pool": True, "desktop": context.pool.desktop_of(ctx.session), **context.pool.status()}
 
 @mcp.tool()
 async def execute_bash(ctx: Context, command: str,restart: bool= False) -> Dict[str, Any]:
@@ -300,7 +639,7 @@ async def execute_bash(ctx: Context, command: str,restart: bool= False) -> Dict[
     Returns:
         dict: Command execution result
     """
-    ssh = ctx.request_context.lifespan_context.ssh
+    ssh = (await get_desktop(ctx)).ssh
     if restart:
         ssh_success = await ssh.connect()
         if not ssh_success:
@@ -7,19 +7,27 @@ import os
 import asyncio
 from dataclasses import dataclass
 from contextlib import asynccontextmanager
-from typing import AsyncIterator, Optional, Dict, Any, List
+from typing import AsyncIterator, Optional, Dict, Any, List, Literal
 import io
 import json
 from mcp.server.fastmcp import FastMCP, Image, Context
 from vnc_controller import VNCController
 from ssh_controller import SSHController
+from recorder import ScreenRecorder
+from remote_capture import RemoteCapture
+from local_controller import LocalController
+from local_capture import LocalCapture
+from desktop_pool import Desktop, DesktopPool, Lease
+from accessibility import MAX_DEPTH, MAX_NODES, format_tree
+from clipboard import MAX_CHARS as CLIPBOARD_MAX_CHARS, read_selection
+from trajectory import TrajectoryStore, fingerprint, replay as replay_trajectory
+from image_encoder import ScreenshotEncoder, encode_image
 from tools.computer import ComputerTool20250124 as ComputerTool
 from tools.bash import BashTool
 from tools.edit import Command,EditTool
 import time
-import base64
 # from PIL import Image
-from tools.computer import Action,Action_20250124,ScrollDirection
+from tools.computer import Action,Action_20250124,ScrollDirection,ScalingSource
 import functools
 # import dotenv
 # dotenv.load_dotenv()
@@ -31,9 +39,11 @@ import functools
 @dataclass
 class AppContext:
     """Application context for lifespan management"""
-    vnc: VNCController
-    ssh: SSHController
-    display_num : str
+    encoder: ScreenshotEncoder
+    # lease of the only desktop, shared by every session, or None when desktops are leased from the pool
+    lease: Optional[Lease] = None
+    pool: Optional[DesktopPool] = None
+    trajectories: Optional[TrajectoryStore] = None
 
 # Define lifespan for connection management
 @asynccontextmanager
@@ -55,35 +65,87 @@ async def app_lifespan(server: FastMCP) -> AsyncIterator[AppContext]:
     pem_file = os.environ.get("PEM_FILE", "")
     ssh_port = int(os.environ.get("SSH_PORT", "22"))
     display_num = os.environ.get("DISPLAY_NUM", "1")
+    # keep a live framebuffer mirror so screenshots are served from memory
+    vnc_mirror = os.environ.get("VNC_MIRROR", "1") in ["1", "true", "True"]
+    vnc_mirror_interval = float(os.environ.get("VNC_MIRROR_INTERVAL", "0.05"))
+    # per-action overrides for how long to wait for the screen to settle, as JSON
+    settle_profiles = json.loads(os.environ.get("SETTLE_PROFILES", "{}"))
+    # off, cache (resend the last encoding for an unchanged screen) or placeholder
+    screenshot_dedup = os.environ.get("SCREENSHOT_DEDUP", "cache")
+    # RFB encoding preference such as "zrle,copyrect,raw" and optional 16-bit color
+    vnc_encodings = [name.strip() for name in os.environ.get("VNC_ENCODINGS", "").split(",") if name.strip()]
+    vnc_pixel_depth = int(os.environ["VNC_PIXEL_DEPTH"]) if os.environ.get("VNC_PIXEL_DEPTH") else None
+    # vncdotool (default) or asyncio, which speaks RFB on the event loop without thread hops
+    vnc_backend = os.environ.get("VNC_BACKEND", "vncdotool")
+    # seconds between input events; 0 writes each action's events in one batch
+    vnc_input_pacing = float(os.environ.get("VNC_INPUT_PACING", "0"))
+    # ssh (default) or local for a desktop on this host: commands run as subprocesses
+    # and screenshots are read from the X server through shared memory
+    desktop_backend = os.environ.get("DESKTOP_BACKEND", "ssh")
     
-    # Validate required environment variables
-    if not vnc_host:
-        raise ValueError("VNC_HOST environment variable is required")
-    if not vnc_password:
-        raise ValueError("VNC_PASSWORD environment variable is required")
-    if not vnc_username:
-        raise ValueError("VNC_USERNAME environment variable is required")
+    # JSON file describing a pool of desktops shared by the MCP sessions, see desktops.example.json
+    desktop_pool_file = os.environ.get("DESKTOP_POOL")
     
-    # Initialize controllers
-    vnc_controller = VNCController(vnc_host, vnc_port, vnc_username, vnc_password)
-    ssh_controller = SSHController(vnc_host, ssh_port, vnc_username, vnc_password,pem_file, display_num)
+    # Validate required environment variables; a local desktop needs no VNC server,
+    # input goes through xdotool and screenshots through the X server
+    if not desktop_pool_file and desktop_backend != "local":
+        if not vnc_host:
+            raise ValueError("VNC_HOST environment variable is required")
+        if not vnc_password:
+            raise ValueError("VNC_PASSWORD environment variable is required")
+        if not vnc_username:
+            raise ValueError("VNC_USERNAME environment variable is required")
+    
+    encoder = ScreenshotEncoder.from_env()
+    encoder.start()
+    # successful action sequences per task label, for the replay tool
+    trajectories = TrajectoryStore.from_env()
+    
+    def build_desktop(name="default", vnc_host=vnc_host, vnc_port=vnc_port, vnc_username=vnc_username,
+                      vnc_password=vnc_password, pem_file=pem_file, ssh_port=ssh_port,
+                      display_num=display_num, desktop_backend=desktop_backend, max_sessions=1):
+        """Controllers for one desktop, configured by the environment or a pool entry"""
+        if desktop_backend != "local" and not (vnc_host and vnc_password and vnc_username):
+            raise ValueError(f"Desktop {name}: vnc_host, vnc_username and vnc_password are required")
+        display_num = str(display_num)
+        # Initialize controllers
+        vnc_controller = VNCController(vnc_host, int(vnc_port), vnc_username, vnc_password,
+                                       mirror=vnc_mirror, mirror_interval=vnc_mirror_interval,
+                                       settle_profiles=settle_profiles,
+                                       screenshot_dedup=screenshot_dedup,
+                                       encodings=vnc_encodings, pixel_depth=vnc_pixel_depth,
+                                       backend=vnc_backend, input_pacing=vnc_input_pacing)
+        if desktop_backend == "local":
+            ssh_controller = LocalController(display_num)
+            vnc_controller.frame_source = LocalCapture(display_num)
+        else:
+            ssh_controller = SSHController(vnc_host, int(ssh_port), vnc_username, vnc_password,pem_file, display_num)
+            # SCREENSHOT_SOURCE=ssh grabs the display on the remote host and streams compressed frames over SSH
+            vnc_controller.frame_source = RemoteCapture.from_env(ssh_controller, display_num)
+        # RECORD_FPS > 0 keeps a bounded recording of the screen for replay and debugging
+        recorder = ScreenRecorder.from_env(vnc_controller, name if desktop_pool_file else None)
+        return Desktop(name, vnc_controller, ssh_controller, display_num, max_sessions=max_sessions,
+                       recorder=recorder, trajectories=trajectories)
+    
+    pool = DesktopPool.from_file(desktop_pool_file, build_desktop) if desktop_pool_file else None
+    desktop = None if pool else build_desktop()
     
     try:
         # Connect on startup
-        vnc_success = await vnc_controller.connect()
-        if not vnc_success:
-            print("Warning: Failed to connect to VNC server on startup")
-            
-        ssh_success = await ssh_controller.connect()
-        if not ssh_success:
-            print("Warning: Failed to connect to SSH server on startup")
+        if pool:
+            await pool.start()
+        else:
+            await desktop.start()
         
         # Yield context to server
-        yield AppContext(vnc=vnc_controller, ssh=ssh_controller,display_num=display_num)
+        yield AppContext(encoder=encoder, lease=Lease(desktop) if desktop else None, pool=pool, trajectories=trajectories)
     finally:
         # Disconnect on shutdown
-        await vnc_controller.disconnect()
-        await ssh_controller.disconnect()
+        if pool:
+            await pool.stop()
+        else:
+            await desktop.stop()
+        encoder.shutdown()
 
 # Create MCP server
 mcp = FastMCP(
@@ -93,10 +155,54 @@ mcp = FastMCP(
 )
 
 
+async def get_lease(ctx: Context) -> Lease:
+    """
+    The desktop a request works on with its session's state: the server's only desktop, or with
+    DESKTOP_POOL the one leased to the request's MCP session, leasing one on the session's first call
+    """
+    context = ctx.request_context.lifespan_context
+    if context.pool is None:
+        return context.lease
+    try:
+        return await context.pool.lease(ctx.session)
+    except Exception as e:
+        raise ValueError(f"{e}")
+
+
+async def get_desktop(ctx: Context) -> Desktop:
+    """The desktop a request works on, see get_lease"""
+    return (await get_lease(ctx)).desktop
+
+
+async def get_recorder() -> ScreenRecorder:
+    """Screen recorder of the request's desktop, for resources that get no request context"""
+    recorder = (await get_desktop(mcp.get_context())).recorder
+    if recorder is None:
+        raise ValueError("Screen recording is off, set RECORD_FPS to enable it")
+    return recorder
+
+
+@mcp.resource("recording://index", mime_type="application/json")
+async def recording_index() -> str:
+    """Frames currently held by the screen recording, oldest first, with their sequence numbers and times"""
+    return json.dumps((await get_recorder()).index())
+
+
+@mcp.resource("recording://frames/{seq}", mime_type="image/png")
+async def recording_frame(seq: str) -> bytes:
+    """One recorded frame as PNG, rebuilt from its keyframe and deltas"""
+    _, image = await asyncio.to_thread((await get_recorder()).frame, int(seq))
+    encoded = await asyncio.to_thread(encode_image, image, "png")
+    return encoded.data
+
+
 def update_docstring_with_display_info(func):
     """更新函数的docstring，替换屏幕分辨率占位符"""
-    display_width_px = os.environ.get("WIDTH", "1024")
-    display_height_px = os.environ.get("HEIGHT", "768")
+    # Report the resolution screenshots are scaled to, which is the space coordinates are given in
+    rescale = True if os.environ.get("NOVA") in [True,1,'1'] else False
+    options = ComputerTool(is_nova=rescale).options
+    display_width_px = options["display_width_px"]
+    display_height_px = options["display_height_px"]
     display_num = os.environ.get("DISPLAY_NUM", "1")
     
     if func.__doc__:
@@ -108,24 +214,6 @@ def update_docstring_with_display_info(func):
     return func
 
 
-def base64_to_pil(base64_str):
-    """
-    Convert a base64 string to a PIL Image object
-    
-    Args:
-        base64_str (str): The base64 string. If it contains metadata 
-                         (like 'data:image/jpeg;base64,'), it will be handled.
-    
-    Returns:
-        fastmcp: The fastmcp Image object
-    """
-    # If the base64 string includes metadata (data URI), remove it
-    if ',' in base64_str:
-        base64_str = base64_str.split(',')[1]
-    img_data = base64.b64decode(base64_str)
-    img = Image(data=img_data, format="png")
-    return img
-
 # @mcp.tool()
 # @update_docstring_with_display_info
 # async def capture_region(ctx: Context,x: int, y: int, w: int, h: int) -> Image:
@@ -162,6 +250,7 @@ async def computer( ctx: Context,
                     scroll_direction: ScrollDirection | None = None,
                     scroll_amount: int | None = None,
                     text:str = None,
+                    delta: bool = False,
                    ):
     """
     Use a mouse and keyboard to interact with a computer, and take screenshots.
@@ -200,27 +289,268 @@ async def computer( ctx: Context,
         scroll_direction: The direction to scroll the screen. Required only by `action=scroll`.
         start_coordinate: (x, y): The x (pixels from the left edge) and y (pixels from the top edge) coordinates to start the drag from. Required only by `action=left_click_drag`.
         text: Required only by `action=type`, `action=key`, and `action=hold_key`. Can also be used by click or scroll actions to hold down keys while clicking or scrolling.
+        delta: Return only the regions that changed since the previous screenshot, with their (x, y, width, height) boxes. A full screenshot is returned when most of the screen changed. Defaults to False.
         
     Returns: tool results
     """
 
     # if use NOVA model, the image need to rescale
     rescale = True if os.environ.get("NOVA") in [True,1,'1'] else False
-    computer_tool = ComputerTool(ssh=ctx.request_context.lifespan_context.ssh,
-                                 vnc=ctx.request_context.lifespan_context.vnc,
-                                 is_nova = rescale
+    lease = await get_lease(ctx)
+    desktop = lease.desktop
+    computer_tool = ComputerTool(ssh=desktop.ssh,
+                                 vnc=desktop.vnc,
+                                 encoder=ctx.request_context.lifespan_context.encoder,
+                                 delta=delta,
+                                 is_nova = rescale,
+                                 trajectories=lease.trajectories,
+                                 screenshot_cache=lease.screenshot_cache
                                  )
     tool_input = dict(action=action, coordinate=coordinate, text=text,duration=duration,scroll_direction=scroll_direction,scroll_amount=scroll_amount)
     try:
-        result = await computer_tool(**tool_input)
+        result = await computer_tool.run(**tool_input)
     except Exception as e:
         raise ValueError(f"{e}")
     
-    if result.base64_image:
-        return base64_to_pil(result.base64_image) 
+    if result.regions is not None:
+        # Delta screenshot: the box list, then one cropped image per changed region
+        return [result.output] + [Image(data=encoded.data, format=encoded.format)
+                                  for _, encoded in result.regions]
+    if result.image:
+        # Raw encoded bytes, MCP base64-encodes them once when building the response
+        image = Image(data=result.image, format=result.image_format)
+        if lease.screenshot_cache.mode == "placeholder":
+            # Number the screenshot so later "unchanged since screenshot N" notes resolve
+            return [result.output, image]
+        return image
     else:
         return {'output':result.output,"error":result.error}
     
+@mcp.tool()
+@update_docstring_with_display_info
+async def computer_batch(ctx: Context, actions: List[Dict[str, Any]], delta: bool = False):
+    """
+    Run a sequence of `computer` actions back-to-back in one call, e.g. filling in a form.
+    Actions run without waiting for the screen to settle in between, and only one screenshot is taken after the last action.
+    - The screen's resolution is {display_width_px}x{display_height_px}.
+    - Use it for sequences whose outcome you can predict, such as click a field, type, press Tab, type, click Submit. Take single `computer` actions when each step depends on what the previous one showed.
+    
+    Args:
+        actions: Ordered list of actions, each an object with the same parameters as the `computer` tool, e.g.
+            [{{"action": "left_click", "coordinate": [400, 300]}}, {{"action": "type", "text": "Jane"}}, {{"action": "key", "text": "Tab"}}].
+            Add "screenshot": true to an action to also get a screenshot right after it. Supports mouse_move, clicks, type, key, scroll, wait and the other `computer` actions.
+        delta: Return only the regions that changed since the previous screenshot, with their (x, y, width, height) boxes. Defaults to False.
+    
+    Returns: the output of each step that produced any, then the screenshots, each labelled with its step number. If a step fails, the remaining steps are skipped and the error is returned with a screenshot.
+    """
+    rescale = True if os.environ.get("NOVA") in [True,1,'1'] else False
+    lease = await get_lease(ctx)
+    desktop = lease.desktop
+    computer_tool = ComputerTool(ssh=desktop.ssh,
+                                 vnc=desktop.vnc,
+                                 encoder=ctx.request_context.lifespan_context.encoder,
+                                 delta=delta,
+                                 is_nova = rescale,
+                                 trajectories=lease.trajectories,
+                                 screenshot_cache=lease.screenshot_cache
+                                 )
+    try:
+        results = await computer_tool.batch(actions)
+    except Exception as e:
+        raise ValueError(f"{e}")
+    
+    content = []
+    for number, result in results:
+        action = actions[number - 1]["action"]
+        text = "\n".join(filter(None, [result.output, result.error and f"Error: {result.error}"]))
+        content.append(f"Step {number} ({action}): {text}" if text else f"Step {number} ({action})")
+        if result.regions is not None:
+            content.extend(Image(data=encoded.data, format=encoded.format) for _, encoded in result.regions)
+        elif result.image:
+            content.append(Image(data=result.image, format=result.image_format))
+    return content
+
+@mcp.tool()
+async def wait_for_change(ctx: Context, region: List[int] = None, timeout: float = 10):
+    """
+    Wait until the screen, or a region of it, changes and return a screenshot.
+    Use this instead of repeated `wait` or `screenshot` actions while waiting for a page load, dialog or installer.
+    
+    Args:
+        region: (x, y, width, height) of the area to watch, in the same coordinates as the `computer` tool. Leave unset to watch the whole screen.
+        timeout: Seconds to wait at most. Defaults to 10.
+    
+    Returns: whether the screen changed and how long it waited, then a screenshot
+    """
+    rescale = True if os.environ.get("NOVA") in [True,1,'1'] else False
+    lease = await get_lease(ctx)
+    computer_tool = ComputerTool(ssh=lease.desktop.ssh,
+                                 vnc=lease.desktop.vnc,
+                                 encoder=ctx.request_context.lifespan_context.encoder,
+                                 is_nova = rescale,
+                                 screenshot_cache=lease.screenshot_cache
+                                 )
+    try:
+        result = await computer_tool.wait_for_change(region, timeout)
+    except Exception as e:
+        raise ValueError(f"{e}")
+    
+    if result.image:
+        return [result.output, Image(data=result.image, format=result.image_format)]
+    return result.output
+
+@mcp.tool()
+async def trajectory_record(ctx: Context, task: str):
+    """
+    Start recording the `computer` actions that follow as the trajectory for a task, so the next run of the same task can use `replay` instead.
+    Call `trajectory_save` once the task is done.
+    
+    Args:
+        task: Short label that identifies the task, e.g. "export monthly report as PDF"
+    """
+    (await get_lease(ctx)).trajectories.start(task)
+    return f"Recording actions for task '{task}'"
+
+@mcp.tool()
+async def trajectory_save(ctx: Context, success: bool = True):
+    """
+    Stop recording. A successful trajectory replaces the one stored for the task, a failed one is discarded.
+    
+    Args:
+        success: Whether the task was completed. Defaults to True.
+    """
+    lease = await get_lease(ctx)
+    final = fingerprint(await lease.desktop.vnc.capture_screenshot()) if success else None
+    trajectory = lease.trajectories.finish(success, final)
+    if trajectory is None:
+        return "Nothing was being recorded"
+    if not success or not trajectory["steps"]:
+        return f"Discarded the recording for task '{trajectory['task']}'"
+    return f"Saved {len(trajectory['steps'])} steps for task '{trajectory['task']}'"
+
+@mcp.tool()
+async def trajectory_list(ctx: Context) -> List[Dict[str, Any]]:
+    """
+    List the tasks that have a recorded trajectory to `replay`
+    
+    Returns: task label, number of steps and recording time of each trajectory
+    """
+    return ctx.request_context.lifespan_context.trajectories.summary()
+
+@mcp.tool()
+async def replay(ctx: Context, task: str):
+    """
+    Replay the recorded trajectory of a task. Before each step the screen is compared to the screen the step was recorded on.
+    If the screen diverges or a step fails, replay stops and returns the steps that were not run, so you can finish the task with `computer` actions from the current screenshot.
+    
+    Args:
+        task: Task label the trajectory was recorded under, see `trajectory_list`
+    
+    Returns: how far the replay got, the error of a failed step, the remaining steps if it stopped early, and a screenshot
+    """
+    context = ctx.request_context.lifespan_context
+    trajectory = context.trajectories.trajectories.get(task)
+    if trajectory is None:
+        raise ValueError(f"No trajectory recorded for task '{task}'")
+    rescale = True if os.environ.get("NOVA") in [True,1,'1'] else False
+    lease = await get_lease(ctx)
+    computer_tool = ComputerTool(ssh=lease.desktop.ssh, vnc=lease.desktop.vnc, encoder=context.encoder, is_nova = rescale,
+                                 screenshot_cache=lease.screenshot_cache)
+    try:
+        done, diverged, error = await replay_trajectory(computer_tool, trajectory, context.trajectories.ignore)
+        screenshot = await computer_tool.screenshot()
+    except Exception as e:
+        raise ValueError(f"{e}")
+    
+    steps = trajectory["steps"]
+    if diverged is None:
+        status = f"Replayed all {len(steps)} steps of task '{task}'"
+    elif error:
+        remaining = json.dumps([step["action"] for step in steps[diverged:]])
+        status = (f"Step {diverged + 1} of {len(steps)} failed: {error}. {done} steps were run before it. "
+                  f"Steps not completed, starting with the failed one: {remaining}")
+    elif diverged == len(steps):
+        status = (f"Ran all {len(steps)} steps of task '{task}', but the final screen differs from the recording. "
+                  "Check the screenshot.")
+    else:
+        remaining = json.dumps([step["action"] for step in steps[diverged:]])
+        status = (f"The screen diverged from the recording before step {diverged + 1} of {len(steps)}, "
+                  f"{done} steps were run. Steps not run: {remaining}")
+    if screenshot.image:
+        return [status, Image(data=screenshot.image, format=screenshot.image_format)]
+    return "\n".join(filter(None, [status, screenshot.output]))
+
+@mcp.tool()
+async def accessibility_tree(ctx: Context, max_depth: int = MAX_DEPTH, max_nodes: int = MAX_NODES) -> Dict[str, Any]:
+    """
+    List the widgets on screen from the desktop's accessibility tree (AT-SPI): role, name, bounds and focus, as an indented outline.
+    Bounds are (x, y, width, height) in the same coordinates as the `computer` tool, so the center of a widget can be clicked directly.
+    Much cheaper than a screenshot for finding buttons, fields and menu items. Applications that do not support accessibility are missing from it.
+    The result is cached until the screen changes.
+    
+    Args:
+        max_depth: Deepest widget nesting to walk. Defaults to 30.
+        max_nodes: Most widgets to list. Defaults to 400.
+    
+    Returns: tree with one line per widget, the widget count and whether it came from the cache
+    """
+    desktop = await get_desktop(ctx)
+    rescale = True if os.environ.get("NOVA") in [True,1,'1'] else False
+    computer_tool = ComputerTool(is_nova = rescale)
+    try:
+        rows, cached = await desktop.accessibility.rows(max_depth, max_nodes)
+    except Exception as e:
+        raise ValueError(f"{e}")
+    tree = format_tree(rows, lambda x, y: computer_tool.scale_coordinates(ScalingSource.COMPUTER, x, y))
+    return {"tree": tree, "widgets": len(rows), "cached": cached}
+
+@mcp.tool()
+async def clipboard_read(ctx: Context, selection: Literal["clipboard", "primary"] = "clipboard",
+                         offset: int = 0, max_chars: int = None) -> Dict[str, Any]:
+    """
+    Read the desktop's clipboard or the currently selected text as exact text, instead of reading it off a screenshot.
+    Copy with the `computer` tool (e.g. key ctrl+c) and read `clipboard`, or just select text with the mouse and read `primary`.
+    Long text is returned in pages: when `truncated` is true, call again with `offset` set to `next_offset`.
+    
+    Args:
+        selection: `clipboard` for copied text, `primary` for the current selection. Defaults to `clipboard`.
+        offset: Character to start reading at. Defaults to 0.
+        max_chars: Most characters to return, capped at 20000 by default.
+    
+    Returns: text, offset, total length in characters, whether text is left and the offset to continue from
+    """
+    desktop = await get_desktop(ctx)
+    cap = int(os.environ.get("CLIPBOARD_MAX_CHARS", str(CLIPBOARD_MAX_CHARS)))
+    try:
+        return await read_selection(desktop.ssh, desktop.display_num, selection, offset,
+                                    min(max_chars or cap, cap))
+    except Exception as e:
+        raise ValueError(f"{e}")
+
+@mcp.tool()
+async def vnc_stats(ctx: Context) -> Dict[str, Any]:
+    """
+    Report desktop connection statistics: the action queue depth, coalesced actions and shared
+    screenshots, plus VNC traffic per framebuffer update.
+    
+    Returns:
+        dict: Connection statistics
+    """
+    return (await get_desktop(ctx)).vnc.stats()
+
+@mcp.tool()
+async def desktop_pool_status(ctx: Context) -> Dict[str, Any]:
+    """
+    Report the desktops of the pool: health, last health check error and leased sessions, plus which desktop this session uses.
+    
+    Returns:
+        dict: Pool status, or a note when the server runs a single desktop
+    """
+    context = ctx.request_context.lifespan_context
+    if context.pool is None:
+        return {"pool": False, "desktop": context.lease.desktop.name}
+    return {"pool": True, "desktop": context.pool.desktop_of(ctx.session), **context.pool.status()}
+
 @mcp.tool()
 async def bash(ctx: Context, command: str,restart: bool = None):
     """
@@ -238,7 +568,7 @@ async def bash(ctx: Context, command: str,restart: bool = None):
     
     Returns: tool results
     """
-    bash_tool = BashTool(ssh=ctx.request_context.lifespan_context.ssh)
+    bash_tool = BashTool(ssh=(await get_desktop(ctx)).ssh)
     tool_input = dict(command=command, restart=restart)
     try:
         result = await bash_tool(**tool_input)
@@ -279,7 +609,7 @@ async def str_replace_editor(ctx: Context,
     
     Returns: tool results
     """
-    editor_tool = EditTool(ssh=ctx.request_context.lifespan_context.ssh)
+    editor_tool = EditTool(ssh=(await get_desktop(ctx)).ssh)
     tool_input = dict(command=command, path=path,file_text=file_text, view_range=view_range, old_str=old_str, new_str=new_str, insert_line=insert_line )
     try:
         result = await editor_tool(**tool_input)
@@ -71,12 +71,13 @@ class SSHController:
             finally:
                 self.client = None
                 
-    async def execute_command(self, command):
+    async def execute_command(self, command, input=None):
         """
         Execute command on remote server
         
         Args:
             command (str): Command to execute
+            input (str): Text streamed to the command's stdin, which is then closed
             
         Returns:
             dict: Command execution result
@@ -89,6 +90,9 @@ class SSHController:
         try:
             # Execute command and get output
             stdin, stdout, stderr = await asyncio.to_thread(self.client.exec_command, command)
+            if input is not None:
+                await asyncio.to_thread(stdin.write, input.encode())
+                await asyncio.to_thread(stdin.channel.shutdown_write)
             output = await asyncio.to_thread(stdout.read)
             error = await asyncio.to_thread(stderr.read)
             
@@ -0,0 +1,65 @@
+"""
+Tests for the screen fingerprints replay compares against
+
+Run with: python -m unittest test_trajectory
+"""
+import unittest
+from PIL import Image, ImageDraw, ImageFont
+from trajectory import fingerprint, matches, parse_regions
+
+SCREEN_SIZE = (1920, 1080)
+
+
+def desktop(checkbox=False, text="", clock="09:37", offset=(0, 0)):
+    """A light desktop with a dark panel clock, a 16x16 checkbox and a text field"""
+    image = Image.new("RGB", SCREEN_SIZE, (246, 245, 244))
+    draw = ImageDraw.Draw(image)
+    font = ImageFont.load_default(size=14)
+    draw.rectangle((0, 0, SCREEN_SIZE[0] - 1, 31), fill=(40, 40, 40))
+    draw.text((1850, 8), clock, font=font, fill=(255, 255, 255))
+    x, y = 300 + offset[0], 200 + offset[1]
+    draw.rectangle((x, y, x + 15, y + 15), outline=(120, 120, 120), fill=(255, 255, 255))
+    if checkbox:
+        draw.line([(x + 3, y + 8), (x + 6, y + 11), (x + 12, y + 4)], fill=(30, 30, 30), width=2)
+    draw.rectangle((x + 40, y - 4, x + 300, y + 20), outline=(180, 180, 180), fill=(255, 255, 255))
+    draw.text((x + 44, y), text, font=font, fill=(30, 30, 30))
+    return image
+
+
+class FingerprintTest(unittest.TestCase):
+    def test_same_screen_matches(self):
+        self.assertTrue(matches(fingerprint(desktop()), fingerprint(desktop())))
+
+    def test_ticked_checkbox_differs(self):
+        # Every alignment of the checkbox to the cell grid
+        for dx in range(4):
+            for dy in range(4):
+                with self.subTest(offset=(dx, dy)):
+                    before = fingerprint(desktop(offset=(dx, dy)))
+                    after = fingerprint(desktop(checkbox=True, offset=(dx, dy)))
+                    self.assertFalse(matches(before, after))
+
+    def test_typed_text_differs(self):
+        empty = fingerprint(desktop())
+        self.assertFalse(matches(empty, fingerprint(desktop(text="Jane Doe"))))
+        self.assertFalse(matches(fingerprint(desktop(text="Jane Do")), fingerprint(desktop(text="Jane Doe"))))
+
+    def test_ignored_clock_matches(self):
+        before, after = fingerprint(desktop()), fingerprint(desktop(clock="14:05"))
+        self.assertFalse(matches(before, after))
+        self.assertTrue(matches(before, after, ignore=parse_regions("1800,0,120,32")))
+
+    def test_other_screen_size_or_format_differs(self):
+        small = fingerprint(Image.new("RGB", (1024, 768), (246, 245, 244)))
+        self.assertFalse(matches(fingerprint(desktop()), small))
+        self.assertFalse(matches(fingerprint(desktop()), "00" * 1440))
+
+    def test_parse_regions(self):
+        self.assertEqual(parse_regions(""), [])
+        self.assertEqual(parse_regions("1800,0,120,32; 0,1040,40,40"), [(1800, 0, 120, 32), (0, 1040, 40, 40)])
+        with self.assertRaises(ValueError):
+            parse_regions("1800,0,120")
+
+
+if __name__ == "__main__":
+    unittest.main()
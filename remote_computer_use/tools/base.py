@@ -30,7 +30,11 @@ class ToolResult:
 
     output: str | None = None
     error: str | None = None
-    base64_image: str | None = None
+    # Encoded image bytes, base64 is left to the MCP transport
+    image: bytes | None = None
+    image_format: str | None = None
+    # Changed ((x, y, w, h), EncodedImage) crops of a delta screenshot, sent instead of image
+    regions: list | None = None
     system: str | None = None
 
     def __bool__(self):
@@ -49,7 +53,9 @@ class ToolResult:
         return ToolResult(
             output=combine_fields(self.output, other.output),
             error=combine_fields(self.error, other.error),
-            base64_image=combine_fields(self.base64_image, other.base64_image, False),
+            image=combine_fields(self.image, other.image, False),
+            image_format=combine_fields(self.image_format, other.image_format, False),
+            regions=combine_fields(self.regions, other.regions, False),
             system=combine_fields(self.system, other.system),
         )
 
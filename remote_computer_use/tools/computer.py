@@ -1,22 +1,34 @@
 
 import asyncio
-import base64
 import os
+import re
 import shlex
 import shutil
 from enum import StrEnum
 from pathlib import Path
 from typing import Literal, TypedDict,get_args
 from uuid import uuid4
-import io
 from anthropic.types.beta import BetaToolComputerUse20241022Param
 from .tools_config import computer_tool_description,computer_tool_input_schema
 from .base import BaseAnthropicTool, ToolError, ToolResult
+from image_encoder import describe_regions, encode_image
+from trajectory import UNRECORDED_ACTIONS, fingerprint
 
 OUTPUT_DIR = "/tmp/outputs"
 
 TYPING_DELAY_MS = 20
 TYPING_GROUP_SIZE = 50
+# Text at least this long is pasted through the clipboard instead of typed key by key.
+# The clipboard's previous text is saved first and put back after the paste; other
+# content types (images, files) are not kept.
+TYPE_PASTE_MIN_CHARS = 200
+# Seconds the focused application gets to read the pasted text before the clipboard is restored
+PASTE_RESTORE_DELAY = 0.5
+# Window classes that get typed text, as they do not paste the clipboard with a keystroke
+TYPE_PASTE_EXCLUDED_CLASSES = ("xterm", "uxterm", "urxvt", "rxvt", "st-256color", "vncviewer")
+# Terminals paste with ctrl+shift+v, ctrl+v means something else there
+TERMINAL_CLASSES = ("xfce4-terminal", "gnome-terminal", "gnome-terminal-server", "konsole",
+                    "terminator", "tilix", "alacritty", "kitty", "lxterminal", "mate-terminal")
 
 Action = Literal[
     "key", #Action_20241022
@@ -94,10 +106,21 @@ class BaseComputerTool(BaseAnthropicTool):
     height: int
     display_num: int | None
     is_nova:bool = False
-    _screenshot_delay = 2.0
+    # None uses the settle profile's max_wait for the action
+    _settle_max_wait: float | None = None
     _scaling_enabled = True
     ssh = None
     vnc = None
+    encoder = None
+    delta = False
+    # inside batch(): actions skip their settle and screenshot
+    _batch = False
+    # seconds the screen took to settle after the last action
+    last_settle = 0.0
+    # TrajectoryStore that actions run through run() are recorded to while it is recording
+    trajectories = None
+    # ScreenshotCache of the session the screenshots go to
+    screenshot_cache = None
 
     @property
     def options(self) -> ComputerToolOptions:
@@ -126,7 +149,7 @@ class BaseComputerTool(BaseAnthropicTool):
             }
         }
 
-    def __init__(self,is_nova=False,ssh=None,vnc=None):
+    def __init__(self,is_nova=False,ssh=None,vnc=None,encoder=None,delta=False,trajectories=None,screenshot_cache=None):
         super().__init__()
 
         self.width = int(os.getenv("WIDTH") or 1024)
@@ -141,7 +164,18 @@ class BaseComputerTool(BaseAnthropicTool):
         self.is_nova = is_nova
         self.ssh=ssh
         self.vnc=vnc
+        self.encoder=encoder
+        # send only the regions that changed since the previous screenshot
+        self.delta=delta
+        self.trajectories=trajectories
+        # the desktop's own cache when no session state is given
+        self.screenshot_cache=screenshot_cache if screenshot_cache is not None or vnc is None else vnc.screenshot_cache
         self.xdotool = f"{self._display_prefix}xdotool"
+        # 0 always types key by key
+        self.paste_min_chars = int(os.getenv("TYPE_PASTE_MIN_CHARS") or TYPE_PASTE_MIN_CHARS)
+        self.paste_excluded = TYPE_PASTE_EXCLUDED_CLASSES + tuple(
+            name.strip().lower() for name in os.getenv("TYPE_PASTE_EXCLUDE", "").split(",") if name.strip()
+        )
 
     def validate_and_get_coordinates(self, coordinate: tuple[int, int] | None = None):
             if not isinstance(coordinate, list) or len(coordinate) != 2:
@@ -170,10 +204,11 @@ class BaseComputerTool(BaseAnthropicTool):
 
 
             if action == "mouse_move":
-                return await self.shell(f"{self.xdotool} mousemove --sync {x} {y}")
+                return await self.shell(f"{self.xdotool} mousemove --sync {x} {y}", action=action)
             elif action == "left_click_drag":
                 return await self.shell(
-                    f"{self.xdotool} mousedown 1 mousemove --sync {x} {y} mouseup 1"
+                    f"{self.xdotool} mousedown 1 mousemove --sync {x} {y} mouseup 1",
+                    action=action,
                 )
 
         if action in ("key", "type"):
@@ -185,18 +220,14 @@ class BaseComputerTool(BaseAnthropicTool):
                 raise ToolError(output=f"{text} must be a string")
 
             if action == "key":
-                return await self.shell(f"{self.xdotool} key -- {text}")
+                return await self.shell(f"{self.xdotool} key -- {text}", action=action)
             elif action == "type":
-                results: list[ToolResult] = []
-                for chunk in chunks(text, TYPING_GROUP_SIZE):
-                    cmd = f"{self.xdotool} type --delay {TYPING_DELAY_MS} -- {shlex.quote(chunk)}"
-                    results.append(await self.shell(cmd, take_screenshot=False))
-                screenshot_base64 = (await self.screenshot()).base64_image
-                return ToolResult(
-                    output="".join(result.output or "" for result in results),
-                    error="".join(result.error or "" for result in results),
-                    base64_image=screenshot_base64,
-                )
+                # One scheduler job for the whole text, so no other session's input lands between chunks
+                results = await self.vnc.scheduler.submit(lambda: self.type_text(text))
+                return await self.finish(ToolResult(
+                    output="".join(result.get("output", "") for result in results),
+                    error="".join(result.get("error", "") for result in results),
+                ), action)
 
         if action in (
             "left_click",
@@ -227,7 +258,7 @@ class BaseComputerTool(BaseAnthropicTool):
                 return result.replace(output=f"X={x},Y={y}")
             else:
                 click_arg = CLICK_BUTTONS[action]
-                return await self.shell(f"{self.xdotool} click {click_arg}")
+                return await self.shell(f"{self.xdotool} click {click_arg}", action=action)
 
         raise ToolError(f"Invalid action: {action}")
     
@@ -238,31 +269,214 @@ class BaseComputerTool(BaseAnthropicTool):
             raise ToolError(f"Failed to take screenshot: {e}")
 
         
-        # Convert PIL Image to bytes
-        img_bytes = io.BytesIO()
-        screenshot.save(img_bytes, format="PNG")
-        
-        img_bytes.seek(0)  # 重置指针到开始位置
-    
-        # 转换为base64编码
-        base64_encoded = base64.b64encode(img_bytes.getvalue())
-        base64_string = base64_encoded.decode('utf-8')
-        
-        return ToolResult(output="took screeshot successfully",base64_image=base64_string)
+        # Ship the image at the resolution the API coordinates are expressed in
+        size = self.screenshot_size()
+        cache = self.screenshot_cache
+        previous = cache.remember_frame(None, screenshot)
+
+        if self.delta and self.encoder is not None:
+            regions = await self.encoder.encode_delta(screenshot, previous, size=size)
+            if regions is not None:
+                return ToolResult(output=describe_regions(regions), regions=regions)
+
+        # Encode off the event loop with the configured format and budget,
+        # reusing the last encoding when the screen has not changed
+        if self.encoder is not None:
+            encoded = await self.encoder.encode_async(screenshot, size=size, cache=cache)
+        else:
+            encoded = encode_image(screenshot, size=size)
+
+        if encoded.repeat and cache.mode == "placeholder":
+            return ToolResult(output=f"Screen unchanged since screenshot {encoded.number}")
+        if cache.mode == "placeholder" and encoded.number is not None:
+            return ToolResult(output=f"Screenshot {encoded.number}",image=encoded.data,image_format=encoded.format)
+        return ToolResult(output="took screeshot successfully",image=encoded.data,image_format=encoded.format)
+
+    async def wait_for_change(self, region: list[int] | None = None, timeout: float = 10) -> ToolResult:
+        """Wait until the screen, or an (x, y, width, height) region of it, changes and take a screenshot."""
+        if region is not None:
+            if not isinstance(region, list) or len(region) != 4:
+                raise ToolError(f"{region} must be a list of length 4")
+            if not all(isinstance(i, int) and i >= 0 for i in region):
+                raise ToolError(f"{region} must be a list of non-negative ints")
+            left, top = self.scale_coordinates(ScalingSource.API, region[0], region[1])
+            right, bottom = self.scale_coordinates(
+                ScalingSource.API, region[0] + region[2], region[1] + region[3]
+            )
+            region = (left, top, max(1, right - left), max(1, bottom - top))
+        if not isinstance(timeout, (int, float)) or not 0 <= timeout <= 100:
+            raise ToolError(f"{timeout=} must be between 0 and 100")
+
+        try:
+            changed, waited = await self.vnc.wait_for_change(region, timeout)
+        except Exception as e:
+            raise ToolError(f"Failed to wait for a screen change: {e}")
+        status = f"Screen changed after {waited:.2f}s" if changed else f"No change within {timeout}s"
+        return self.with_screenshot(ToolResult(output=status), await self.screenshot())
 
-    async def shell(self, command: str, take_screenshot=True) -> ToolResult:
+    async def settle(self, action: str | None = None) -> float:
+        """Wait for the screen to settle after an action, per the action's settle profile."""
+        try:
+            self.last_settle = await self.vnc.wait_for_settle(action=action, max_wait=self._settle_max_wait)
+            return self.last_settle
+        except Exception as e:
+            raise ToolError(f"Failed to wait for the screen to settle: {e}")
+
+    async def shell(self, command: str, take_screenshot=True, action: str | None = None,
+                    input: str | None = None) -> ToolResult:
         """Run a shell command and return the output, error, and optionally a screenshot."""
-        results = await self.ssh.execute_command(command)
-        stdout = results.get('output','')
-        stderr = results.get('error','')
-        base64_image = None
+        # Queue behind other input to this desktop; a queued move is dropped for a newer one
+        results = await self.vnc.scheduler.submit(
+            lambda: self.ssh.execute_command(command, input=input),
+            coalesce="mouse_move" if action == "mouse_move" else None,
+        )
+        result = ToolResult(output=results.get('output',''), error=results.get('error',''))
 
         if take_screenshot:
-            # delay to let things settle before taking a screenshot
-            await asyncio.sleep(self._screenshot_delay)
-            base64_image = (await self.screenshot()).base64_image
+            return await self.finish(result, action)
+
+        return result
+
+    async def type_text(self, text: str) -> list[dict]:
+        """
+        Type text in chunks, or paste it when it is long enough, inside the caller's scheduler job.
+        Returns the command results.
+        """
+        if self.paste_min_chars and len(text) >= self.paste_min_chars:
+            pasted = await self.paste(text)
+            if pasted is not None:
+                return [pasted]
+        results = []
+        for chunk in chunks(text, TYPING_GROUP_SIZE):
+            cmd = f"{self.xdotool} type --delay {TYPING_DELAY_MS} -- {shlex.quote(chunk)}"
+            results.append(await self.ssh.execute_command(cmd))
+        return results
+
+    async def paste(self, text: str) -> dict | None:
+        """
+        Type text by streaming it into the clipboard over SSH and pressing the paste keystroke once.
+        Runs inside the caller's scheduler job, so focus cannot change between the probe and the paste.
+        Returns None when the focused window should get the text typed instead.
+        """
+        window = await self.ssh.execute_command(
+            f"{self._display_prefix}xprop -id $({self.xdotool} getactivewindow) WM_CLASS"
+        )
+        # WM_CLASS(STRING) = "xfce4-terminal", "Xfce4-terminal"
+        window_classes = {name.lower() for name in re.findall(r'"([^"]*)"', window.get("output", ""))}
+        if window.get("error") or not window_classes or window_classes & set(self.paste_excluded):
+            return None
+        keystroke = "ctrl+shift+v" if window_classes & set(TERMINAL_CLASSES) else "ctrl+v"
+        xclip = f"{self._display_prefix}xclip -selection clipboard"
+        # Save the clipboard, paste, then put the saved text back once the application has read it.
+        # xclip keeps serving the selection in the background, so it must not hold the channel open
+        return await self.ssh.execute_command(
+            f"saved=$(mktemp) && {xclip} -o </dev/null >\"$saved\" 2>/dev/null; "
+            f"{xclip} -i >/dev/null 2>&1 && sleep 0.1 && "
+            f"{self.xdotool} key --clearmodifiers {keystroke}; status=$?; "
+            f"sleep {PASTE_RESTORE_DELAY}; {xclip} -i \"$saved\" >/dev/null 2>&1; "
+            f"rm -f \"$saved\"; exit $status",
+            input=text,
+        )
+
+    async def finish(self, result: ToolResult, action: str | None = None) -> ToolResult:
+        """Wait for the screen to settle after an action and attach a screenshot, unless batching."""
+        if self._batch:
+            return result
+        await self.settle(action)
+        return self.with_screenshot(result, await self.screenshot())
+
+    async def run(self, check_screen: bool = True, **kwargs) -> ToolResult:
+        """
+        Run an action, adding it to the trajectory being recorded, if any.
+        With check_screen=False the step is recorded without the screen it was taken on,
+        so replay runs it right after the previous step, as batch() does.
+        """
+        action = kwargs["action"]
+        recording = (self.trajectories is not None and self.trajectories.recording is not None
+                     and action not in UNRECORDED_ACTIONS)
+        if not recording:
+            return await self(**kwargs)
+        # The state the action was taken on, for replay to check against
+        before = fingerprint(await self.vnc.capture_screenshot()) if check_screen else None
+        self.last_settle = 0.0
+        result = await self(**kwargs)
+        if not result.error:
+            self.trajectories.record({key: value for key, value in kwargs.items() if value is not None},
+                                     before, self.last_settle)
+        return result
+
+    async def batch(self, steps: list[dict]) -> list[tuple[int, ToolResult]]:
+        """
+        Run a sequence of actions back-to-back, settling and taking a screenshot only
+        after steps marked with "screenshot": true and after the last step.
+
+        A failing step stops the sequence; its error is returned with a screenshot.
+        Every step that ran is recorded to a trajectory being recorded.
+        Returns (step number, result) for every step that produced output, an error or a screenshot.
+        """
+        if not isinstance(steps, list) or not steps:
+            raise ToolError(f"{steps=} must be a non-empty list of actions")
+        for number, step in enumerate(steps, 1):
+            if not isinstance(step, dict) or "action" not in step:
+                raise ToolError(f"Step {number} must be an object with an action")
+
+        results = []
+        for number, step in enumerate(steps, 1):
+            step = dict(step)
+            marked = bool(step.pop("screenshot", False)) or number == len(steps)
+            action = step["action"]
+            failed = False
+            # marked steps settle and take their screenshot themselves, so a recording gets the settle time
+            self._batch = not marked
+            try:
+                # later steps follow without waiting for the screen, and do so in replay too
+                result = await self.run(check_screen=number == 1, **step)
+            except Exception as e:
+                result = ToolResult(error=f"Step {number} ({action}) failed, the remaining steps were skipped: {e}")
+                marked = failed = True
+            finally:
+                self._batch = False
+            if marked and result.image is None and result.regions is None:
+                result = await self.finish(result, action)
+            if result or result.regions is not None:
+                results.append((number, result))
+            if failed:
+                break
+        return results
+
+    def with_screenshot(self, result: ToolResult, screenshot: ToolResult) -> ToolResult:
+        """Attach a screenshot to a command result, keeping any note the model needs to read it."""
+        output = result.output
+        if screenshot.image is None or self.screenshot_cache.mode == "placeholder":
+            # the screenshot number, "unchanged" note or changed region list
+            output = "\n".join(filter(None, [output, screenshot.output]))
+        return result.replace(
+            output=output,
+            image=screenshot.image,
+            image_format=screenshot.image_format,
+            regions=screenshot.regions,
+        )
 
-        return ToolResult(output=stdout, error=stderr, base64_image=base64_image)
+    def scaling_target(self) -> Resolution | None:
+        """Return the MAX_SCALING_TARGETS entry the screen is scaled down to, if any."""
+        ratio = self.width / self.height
+        for dimension in MAX_SCALING_TARGETS.values():
+            # allow some error in the aspect ratio - not ratios are exactly 16:9
+            if abs(dimension["width"] / dimension["height"] - ratio) < 0.02:
+                if dimension["width"] < self.width:
+                    return dimension
+                break
+        return None
+
+    def screenshot_size(self) -> tuple[int, int] | None:
+        """Return the (width, height) screenshots are resampled to, None to keep native size."""
+        # Nova coordinates live on a fixed 0-1000 grid, independent of the image size
+        if not self._scaling_enabled or self.is_nova:
+            return None
+        target_dimension = self.scaling_target()
+        if target_dimension is None:
+            return None
+        return target_dimension["width"], target_dimension["height"]
 
     def scale_coordinates(self, source: ScalingSource, x: int, y: int):
         """Scale coordinates to a target maximum resolution."""
@@ -282,14 +496,7 @@ class BaseComputerTool(BaseAnthropicTool):
             # return round(x * x_scaling_factor), round(y * y_scaling_factor)
     
         else:
-            ratio = self.width / self.height
-            target_dimension = None
-            for dimension in MAX_SCALING_TARGETS.values():
-                # allow some error in the aspect ratio - not ratios are exactly 16:9
-                if abs(dimension["width"] / dimension["height"] - ratio) < 0.02:
-                    if dimension["width"] < self.width:
-                        target_dimension = dimension
-                    break
+            target_dimension = self.scaling_target()
             if target_dimension is None:
                 return x, y
             x_scaling_factor = target_dimension["width"] / self.width
@@ -327,7 +534,7 @@ class ComputerTool20250124(BaseComputerTool, BaseAnthropicTool):
                 self.xdotool,
                 f"{'mousedown' if action == 'left_mouse_down' else 'mouseup'} 1",
             ]
-            return await self.shell(" ".join(command_parts))
+            return await self.shell(" ".join(command_parts), action=action)
         if action == "scroll":
             if scroll_direction is None or scroll_direction not in get_args(
                 ScrollDirection
@@ -355,7 +562,7 @@ class ComputerTool20250124(BaseComputerTool, BaseAnthropicTool):
             if text:
                 command_parts.append(f"keyup {text}")
 
-            return await self.shell(" ".join(command_parts))
+            return await self.shell(" ".join(command_parts), action=action)
 
         if action in ("hold_key", "wait"):
             if duration is None or not isinstance(duration, (int, float)):
@@ -375,11 +582,11 @@ class ComputerTool20250124(BaseComputerTool, BaseAnthropicTool):
                     f"sleep {duration}",
                     f"keyup {escaped_keys}",
                 ]
-                return await self.shell(" ".join(command_parts))
+                return await self.shell(" ".join(command_parts), action=action)
 
             if action == "wait":
                 await asyncio.sleep(duration)
-                return await self.screenshot()
+                return ToolResult() if self._batch else await self.screenshot()
 
         if action in (
             "left_click",
@@ -402,7 +609,7 @@ class ComputerTool20250124(BaseComputerTool, BaseAnthropicTool):
             if key:
                 command_parts.append(f"keyup {key}")
 
-            return await self.shell(" ".join(command_parts))
+            return await self.shell(" ".join(command_parts), action=action)
 
         return await super().__call__(
             action=action, text=text, coordinate=coordinate, key=key, **kwargs
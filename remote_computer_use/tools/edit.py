@@ -302,6 +302,8 @@ class EditTool(BaseAnthropicTool):
     async def read_file(self, path: str):
         """Read file content via SSH"""
         try:
+            if getattr(self._ssh_controller, "local", False):
+                return await self._ssh_controller.read_file(path)
             result = await self._ssh_controller.execute_command(f"cat '{path}'")
             if not result["success"]:
                 raise ToolError(f"Failed to read {path}: {result['error']}")
@@ -312,6 +314,8 @@ class EditTool(BaseAnthropicTool):
     async def write_file(self, path: str, file_content: str):
         """Write file content via SSH, creating parent directories if needed"""
         try:
+            if getattr(self._ssh_controller, "local", False):
+                return await self._ssh_controller.write_file(path, file_content)
             # Extract the directory part of the path
             directory = path.rsplit('/', 1)[0]
             if not directory:
@@ -0,0 +1,264 @@
+"""
+Trajectory Module for Computer Use MCP Server
+Records computer actions with screen fingerprints per task and replays them
+"""
+import asyncio
+import base64
+import copy
+import json
+import os
+import sys
+import time
+import zlib
+import numpy as np
+from PIL import Image
+
+# Fingerprints hold the mean gray level of each square cell this many pixels wide
+CELL_SIZE = 4
+# Gray level change that marks a cell as different. Measured at 1920x1080 with 4 pixel
+# cells: ticking a 16x16 checkbox changes 5 to 7 cells by more than this, one more
+# character of gray 14px text 4 to 6 cells, a blinking text caret 5 cells
+CELL_THRESHOLD = 12
+# Cells that may differ for two screens to count as the same state. Too few for a
+# checkbox or a typed character; a blinking caret is caught by polling in its other
+# phase, and regions that change on their own, such as a clock, go in TRAJECTORY_IGNORE
+MAX_CHANGED_CELLS = 2
+# Actions that do not change the screen, or whose timing replay handles itself
+UNRECORDED_ACTIONS = ("screenshot", "cursor_position", "wait")
+# Replay waits this long beyond the settle time seen while recording for the next state
+REPLAY_GRACE = 1.0
+REPLAY_POLL_INTERVAL = 0.05
+
+
+def fingerprint(image):
+    """
+    Signature of a screen: the mean gray level of each CELL_SIZE square cell
+
+    Args:
+        image (PIL.Image): Screenshot
+
+    Returns:
+        str: Grid size in cells and the compressed gray levels, e.g. '480x270:eJzt...'
+    """
+    columns = -(-image.width // CELL_SIZE)
+    rows = -(-image.height // CELL_SIZE)
+    cells = image.convert("L").resize((columns, rows), Image.Resampling.BOX).tobytes()
+    return f"{columns}x{rows}:{base64.b64encode(zlib.compress(cells)).decode()}"
+
+
+def _cells(screen_fingerprint):
+    """Gray levels of a fingerprint as a rows x columns array"""
+    size, _, data = screen_fingerprint.partition(":")
+    try:
+        columns, rows = (int(n) for n in size.split("x"))
+        cells = np.frombuffer(zlib.decompress(base64.b64decode(data)), dtype=np.uint8)
+        return cells.astype(np.int16).reshape(rows, columns)
+    except (ValueError, zlib.error):
+        raise ValueError("Unknown fingerprint format") from None
+
+
+def parse_regions(value):
+    """
+    Parse screen regions given as 'x,y,width,height' in pixels, separated by ';'
+
+    Returns:
+        list: (x, y, width, height) tuples
+    """
+    regions = []
+    for region in filter(None, (part.strip() for part in value.split(";"))):
+        numbers = [int(n) for n in region.split(",")]
+        if len(numbers) != 4 or min(numbers) < 0:
+            raise ValueError(f"Invalid region: {region}, expected x,y,width,height")
+        regions.append(tuple(numbers))
+    return regions
+
+
+def changed_cells(a, b, ignore=()):
+    """
+    Number of cells whose gray level differs between two fingerprints
+
+    Args:
+        a (str): Fingerprint
+        b (str): Fingerprint
+        ignore (list): (x, y, width, height) screen regions in pixels left out of the comparison
+
+    Returns:
+        int: Cells that changed by more than CELL_THRESHOLD, sys.maxsize when the screen sizes
+            differ or a fingerprint is in an older format
+    """
+    try:
+        x, y = _cells(a), _cells(b)
+    except ValueError:
+        return sys.maxsize
+    if x.shape != y.shape:
+        return sys.maxsize
+    changed = np.abs(x - y) > CELL_THRESHOLD
+    for left, top, width, height in ignore:
+        changed[top // CELL_SIZE:-(-(top + height) // CELL_SIZE),
+                left // CELL_SIZE:-(-(left + width) // CELL_SIZE)] = False
+    return int(changed.sum())
+
+
+def matches(a, b, tolerance=MAX_CHANGED_CELLS, ignore=()):
+    return changed_cells(a, b, ignore) <= tolerance
+
+
+class TrajectoryStore:
+    """
+    Successful action sequences keyed by task label, kept in a local JSON file
+
+    Each step holds the `computer` tool arguments, the fingerprint of the screen the
+    action was taken on and how long the screen took to settle afterwards.
+    """
+
+    def __init__(self, path="trajectories.json", ignore=()):
+        """
+        Load the index, if it exists
+
+        Args:
+            path (str): JSON file holding the trajectories
+            ignore (list): (x, y, width, height) screen regions that replay does not compare
+        """
+        self.path = path
+        self.ignore = list(ignore)
+        self.trajectories = {}
+        self.recording = None
+        if os.path.exists(path):
+            with open(path) as f:
+                self.trajectories = json.load(f)
+
+    @classmethod
+    def from_env(cls):
+        """
+        Build a store from TRAJECTORY_FILE and TRAJECTORY_IGNORE
+
+        Returns:
+            TrajectoryStore: Store backed by the configured file
+        """
+        return cls(os.environ.get("TRAJECTORY_FILE", "trajectories.json"),
+                   parse_regions(os.environ.get("TRAJECTORY_IGNORE", "")))
+
+    def session(self):
+        """
+        A store for one desktop: it shares this store's trajectories and file, with a recording of its own
+
+        Returns:
+            TrajectoryStore: Store sharing the trajectories
+        """
+        store = copy.copy(self)
+        store.recording = None
+        return store
+
+    def start(self, task):
+        """Start recording a new trajectory for a task, discarding one in progress"""
+        self.recording = {"task": task, "steps": [], "started": time.time()}
+
+    def record(self, action, screen_fingerprint, settle):
+        """
+        Append a step to the trajectory being recorded, if any
+
+        Args:
+            action (dict): `computer` tool arguments, None values left out
+            screen_fingerprint (str): Fingerprint of the screen before the action, None to run it
+                right after the previous step in replay
+            settle (float): Seconds the screen took to settle after the action
+        """
+        if self.recording is None or action["action"] in UNRECORDED_ACTIONS:
+            return
+        self.recording["steps"].append({
+            "action": action,
+            "fingerprint": screen_fingerprint,
+            "settle": round(settle, 3),
+        })
+
+    def finish(self, success, final_fingerprint=None):
+        """
+        Stop recording; a successful trajectory replaces the task's previous one
+
+        Returns:
+            dict: The finished trajectory, None when nothing was being recorded
+        """
+        trajectory, self.recording = self.recording, None
+        if trajectory is None or not success or not trajectory["steps"]:
+            return trajectory
+        trajectory["final"] = final_fingerprint
+        trajectory["recorded"] = time.time()
+        self.trajectories[trajectory["task"]] = trajectory
+        self.save()
+        return trajectory
+
+    def save(self):
+        """Write the index atomically, so a crash never leaves half a file"""
+        temporary = f"{self.path}.tmp"
+        with open(temporary, "w") as f:
+            json.dump(self.trajectories, f)
+        os.replace(temporary, self.path)
+
+    def summary(self):
+        """
+        List the recorded tasks
+
+        Returns:
+            list: Task label, step count and recording time per trajectory
+        """
+        return [{"task": task, "steps": len(trajectory["steps"]), "recorded": trajectory.get("recorded")}
+                for task, trajectory in self.trajectories.items()]
+
+
+async def wait_for_state(vnc, expected, timeout, ignore=()):
+    """
+    Poll the screen until its fingerprint matches `expected` outside the `ignore` regions
+
+    Returns:
+        bool: Whether it matched within the timeout
+    """
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + timeout
+    while True:
+        if matches(fingerprint(await vnc.capture_screenshot()), expected, ignore=ignore):
+            return True
+        if loop.time() >= deadline:
+            return False
+        await asyncio.sleep(REPLAY_POLL_INTERVAL)
+
+
+async def replay(tool, trajectory, ignore=()):
+    """
+    Re-run a recorded trajectory with a computer tool, checking the screen before each step
+
+    Instead of a fixed settle after every action, replay moves on as soon as the
+    screen matches the state the next step was recorded on, waiting at most the
+    settle time seen while recording plus REPLAY_GRACE.
+
+    Args:
+        tool (BaseComputerTool): Tool to execute the actions with
+        trajectory (dict): Trajectory from TrajectoryStore
+        ignore (list): (x, y, width, height) screen regions left out of the comparisons
+
+    A step that fails stops the replay the same way as a divergence.
+
+    Returns:
+        tuple: (steps completed, index of the step the replay stopped at or None,
+            error of the step that failed or None)
+    """
+    steps = trajectory["steps"]
+    previous_settle = REPLAY_GRACE
+    for index, step in enumerate(steps):
+        # Steps recorded inside a batch follow the previous one without a check
+        if step["fingerprint"] is not None and not await wait_for_state(
+                tool.vnc, step["fingerprint"], previous_settle + REPLAY_GRACE, ignore):
+            return index, index, None
+        tool._batch = True
+        try:
+            error = (await tool(**step["action"])).error
+        except Exception as e:
+            error = str(e) or type(e).__name__
+        finally:
+            tool._batch = False
+        if error:
+            return index, index, error
+        previous_settle = step["settle"]
+    if trajectory.get("final"):
+        if not await wait_for_state(tool.vnc, trajectory["final"], previous_settle + REPLAY_GRACE, ignore):
+            return len(steps), len(steps), None
+    return len(steps), None, None
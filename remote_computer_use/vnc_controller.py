@@ -3,14 +3,218 @@ VNC Controller Module for Computer Use MCP Server
 Handles VNC connections, screen capture, and input events
 """
 import asyncio
+import time
+from collections import deque
+from twisted.internet import reactor
 from vncdotool import api
-import io
-from PIL import Image
-import tempfile
+from vncdotool.client import VNCDoToolClient, VNCDoToolFactory, RGB32, BGR16
+from vncdotool.rfb import Encoding
+import numpy as np
+from frame_diff import changed_bbox, box_area, rects_area, rects_intersect
+from image_encoder import ScreenshotCache
+from rfb_client import AsyncRFBClient, SUPPORTED_ENCODINGS
+from input_batch import InputBatch
+from scheduler import ActionScheduler
+
+# How many dirty rectangles the mirror remembers for change queries
+DIRTY_HISTORY = 256
+
+# How long to wait for the screen to stop changing after an action, in seconds.
+# max_wait caps the wait; quiet_period is how long frames must stay unchanged.
+SETTLE_PROFILES = {
+    "default": {"max_wait": 2.0, "quiet_period": 0.3},
+    "mouse_move": {"max_wait": 0.5, "quiet_period": 0.15},
+    "left_mouse_down": {"max_wait": 1.0, "quiet_period": 0.2},
+    "left_mouse_up": {"max_wait": 1.0, "quiet_period": 0.2},
+    "left_click_drag": {"max_wait": 1.0, "quiet_period": 0.2},
+    "double_click": {"max_wait": 3.0, "quiet_period": 0.4},
+    "triple_click": {"max_wait": 3.0, "quiet_period": 0.4},
+    "scroll": {"max_wait": 1.0, "quiet_period": 0.2},
+    "type": {"max_wait": 1.0, "quiet_period": 0.2},
+    "hold_key": {"max_wait": 1.0, "quiet_period": 0.2},
+}
+# Changes smaller than this many pixels (a blinking caret) don't count as activity
+SETTLE_IGNORE_AREA = 64
+
+# RFB encodings vncdotool can decode, by the names used in VNC_ENCODINGS.
+# Tight is not implemented by vncdotool; zrle and hextile are decoded in pure Python,
+# so they trade client CPU for bandwidth and pay off on slow links.
+ENCODINGS = {
+    "raw": Encoding.RAW,
+    "copyrect": Encoding.COPY_RECTANGLE,
+    "rre": Encoding.RRE,
+    "corre": Encoding.CORRE,
+    "hextile": Encoding.HEXTILE,
+    "zrle": Encoding.ZRLE,
+}
+# Pixel formats to request by color depth; None keeps the server's native format
+PIXEL_FORMATS = {
+    24: RGB32,
+    16: BGR16,
+}
+# How many recent updates the per-connection stats are computed over
+STATS_HISTORY = 256
+# vncdotool runs on a Twisted reactor thread; asyncio speaks RFB on the event loop
+BACKENDS = ("vncdotool", "asyncio")
+
+
+class FramebufferClient(VNCDoToolClient):
+    """vncdotool client that hands the framebuffer back as an in-memory image"""
+
+    capture = None
+    frame_seq = 0
+    mirroring = False
+    mirror_interval = 0.05
+    _mirror_call = None
+
+    def connectionMade(self):
+        super().connectionMade()
+        # frame_seq is bumped once per framebuffer update that painted something
+        self.dirty_rects = deque(maxlen=DIRTY_HISTORY)
+        self.bytes_received = 0
+        self.updates = 0
+        # (bytes, pixels, seconds since a full update request or None) of recent updates
+        self.update_history = deque(maxlen=STATS_HISTORY)
+        self._update_start_bytes = 0
+        self._requested_at = None
+
+    def vncConnectionMade(self):
+        if self.factory.pixel_format is not None:
+            self.setPixelFormat(self.factory.pixel_format)
+        super().vncConnectionMade()
+
+    def setEncodings(self, list_of_encodings):
+        if self.factory.encodings:
+            # Configured preference first, keeping vncdotool's pseudo-encodings
+            pseudo = [encoding for encoding in list_of_encodings if encoding < 0]
+            list_of_encodings = [*self.factory.encodings, *pseudo]
+        super().setEncodings(list_of_encodings)
+
+    def dataReceived(self, data):
+        self.bytes_received += len(data)
+        super().dataReceived(data)
+
+    def framebufferUpdateRequest(self, x=0, y=0, width=None, height=None, incremental=False):
+        # Incremental requests are answered whenever the screen next changes, so only
+        # full requests say anything about link latency
+        if not incremental and self._requested_at is None:
+            self._requested_at = time.perf_counter()
+        super().framebufferUpdateRequest(x, y, width, height, incremental)
+
+    def connectionLost(self, reason):
+        self.stopMirror()
+        super().connectionLost(reason)
+
+    def captureImage(self, incremental=False, box=None):
+        """
+        Refresh the framebuffer and keep a copy of it in `capture`, without touching disk
+        
+        The deferred fires with the client itself, as every vncdotool command does,
+        because the threaded api proxy chains each call onto the previous result.
+
+        Args:
+            incremental (bool): Only request regions changed since the last update
+            box (tuple): Optional (left, upper, right, lower) crop box
+
+        Returns:
+            Deferred: Fires with this client once `capture` holds the PIL.Image
+        """
+        d = self.refreshScreen(incremental)
+        d.addCallback(self._captureImage, box)
+        return d
+
+    def _captureImage(self, data, box):
+        self.capture = self.screen.crop(box) if box else self.screen.copy()
+        return self
+
+    def snapshotImage(self, box=None):
+        """
+        Copy the mirrored framebuffer into `capture` without asking the server for anything
+
+        Args:
+            box (tuple): Optional (left, upper, right, lower) crop box
+
+        Returns:
+            FramebufferClient: This client, with `capture` holding the PIL.Image
+        """
+        return self._captureImage(None, box)
+
+    def startMirror(self, interval=None):
+        """
+        Keep `screen` in sync with the server using incremental update requests
+
+        A full update seeds the mirror; after that each committed update schedules
+        the next incremental request, so only dirty rectangles cross the wire.
+
+        Args:
+            interval (float): Seconds to wait between incremental requests
+
+        Returns:
+            Deferred: Fires with this client once the first full frame arrived
+        """
+        if interval is not None:
+            self.mirror_interval = interval
+        self.mirroring = True
+        d = self.refreshScreen(incremental=False)
+        d.addCallback(lambda _: self)
+        return d
+
+    def stopMirror(self):
+        """Stop issuing incremental update requests"""
+        self.mirroring = False
+        if self._mirror_call and self._mirror_call.active():
+            self._mirror_call.cancel()
+        self._mirror_call = None
+        return self
+
+    def _requestMirrorUpdate(self):
+        self._mirror_call = None
+        if self.mirroring:
+            self.framebufferUpdateRequest(incremental=True)
+
+    def sendEvents(self, data, pointer=None):
+        """
+        Write a pre-encoded batch of input events in one transport write
+
+        Args:
+            data (bytes): RFB key and pointer event messages
+            pointer (tuple): (x, y, buttons) pointer state after the batch
+        """
+        self.transport.write(data)
+        if pointer is not None:
+            self.x, self.y, self.buttons = pointer
+        return self
+
+    def commitUpdate(self, rectangles=None):
+        # Bytes are counted per read, so an update also carries any other message
+        # that arrived since the previous one
+        size = self.bytes_received - self._update_start_bytes
+        self._update_start_bytes = self.bytes_received
+        latency = time.perf_counter() - self._requested_at if self._requested_at else None
+        self._requested_at = None
+        self.updates += 1
+        self.update_history.append((size, rects_area(rectangles or []), latency))
+        if rectangles:
+            self.frame_seq += 1
+            for rect in rectangles:
+                self.dirty_rects.append((self.frame_seq, rect))
+        super().commitUpdate(rectangles)
+        if self.mirroring and self._mirror_call is None:
+            self._mirror_call = reactor.callLater(self.mirror_interval, self._requestMirrorUpdate)
+
+
+class FramebufferFactory(VNCDoToolFactory):
+    protocol = FramebufferClient
+    # Ordered rfb.Encoding preference, None keeps vncdotool's default
+    encodings = None
+    # rfb.PixelFormat to request, None keeps the server's native format
+    pixel_format = None
 
 
 class VNCController:
-    def __init__(self, host, port, username, password):
+    def __init__(self, host, port, username, password, mirror=False, mirror_interval=0.05,
+                 settle_profiles=None, screenshot_dedup="cache", encodings=None, pixel_depth=None,
+                 backend="vncdotool", input_pacing=0.0, frame_source=None):
         """
         Initialize VNC controller with connection parameters
         
@@ -19,13 +223,246 @@ class VNCController:
             port (int): VNC server port
             username (str): VNC username
             password (str): VNC password
+            mirror (bool): Keep a live in-memory mirror of the remote screen
+            mirror_interval (float): Seconds between incremental mirror update requests
+            settle_profiles (dict): Per-action overrides of SETTLE_PROFILES
+            screenshot_dedup (str): How repeat screenshots of an unchanged screen are answered,
+                one of image_encoder.DEDUP_MODES
+            encodings (list): RFB encoding names from ENCODINGS, most preferred first
+            pixel_depth (int): Color depth to request from PIXEL_FORMATS, None for native
+            backend (str): VNC client implementation, one of BACKENDS
+            input_pacing (float): Seconds between input events, 0 sends a batch in one write
+            frame_source (RemoteCapture): Take screenshots from this instead of the VNC framebuffer
         """
         self.host = host
         self.port = port
         self.username = username
         self.password = password
+        self.mirror = mirror
+        self.mirror_interval = mirror_interval
+        self.settle_profiles = {action: dict(profile) for action, profile in SETTLE_PROFILES.items()}
+        for action, profile in (settle_profiles or {}).items():
+            self.settle_profiles.setdefault(action, {}).update(profile)
+        # Last screenshot sent from this desktop; the servers keep one per MCP session and take the mode from here
+        self.screenshot_cache = ScreenshotCache(screenshot_dedup)
+        self.encodings = []
+        for name in encodings or []:
+            if name.lower() not in ENCODINGS:
+                raise ValueError(f"Unsupported VNC encoding: {name}, choose from {', '.join(ENCODINGS)}")
+            self.encodings.append(ENCODINGS[name.lower()])
+        if pixel_depth is not None and pixel_depth not in PIXEL_FORMATS:
+            raise ValueError(f"Unsupported VNC pixel depth: {pixel_depth}, choose from {list(PIXEL_FORMATS)}")
+        if pixel_depth == 16 and Encoding.ZRLE in self.encodings:
+            # vncdotool's ZRLE decoder only understands 24-bit pixels
+            raise ValueError("zrle encoding requires a 24-bit pixel depth")
+        self.pixel_depth = pixel_depth
+        if backend not in BACKENDS:
+            raise ValueError(f"Unsupported VNC backend: {backend}, choose from {', '.join(BACKENDS)}")
+        if backend == "asyncio":
+            unsupported = [Encoding(e).name for e in self.encodings if e not in SUPPORTED_ENCODINGS]
+            if unsupported:
+                raise ValueError(f"The asyncio VNC backend cannot decode {', '.join(unsupported)}")
+        self.backend = backend
+        self.input_pacing = input_pacing
+        self.frame_source = frame_source
+        # Serializes input across concurrent tool calls and shares concurrent screenshots
+        self.scheduler = ActionScheduler()
+        # vncdotool's proxy hands results back through one queue, so calls must not overlap
+        self._client_lock = asyncio.Lock()
         self.client = None
+        # frame_seq seen when input was last sent, so a capture can wait for the echo
+        self._input_frame_seq = None
+        
+    @property
+    def frame_seq(self):
+        """Number of framebuffer updates received so far, 0 when not connected"""
+        if self.client is None or self.client.protocol is None:
+            return 0
+        return self.client.protocol.frame_seq
+
+    @property
+    def pointer(self):
+        """Last pointer position sent to the desktop as (x, y), (0, 0) when not connected"""
+        if self.client is None or self.client.protocol is None:
+            return 0, 0
+        return self.client.protocol.x, self.client.protocol.y
+
+    def _mark_input(self):
+        """Remember that input was sent, the mirror may not show its effect yet"""
+        self._input_frame_seq = self.frame_seq
+
+    async def _wait_for_mirror(self, timeout=None):
+        """
+        Give the mirror a moment to pick up the effect of the last input event
+        
+        Returns as soon as an update newer than the input arrived, or after
+        `timeout` seconds when the input did not change the screen at all.
+        """
+        if self._input_frame_seq is None:
+            return
+        timeout = timeout if timeout is not None else self.mirror_interval * 4
+        deadline = asyncio.get_running_loop().time() + timeout
+        while self.frame_seq == self._input_frame_seq and asyncio.get_running_loop().time() < deadline:
+            await asyncio.sleep(self.mirror_interval / 2)
+        self._input_frame_seq = None
+        
+    def changed_area_since(self, seq):
+        """
+        Sum the mirror's dirty rectangle area committed after update `seq`
+        
+        Args:
+            seq (int): frame_seq to compare against
+            
+        Returns:
+            tuple: (current frame_seq, changed area in pixels)
+        """
+        current, rects = self.dirty_rects_since(seq)
+        return current, rects_area(rects or [])
+
+    def dirty_rects_since(self, seq):
+        """
+        List the mirror's dirty rectangles committed after update `seq`
+        
+        Args:
+            seq (int): frame_seq to compare against
+            
+        Returns:
+            tuple: (current frame_seq, list of (x, y, w, h) rectangles, or None when
+                older updates already fell out of the DIRTY_HISTORY window)
+        """
+        current = self.frame_seq
+        if current == seq:
+            return current, []
+        dirty = list(self.client.protocol.dirty_rects)
+        if not dirty or dirty[0][0] > seq + 1:
+            return current, None
+        return current, [rect for rect_seq, rect in dirty if rect_seq > seq]
+
+    async def wait_for_change(self, region=None, timeout=10.0, poll_interval=0.05):
+        """
+        Wait until the pixels of the screen, or a region of it, change
+        
+        With the mirror running, frames are only compared once a dirty rectangle
+        touches the region; otherwise the region is captured and diffed every poll.
+        
+        Args:
+            region (tuple): (x, y, w, h) to watch, None for the whole screen
+            timeout (float): Give up after this many seconds
+            poll_interval (float): Seconds between checks
+            
+        Returns:
+            tuple: (whether the pixels changed, seconds spent waiting)
+        """
+        async def grab():
+            if region:
+                return await self.capture_region(*region)
+            return await self.capture_screenshot()
+        
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        baseline = await grab()
+        mirror = self.mirror and self.client and self.client.protocol
+        seq = self.frame_seq
+        while loop.time() - start < timeout:
+            await asyncio.sleep(poll_interval)
+            if mirror:
+                seq, rects = self.dirty_rects_since(seq)
+                if rects is not None and not any(region is None or rects_intersect(rect, region)
+                                                 for rect in rects):
+                    continue
+            if changed_bbox(baseline, await grab()) is not None:
+                return True, loop.time() - start
+        return False, loop.time() - start
+
+    async def wait_for_settle(self, action=None, max_wait=None, quiet_period=None, poll_interval=0.05):
+        """
+        Wait until consecutive frames stop changing, or max_wait elapses
+        
+        With the mirror running this only watches incoming dirty rectangles;
+        otherwise it polls full screenshots and diffs them.
+        
+        Args:
+            action (str): Action type used to pick a profile from settle_profiles
+            max_wait (float): Override the profile's upper bound in seconds
+            quiet_period (float): Override how long the screen must stay unchanged
+            poll_interval (float): Seconds between checks
+            
+        Returns:
+            float: Seconds spent waiting
+        """
+        profile = {**self.settle_profiles["default"], **self.settle_profiles.get(action, {})}
+        max_wait = profile["max_wait"] if max_wait is None else max_wait
+        quiet_period = profile["quiet_period"] if quiet_period is None else quiet_period
+        
+        loop = asyncio.get_running_loop()
+        start = last_change = loop.time()
+        if self.mirror and self.client and self.client.protocol:
+            seq = self.frame_seq
+            while loop.time() - start < max_wait and loop.time() - last_change < quiet_period:
+                await asyncio.sleep(poll_interval)
+                seq, area = self.changed_area_since(seq)
+                if area > SETTLE_IGNORE_AREA:
+                    last_change = loop.time()
+        else:
+            previous = await self.capture_screenshot()
+            while loop.time() - start < max_wait and loop.time() - last_change < quiet_period:
+                await asyncio.sleep(poll_interval)
+                current = await self.capture_screenshot()
+                if box_area(changed_bbox(previous, current)) > SETTLE_IGNORE_AREA:
+                    last_change = loop.time()
+                previous = current
+        # Whatever the input changed has been waited out already
+        self._input_frame_seq = None
+        return loop.time() - start
+
+    async def _call(self, command, *args):
+        """
+        Run a client command: awaited on the event loop with the asyncio backend,
+        in a worker thread through vncdotool's blocking proxy otherwise
+        
+        Returns:
+            The command's result, the client itself for every command used here
+        """
+        method = getattr(self.client, command)
+        if self.backend == "asyncio":
+            return await method(*args)
+        async with self._client_lock:
+            return await asyncio.to_thread(method, *args)
+
+    def stats(self):
+        """
+        Summarize traffic on the current connection, for tuning encodings and depth
         
+        Returns:
+            dict: Update counts, bytes received, mean bytes and pixels per update over the
+                last STATS_HISTORY updates, bytes per updated pixel and full-update latency
+        """
+        stats = {
+            "encodings": [Encoding(encoding).name for encoding in self.encodings] or ["RAW"],
+            "pixel_depth": self.pixel_depth or "native",
+            "connected": bool(self.client),
+            "scheduler": self.scheduler.metrics(),
+        }
+        if self.frame_source is not None:
+            stats["remote_capture"] = self.frame_source.stats()
+        if not self.client or not self.client.protocol:
+            return stats
+        protocol = self.client.protocol
+        history = list(protocol.update_history)
+        sizes = [size for size, _, _ in history]
+        pixels = [area for _, area, _ in history]
+        latencies = [latency for _, _, latency in history if latency is not None]
+        stats.update({
+            "updates": protocol.updates,
+            "bytes_received": protocol.bytes_received,
+            "last_update_bytes": sizes[-1] if sizes else 0,
+            "mean_update_bytes": round(sum(sizes) / len(sizes)) if sizes else 0,
+            "mean_update_pixels": round(sum(pixels) / len(pixels)) if pixels else 0,
+            "bytes_per_pixel": round(sum(sizes) / sum(pixels), 3) if sum(pixels) else None,
+            "mean_full_update_ms": round(sum(latencies) / len(latencies) * 1000, 1) if latencies else None,
+        })
+        return stats
+
     async def connect(self):
         """
         Establish VNC connection
@@ -34,12 +471,26 @@ class VNCController:
             bool: True if connection successful, False otherwise
         """
         try:
+            if self.backend == "asyncio":
+                client = AsyncRFBClient(self.encodings, PIXEL_FORMATS.get(self.pixel_depth))
+                self.client = await client.connect(self.host, self.port, self.password)
+                if self.mirror:
+                    await self._call("startMirror", self.mirror_interval)
+                return True
             # Use asyncio to run the blocking VNC connection in a thread pool
+            # A factory subclass per controller carries this desktop's encoding settings
+            factory = type("FramebufferFactory", (FramebufferFactory,), {
+                "encodings": self.encodings or None,
+                "pixel_format": PIXEL_FORMATS.get(self.pixel_depth),
+            })
             self.client = await asyncio.to_thread(
                 api.connect, 
                 f"{self.host}::{self.port}", 
-                self.password
+                self.password,
+                factory
             )
+            if self.mirror:
+                await self._call("startMirror", self.mirror_interval)
             return True
         except Exception as e:
             print(f"VNC connection error: {e}")
@@ -49,7 +500,7 @@ class VNCController:
         """Close VNC connection"""
         if self.client:
             try:
-                await asyncio.to_thread(self.client.disconnect)
+                await self._call("disconnect")
             except Exception as e:
                 print(f"VNC disconnect error: {e}")
             finally:
@@ -59,45 +510,144 @@ class VNCController:
         """
         Capture screenshot from VNC session
         
+        Concurrent requests share one capture unless input ran in between.
+        
         Returns:
             PIL.Image: Screenshot image
         """
+        return await self.scheduler.capture(self._capture_screenshot)
+        
+    async def _capture_screenshot(self):
+        if self.frame_source is not None:
+            try:
+                return await self.frame_source.capture()
+            except Exception as e:
+                if not self.host:
+                    # No VNC server to fall back to, e.g. a local desktop
+                    raise
+                print(f"Remote capture error, using VNC instead: {e}")
+            
         if not self.client:
             success = await self.connect()
             if not success:
                 raise Exception("Failed to connect to VNC server")
         
         try:
-            # Capture screen and convert to PIL Image using temp file
-            with tempfile.NamedTemporaryFile(suffix='.png', delete=True) as tmp:
-                await asyncio.to_thread(self.client.captureScreen, tmp.name)
-                image = Image.open(tmp.name)
-                return image
+            if self.mirror:
+                # The mirror is already current, just copy it out
+                await self._wait_for_mirror()
+                client = await self._call("snapshotImage")
+            else:
+                # Read the framebuffer straight into a PIL Image, no temp file round-trip
+                client = await self._call("captureImage")
+            return client.capture
         except Exception as e:
             raise Exception(f"Screenshot capture error: {e}")
             
         
     async def capture_region(self,x: int, y: int, w: int, h: int, incremental: bool = False):
         """
-        Save a region of the current display to filename
+        Capture a region of the current display
+        
+        Args:
+            x (int): X coordinate of the region's left edge
+            y (int): Y coordinate of the region's top edge
+            w (int): Width of the region
+            h (int): Height of the region
+            incremental (bool): Only request regions changed since the last update
         
         Returns:
             PIL.Image: Screenshot image
         """
+        box = (x, y, x + w, y + h)
+        if self.frame_source is not None:
+            try:
+                return (await self.frame_source.capture()).crop(box)
+            except Exception as e:
+                if not self.host:
+                    # No VNC server to fall back to, e.g. a local desktop
+                    raise
+                print(f"Remote capture error, using VNC instead: {e}")
+        
         if not self.client:
             success = await self.connect()
             if not success:
                 raise Exception("Failed to connect to VNC server")
         
         try:
-            # Capture screen and convert to PIL Image using temp file
-            with tempfile.NamedTemporaryFile(suffix='.png', delete=True) as tmp:
-                await asyncio.to_thread(self.client.captureRegion, tmp.name,x,y,w,h,incremental)
-                image = Image.open(tmp.name)
-                return image
+            if self.mirror:
+                await self._wait_for_mirror()
+                client = await self._call("snapshotImage", box)
+            else:
+                client = await self._call("captureImage", incremental, box)
+            return client.capture
         except Exception as e:
             raise Exception(f"Region Screenshot capture error: {e}")
             
+    async def capture_array(self):
+        """
+        Capture screenshot from VNC session as a NumPy array
+        
+        Returns:
+            numpy.ndarray: (height, width, 3) uint8 RGB array
+        """
+        return np.asarray(await self.capture_screenshot())
+            
+        
+    async def input_batch(self):
+        """
+        Start an input batch from the current pointer state
+        
+        Returns:
+            InputBatch: Empty batch to add events to and pass to send_input
+        """
+        if self.client.protocol is None:
+            # vncdotool's proxy only learns its protocol once the handshake completes
+            await self._call("sendEvents", b"")
+        protocol = self.client.protocol
+        return InputBatch(protocol.x, protocol.y, protocol.buttons)
+        
+    async def send_input(self, batch, pacing=None):
+        """
+        Send a batch of input events, in a single write unless pacing is set
+        
+        Args:
+            batch (InputBatch): Events to send
+            pacing (float): Seconds between events, None uses input_pacing
+        """
+        pacing = self.input_pacing if pacing is None else pacing
+        if not pacing:
+            await self._call("sendEvents", batch.to_bytes(), batch.pointer)
+        else:
+            for i, event in enumerate(batch.events):
+                if i:
+                    await asyncio.sleep(pacing)
+                await self._call("sendEvents", event)
+            await self._call("sendEvents", b"", batch.pointer)
+        self._mark_input()
+        
+    async def _send_batch(self, build, error, coalesce=None):
+        """
+        Queue an action that builds a batch with `build(batch)` and sends it
+        
+        Args:
+            build (callable): Adds the action's events to an InputBatch
+            error (str): Prefix for the exception raised on failure
+            coalesce (str): Scheduler key under which a later action may supersede this one
+        """
+        async def run():
+            if not self.client:
+                success = await self.connect()
+                if not success:
+                    raise Exception("Failed to connect to VNC server")
+            batch = await self.input_batch()
+            build(batch)
+            await self.send_input(batch)
+            
+        try:
+            await self.scheduler.submit(run, coalesce)
+        except Exception as e:
+            raise Exception(f"{error}: {e}")
         
     async def mouse_move(self, x, y):
         """
@@ -107,15 +657,8 @@ class VNCController:
             x (int): X coordinate
             y (int): Y coordinate
         """
-        if not self.client:
-            success = await self.connect()
-            if not success:
-                raise Exception("Failed to connect to VNC server")
-        try:
-            await asyncio.to_thread(self.client.mouseMove, x, y)
-        except Exception as e:
-            raise Exception(f"Mouse move error: {e}")
-            
+        # A move still queued behind another action is pointless once the next move arrives
+        await self._send_batch(lambda batch: batch.move(x, y), "Mouse move error", coalesce="mouse_move")
         
     async def mouse_click(self, x, y, button=1):
         """
@@ -126,17 +669,17 @@ class VNCController:
             y (int): Y coordinate
             button (int): Mouse button (1=left, 2=middle, 3=right)
         """
-        if not self.client:
-            success = await self.connect()
-            if not success:
-                raise Exception("Failed to connect to VNC server")
-        try:
-            await asyncio.to_thread(self.client.mousePress, button)
-            await asyncio.to_thread(self.client.mouseUp, button)
-            await asyncio.to_thread(self.client.mouseUp, button)
-        except Exception as e:
-            raise Exception(f"Mouse click error: {e}")
-            
+        await self._send_batch(lambda batch: batch.move(x, y).click(button), "Mouse click error")
+    
+    async def mouse_double_click(self, x, y):
+        """
+        Double-click the left button at coordinates, as one action so no other input lands between the clicks
+        
+        Args:
+            x (int): X coordinate
+            y (int): Y coordinate
+        """
+        await self._send_batch(lambda batch: batch.move(x, y).click(1).click(1), "Mouse double-click error")
     
     async def mouse_scroll(self, steps=1, direction="down"):
         """
@@ -146,19 +689,8 @@ class VNCController:
             steps (int): Number of scroll steps
             direction (str): 'up' or 'down'
         """
-        if not self.client:
-            success = await self.connect()
-            if not success:
-                raise Exception("Failed to connect to VNC server")
-        
-        button = 4 if direction == "up" else 5  # 4 = scroll up, 5 = scroll down
-        
-        for _ in range(steps):
-            try:
-                await asyncio.to_thread(self.client.mousePress, button)
-                await asyncio.to_thread(self.client.mouseDown, button)
-            except Exception as e:
-                raise Exception(f"Mouse scroll error: {e}")
+        direction = "up" if direction == "up" else "down"
+        await self._send_batch(lambda batch: batch.scroll(steps, direction), "Mouse scroll error")
         
     async def type_text(self, text):
         """
@@ -167,19 +699,7 @@ class VNCController:
         Args:
             text (str): Text to type
         """
-        if not self.client:
-            success = await self.connect()
-            if not success:
-                raise Exception("Failed to connect to VNC server")
-            
-        async def send_text(text):
-            for char in text:
-                self.client.keyPress(char)
-        
-        try:
-            await asyncio.to_thread(send_text, text)
-        except Exception as e:
-            raise Exception(f"Text input error: {e}")
+        await self._send_batch(lambda batch: batch.type(text), "Text input error")
     
     async def key_press(self, key):
         """
@@ -188,12 +708,4 @@ class VNCController:
         Args:
             key (str): Key to press (e.g., 'enter', 'escape', etc.)
         """
-        if not self.client:
-            success = await self.connect()
-            if not success:
-                raise Exception("Failed to connect to VNC server")
-        
-        try:
-            await asyncio.to_thread(self.client.keyPress, key)
-        except Exception as e:
-            raise Exception(f"Key press error: {e}")
+        await self._send_batch(lambda batch: batch.key(key), "Key press error")